@@ -0,0 +1,110 @@
+/*
+ * Streaming AI chat
+ * Reads the server-sent events from /api/chat/stream and writes tokens into the
+ * thinking bubble as they arrive. The finished reply is handed back to Dash through
+ * the chat-reply-store so the transcript and history are updated server-side.
+ */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    chat: {
+        streamResponse: function (pendingMessage, history) {
+            if (!pendingMessage) {
+                return window.dash_clientside.no_update;
+            }
+
+            let text = '';
+            let finished = false;
+
+            function finish(success, message) {
+                if (finished) {
+                    return;
+                }
+                finished = true;
+                window.dash_clientside.set_props('chat-reply-store', {
+                    data: {
+                        id: pendingMessage.id,
+                        success: success,
+                        message: message,
+                        received: Date.now(),
+                    },
+                });
+            }
+
+            function showText() {
+                const bubble = document.querySelector(
+                    '#chat-thinking-' + pendingMessage.id + ' .chat-message-thinking'
+                );
+                if (!bubble) {
+                    return;
+                }
+                bubble.classList.add('streaming');
+                bubble.querySelector('.chat-stream-text').textContent = text;
+
+                const container = document.getElementById('chat-messages-container');
+                container.scrollTop = container.scrollHeight;
+            }
+
+            function handleEvent(block) {
+                let eventName = 'message';
+                let data = '';
+                block.split('\n').forEach(function (line) {
+                    if (line.startsWith('event: ')) {
+                        eventName = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+                if (!data) {
+                    return;
+                }
+                const payload = JSON.parse(data);
+                if (eventName === 'delta') {
+                    text += payload;
+                    showText();
+                } else if (eventName === 'done') {
+                    finish(true, payload);
+                } else if (eventName === 'error') {
+                    finish(false, payload);
+                }
+            }
+
+            fetch('/api/chat/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ message: pendingMessage.message, history: history || [] }),
+            })
+                .then(async function (response) {
+                    if (!response.ok || !response.body) {
+                        throw new Error('HTTP ' + response.status);
+                    }
+                    const reader = response.body.getReader();
+                    const decoder = new TextDecoder();
+                    let buffer = '';
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) {
+                            break;
+                        }
+                        buffer += decoder.decode(value, { stream: true });
+                        let boundary = buffer.indexOf('\n\n');
+                        while (boundary !== -1) {
+                            handleEvent(buffer.slice(0, boundary));
+                            buffer = buffer.slice(boundary + 2);
+                            boundary = buffer.indexOf('\n\n');
+                        }
+                    }
+                    // Stream closed without a final event: keep whatever arrived
+                    if (text) {
+                        finish(true, text);
+                    } else {
+                        finish(false, 'Sorry, the response was interrupted. Please try again.');
+                    }
+                })
+                .catch(function (error) {
+                    finish(false, 'Sorry, I encountered an error: ' + error.message);
+                });
+
+            return window.dash_clientside.no_update;
+        },
+    },
+});
@@ -1,63 +1,107 @@
 import os
-import pandas as pd
-import geopandas as gpd
+import json
+import time
+import uuid
 import dash
 import dash_bootstrap_components as dbc
-from dash import dcc, html, callback_context
+from dash import dcc, html, callback_context, Patch
 from dash.exceptions import PreventUpdate
-from dash.dependencies import Input, Output, State, ALL
-from flask import Flask
+from dash.dependencies import Input, Output, State, ALL, ClientsideFunction
+from flask import Flask, Response, abort, jsonify, request, send_from_directory, stream_with_context
 from flask_caching import Cache
 
 from layouts.layout_main import get_main_layout, color_map
-from layouts.layout_gallery import get_gallery_layout
+from layouts.layout_gallery import (
+    get_gallery_layout,
+    create_place_cards,
+    get_gallery_page_summary,
+    GALLERY_PAGE_SIZE,
+)
 from layouts.layout_place_detail import get_place_detail_layout
 from layouts.layout_404 import get_404_layout
 from layouts.layout_chat import get_chat_widget
 
 from utils.locationMatcher import LocationMatcher
-from utils.markdownRenderer import get_all_place_slugs
+from utils.markdownRenderer import ARTICLES_DIR
+from utils.placeCatalog import PlaceCatalog
+from utils.placeClusters import PlaceClusters
+from utils.vectorTiles import MAP_TILES_BASE_URL, MAP_VECTOR_TILES, VectorTiles
+from utils.basemapTiles import MAP_LOCAL_BASEMAP, basemap
+from utils.searchIndex import SearchIndex
+from utils.dataSnapshot import load_datasets
+from utils.districtOutlines import detail_level_for_zoom
 from utils.appFunctions import (
-    plot_interactive_district,
-    default_map_figure,
+    HONG_KONG_VIEW,
+    MAP_CONDITIONS,
+    MAP_STYLE,
+    add_marker_columns,
+    district_map_view,
+    empty_map_view,
     get_place_details,
-    plot_region_center_view,
+    map_view_figure,
+    map_view_patch,
+    marker_patch,
+    region_map_view,
+    tile_layers,
 )
-from utils.aiChat import get_ai_response
+from utils.aiChat import get_ai_response, stream_ai_response, CHAT_STREAMING
+from utils.chatCache import answer_cache
+from utils.chatHistory import prompt_stats
+from utils.chatJobs import CHAT_JOB_POLL_MS, CHAT_JOB_TIMEOUT, chat_jobs
+from utils.modelDerivatives import MODELS_DIR, MODEL_DERIVATIVES_DIR
+from utils.sharedCache import CACHE_DEFAULT_TIMEOUT
+from utils.staticAssets import static_assets
+
+# Source datasets
+PLACES_PATH = 'assets/Data/hk_places.csv'
+DISTRICTS_PATH = 'assets/Data/hk_districts.geojson'
+
+# Places, district geometries, slugs and outlines: from the binary snapshot built by
+# `python -m utils.dataSnapshot` when it matches the files above, otherwise parsed from them
+datasets = load_datasets(PLACES_PATH, DISTRICTS_PATH)
 
-# Load Hong Kong places data
-all_streets = pd.read_csv('assets/Data/hk_places.csv')
+# Hong Kong places (district_num is a string for consistent comparisons), with map marker
+# colours, sizes and hover text precomputed for all places
+all_streets = add_marker_columns(datasets.places)
 
-# Generate slug map for gallery routing
-slug_map = get_all_place_slugs(all_streets)
-# Create reverse mapping (slug -> place name)
-reverse_slug_map = {v: k for k, v in slug_map.items()}
+# Slug map for gallery routing
+slug_map = datasets.slug_map
 
-# Ensure district_num is a string for consistent comparisons
-all_streets['district_num'] = all_streets['district_num'].astype(str)
+# Hong Kong district geometries
+district_df = datasets.districts
 
-# Load Hong Kong district GeoJSON data
-district_df = gpd.read_file('assets/Data/hk_districts.geojson')
+# Fingerprint of the loaded data; part of every cached figure key so edits never serve stale maps
+DATA_VERSION = datasets.version
 
 # Removed analysis-only datasets (region and wine) as part of cleanup
 
-# Get unique districts with places
-districts_with_places = all_streets['district_num'].unique()
-# Filter geo_df to only districts with place data
-geo_df = district_df[district_df['code'].isin(districts_with_places)]
+# Read-only lookups (by region, district, condition and slug) shared by all callbacks
+catalog = PlaceCatalog(all_streets, district_df, slug_map)
 
+# Zoom-aware clustering of the explore map markers (bounded markers per view in dense districts)
+place_clusters = PlaceClusters(all_streets)
+
+# Vector tiles of all places and district polygons (/tiles/...), optionally drawn on the map
+vector_tiles = VectorTiles(all_streets, district_df, DATA_VERSION)
 
-# Use geo_df to get unique regions and districts for the initial dropdowns
 # Constrain to Hong Kong's three regions
 HK_REGIONS = ['Hong Kong Island', 'Kowloon', 'New Territories']
 unique_regions = [r for r in sorted(district_df['region'].unique()) if r in HK_REGIONS]
-initial_districts = geo_df[['district', 'code']].drop_duplicates().to_dict('records')
-initial_options = [{'label': f'{d["district"]}', 'value': d['district']} for d in initial_districts]
-district_to_code = (
-    district_df.drop_duplicates(subset='district').set_index('district')['code'].to_dict()
-)
 region_to_name = {region: region for region in unique_regions}
 
+# Simplified district boundaries at several levels of detail (shared borders stay aligned)
+district_outlines = datasets.outlines
+
+# Fuzzy location index, built once and shared by every search request
+location_matcher = LocationMatcher(all_streets)
+
+# Full-text index over place records and article bodies (sidebar search and /api/search)
+search_index = SearchIndex.from_sources(all_streets, slug_map, ARTICLES_DIR)
+
+# Results shown in the sidebar search and the default (and maximum) for /api/search
+SEARCH_RESULT_LIMIT = 8
+SEARCH_MAX_LIMIT = 50
+
 # -----------------> App and server setup
 
 server = Flask(__name__)
@@ -81,6 +125,14 @@ app = dash.Dash(
 #         return redirect(url, code=301)
 
 
+@server.before_request
+def serve_static_asset():
+    """Serve /assets/ fingerprinted and precompressed (see utils.staticAssets)."""
+    if request.method in ('GET', 'HEAD') and request.path.startswith('/assets/'):
+        # Unknown files fall through to Dash's own static route (and its 404)
+        return static_assets.response(request.path[len('/assets/') :], request)
+
+
 # App set up
 app.title = 'Cyber Wan Chai - A Gallary for Old Hong Kong Memory'
 app.index_string = open('assets/custom_header.html', 'r').read()
@@ -94,6 +146,9 @@ app.layout = html.Div(
         dcc.Store(id='chat-is-open-store', data=False),
         dcc.Store(id='chat-scroll-trigger', data=0),
         dcc.Store(id='chat-pending-message-store', data=None),  # Triggers AI callback
+        dcc.Store(id='chat-reply-store', data=None),  # Completed reply, streamed or from a job
+        dcc.Store(id='chat-job-store', data=None),  # Background job computing the reply
+        dcc.Interval(id='chat-job-poll', interval=CHAT_JOB_POLL_MS, disabled=True),
         dcc.Location(id='url', refresh=False),  # Tracks the url
         html.Div(id='page-content', children=get_main_layout()),  # Set initial content
         get_chat_widget(),  # Chat widget as sibling of page-content for persistence
@@ -103,12 +158,13 @@ app.layout = html.Div(
     ]
 )
 
-# Initialize the cache (Maybe Redis or filesystem-based caching for production...?)
+# Map figures go to the cache selected with CACHE_BACKEND (see utils.sharedCache); with a
+# filesystem, shared memory or Redis backend every gunicorn worker reuses the same entries
 cache = Cache(
     app.server,
     config={
-        'CACHE_TYPE': 'simple',
-        'CACHE_DEFAULT_TIMEOUT': 3600,  # Cache timeout in seconds (1 hour)
+        'CACHE_TYPE': 'utils.sharedCache.flask_cache_factory',
+        'CACHE_DEFAULT_TIMEOUT': CACHE_DEFAULT_TIMEOUT,
     },
 )
 
@@ -117,17 +173,17 @@ cache = Cache(
 @app.callback(Output('page-content', 'children'), Input('url', 'pathname'))
 def display_page(pathname):
     if pathname == '/gallery':
-        return get_gallery_layout(all_streets, slug_map)
+        first_page = catalog.gallery_positions[:GALLERY_PAGE_SIZE]
+        return get_gallery_layout(
+            catalog.places_at(first_page), slug_map, total=len(catalog.gallery_positions)
+        )
     elif pathname and pathname.startswith('/gallery/'):
         # Extract slug from URL
         place_slug = pathname.replace('/gallery/', '')
         # Look up place by slug
-        place_name = reverse_slug_map.get(place_slug)
-        if place_name:
-            # Find the place data
-            place_data = all_streets[all_streets['name'] == place_name]
-            if not place_data.empty:
-                return get_place_detail_layout(place_data.iloc[0], place_slug)
+        place_data = catalog.place_by_slug(place_slug)
+        if place_data is not None:
+            return get_place_detail_layout(place_data, place_slug)
         # If place not found, show 404
         return get_404_layout()
     elif pathname == '/home':
@@ -136,90 +192,109 @@ def display_page(pathname):
         return get_main_layout() if pathname == '/' else get_404_layout()
 
 
-# Toggle nav menu open/closed
-@app.callback(
+# Toggle nav menu open/closed (navigation always closes it)
+app.clientside_callback(
+    """
+    function(nClicks, pathname, currentClass) {
+        const ctx = window.dash_clientside.callback_context;
+        if (!ctx.triggered.length) {
+            throw window.dash_clientside.PreventUpdate;
+        }
+
+        const triggerId = ctx.triggered[0].prop_id.split('.')[0];
+        if (triggerId === 'url') {
+            return 'nav-dropdown';
+        }
+        return (currentClass || '').includes('visible') ? 'nav-dropdown' : 'nav-dropdown visible';
+    }
+    """,
     Output('navigation-menu', 'className'),
     [Input('hamburger-icon', 'n_clicks'), Input('url', 'pathname')],
     State('navigation-menu', 'className'),
     prevent_initial_call=True,
 )
-def toggle_menu_class(n_clicks, pathname, current_class):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        raise PreventUpdate
-
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
-    # If navigation occurred, always close the menu
-    if trigger_id == 'url':
-        return 'nav-dropdown'
 
-    # Hamburger logic
-    if 'visible' in current_class:
-        return 'nav-dropdown'
-    else:
-        return 'nav-dropdown visible'
-
-
-@app.callback(
+# Highlight the nav link of the current page
+app.clientside_callback(
+    """
+    function(pathname) {
+        const activeClass = 'nav-link active';
+        const inactiveClass = 'nav-link';
+
+        if (pathname === '/' || pathname === '/home') {
+            return [activeClass, inactiveClass];
+        } else if (pathname && (pathname === '/gallery' || pathname.startsWith('/gallery/'))) {
+            return [inactiveClass, activeClass];
+        }
+        return [inactiveClass, inactiveClass];
+    }
+    """,
     [Output('home-button', 'className'), Output('gallery-button', 'className')],
     Input('url', 'pathname'),
 )
-def update_nav_classes(pathname):
-    active_class = 'nav-link active'
-    inactive_class = 'nav-link'
-
-    if pathname in ['/', '/home']:
-        return active_class, inactive_class
-    elif pathname and (pathname == '/gallery' or pathname.startswith('/gallery/')):
-        return inactive_class, active_class
-    else:
-        return inactive_class, inactive_class
 
 
 # -----------------------> "Gallery Page"
 
 
 @app.callback(
-    Output('gallery-grid-container', 'children'),
+    [
+        Output('gallery-grid-container', 'children'),
+        Output('gallery-page-info', 'children'),
+        Output('gallery-prev-button', 'disabled'),
+        Output('gallery-next-button', 'disabled'),
+        Output('gallery-page-store', 'data'),
+    ],
     [
         Input('gallery-region-filter', 'value'),
         Input('gallery-status-filter', 'value'),
+        Input('gallery-prev-button', 'n_clicks'),
+        Input('gallery-next-button', 'n_clicks'),
     ],
+    State('gallery-page-store', 'data'),
+    prevent_initial_call=True,  # The layout already contains the first page
 )
-def filter_gallery(selected_region, selected_status):
-    """Filter gallery cards based on region and status."""
-    filtered_df = all_streets.copy()
-
-    # Apply region filter
-    if selected_region != 'all':
-        filtered_df = filtered_df[filtered_df['region'] == selected_region]
-
-    # Apply status filter
-    if selected_status != 'all':
-        filtered_df = filtered_df[filtered_df['curr_condition'] == selected_status]
-
-    # Import here to avoid circular imports
-    from layouts.layout_gallery import create_place_card
-
-    # Create cards for filtered places
-    place_cards = []
-    for _, place in filtered_df.iterrows():
-        if place['name'] and place['name'] != '':
-            slug = slug_map.get(place['name'])
-            if slug:
-                card = create_place_card(place, slug)
-                place_cards.append(card)
+def filter_gallery(selected_region, selected_status, prev_clicks, next_clicks, current_page):
+    """Build one page of gallery cards for the selected region and status."""
+    # Apply region and status filters on the precomputed positions
+    positions = catalog.gallery_positions_for(selected_region, selected_status)
+
+    # Move the page cursor on prev/next; any filter change starts again from the first page
+    trigger_id = callback_context.triggered[0]['prop_id'].split('.')[0]
+    page = current_page or 0
+    if trigger_id == 'gallery-prev-button':
+        page -= 1
+    elif trigger_id == 'gallery-next-button':
+        page += 1
+    else:
+        page = 0
+
+    total = len(positions)
+    last_page = max((total - 1) // GALLERY_PAGE_SIZE, 0)
+    page = min(max(page, 0), last_page)
+
+    # Only the cards for the visible page are built and sent
+    start = page * GALLERY_PAGE_SIZE
+    place_cards = create_place_cards(
+        catalog.places_at(positions[start : start + GALLERY_PAGE_SIZE]), slug_map
+    )
 
     # If no places found, show message
     if not place_cards:
-        return html.Div(
+        place_cards = html.Div(
             'No places match the selected filters.',
             className='no-results-message',
             style={'textAlign': 'center', 'padding': '2em', 'color': '#666'},
         )
 
-    return place_cards
+    return (
+        place_cards,
+        get_gallery_page_summary(page, total),
+        page == 0,
+        page >= last_page,
+        page,
+    )
 
 
 # -----------------------> "Guide Page"
@@ -330,8 +405,7 @@ def toggle_collapse_and_handle_search(
                 dash.no_update,
             )
 
-        matcher = LocationMatcher(all_streets)
-        result = matcher.find_region_district(city_input)
+        result = location_matcher.find_region_district(city_input)
         if isinstance(result, dict):
             # Valid result, update outputs
             city_details = [
@@ -379,6 +453,40 @@ def toggle_collapse_and_handle_search(
     )
 
 
+@app.callback(
+    Output('place-search-results', 'children'),
+    Input('place-search-input', 'value'),
+)
+def update_place_search(query):
+    """List places and articles matching the sidebar search, best match first."""
+    if not query or not query.strip():
+        return []
+
+    results = search_index.search(query, limit=SEARCH_RESULT_LIMIT)
+    if not results:
+        return html.P(f"No places or stories match '{query}'.", className='no-match-message')
+
+    items = []
+    for result in results:
+        meta = ' · '.join(value for value in (result['district'], result['region']) if value)
+        title = (
+            dcc.Link(result['name'], href=f"/gallery/{result['slug']}", className='search-result-link')
+            if result['slug']
+            else html.Span(result['name'], className='search-result-link')
+        )
+        items.append(
+            html.Div(
+                [
+                    title,
+                    html.Div(meta, className='search-result-meta') if meta else None,
+                    html.P(result['snippet'], className='search-result-snippet'),
+                ],
+                className='search-result',
+            )
+        )
+    return items
+
+
 @app.callback(
     [
         Output('district-dropdown', 'options'),
@@ -392,16 +500,8 @@ def toggle_collapse_and_handle_search(
     ],
 )
 def update_district_and_filters(selected_region, selected_district):
-    # Use dynamic geo_df for HK districts
-    geo_df_dynamic = district_df
-
     # Fetch district options based on the selected region.
-    districts = (
-        geo_df_dynamic[geo_df_dynamic['region'] == selected_region][['district', 'code']]
-        .drop_duplicates()
-        .to_dict('records')
-    )
-    district_options = [{'label': f'{d["district"]}', 'value': d['district']} for d in districts]
+    district_options = catalog.district_options(selected_region)
 
     # Places don't have star ratings, so always hide star filter
     # Return a placeholder list with all places visible
@@ -524,7 +624,7 @@ def update_sidebar(clickData, selected_district, selected_region, selected_stars
         return select_district_placeholder
 
     # Get place data
-    combined_data = all_streets
+    combined_data = catalog.places
 
     # Determine which input triggered the callback
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
@@ -533,7 +633,7 @@ def update_sidebar(clickData, selected_district, selected_region, selected_stars
     if triggered_id == 'map-display':
         if clickData and 'points' in clickData and len(clickData['points']) > 0:
             point = clickData['points'][0]
-            place_index = point.get('meta') or point.get('customdata')
+            place_index = point.get('customdata')
 
             if place_index in combined_data.index:
                 place_info = combined_data.loc[place_index]
@@ -546,7 +646,10 @@ def update_sidebar(clickData, selected_district, selected_region, selected_stars
 
 
 @app.callback(
-    Output('map-display', 'figure'),
+    [
+        Output('map-display', 'figure'),
+        Output('map-outline-store', 'data'),
+    ],
     [
         Input('district-dropdown', 'value'),
         Input('region-dropdown', 'value'),
@@ -555,6 +658,8 @@ def update_sidebar(clickData, selected_district, selected_region, selected_stars
     [
         State('map-view-store-mainpage', 'data'),
         State('district-centroid-store', 'data'),
+        State('map-outline-store', 'data'),
+        State('condition-filter', 'value'),
     ],
 )
 def update_map(
@@ -563,46 +668,209 @@ def update_map(
     selected_stars,
     mapview_data,
     district_viewdata,
+    current_state,
+    visible_conditions,
 ):
-    ctx = callback_context
-    triggered_id, _ = ctx.triggered[0]['prop_id'].split('.') if ctx.triggered else (None, None)
+    # Views depend only on the dropdowns, so repeat views come straight from the cache
+    view, outline_state = build_map_view(selected_district, selected_region, DATA_VERSION)
+    visible = MAP_CONDITIONS if visible_conditions is None else visible_conditions
 
-    # Use HK place data
-    place_data = all_streets
-    geo_df_dynamic = district_df
-    district_to_code_dynamic = (
-        geo_df_dynamic.drop_duplicates(subset='district').set_index('district')['code'].to_dict()
+    # A new view recentres the map, so its markers are those of the view's own zoom and centre
+    markers, signature = place_clusters.markers(
+        view['district'], view['zoom'], view['center'], visible
     )
+    if (current_state or {}).get('fixed_traces'):
+        # The browser already holds the map's traces: only their data and the view change
+        layers = map_tile_layers(visible, show_places=view['district'] is None)
+        figure = map_view_patch(view, markers, layers)
+    else:
+        # First render of the map on this page: send the complete figure
+        figure = json.loads(
+            build_map_figure(
+                selected_district,
+                selected_region,
+                tuple(sorted(visible)),
+                DATA_VERSION,
+                public_base_url() if MAP_VECTOR_TILES or MAP_LOCAL_BASEMAP else None,
+            )
+        )
+    return figure, {**outline_state, 'markers': signature, 'fixed_traces': True}
+
+
+@cache.memoize()
+def build_map_figure(
+    selected_district, selected_region, visible_conditions, data_version, base_url=None
+):
+    """
+    Complete map figure for a dropdown state and condition filter, serialized as JSON (with the
+    vector tile layers and local basemap, when enabled, served from base_url).
+    """
+    view, _ = build_map_view(selected_district, selected_region, data_version)
+    markers, _ = place_clusters.markers(
+        view['district'], view['zoom'], view['center'], visible_conditions
+    )
+    show_places = view['district'] is None
+    layers = map_tile_layers(visible_conditions, show_places, base_url) if base_url else None
+    style = f'{base_url}/basemap/style.json' if MAP_LOCAL_BASEMAP else MAP_STYLE
+    return json.dumps(map_view_figure(view, markers, layers, style))
+
 
+def public_base_url():
+    """
+    Absolute URL the browser reaches this server at, for the tile and basemap URLs in map
+    figures (the map loads them in a web worker, where relative URLs do not resolve).
+    """
+    if MAP_TILES_BASE_URL:
+        return MAP_TILES_BASE_URL.rstrip('/')
+    scheme = request.headers.get('X-Forwarded-Proto', request.scheme).split(',')[0].strip()
+    return f'{scheme}://{request.host}'
+
+
+def map_tile_layers(visible_conditions, show_places, base_url=None):
+    """
+    Vector tile layers of the map, or None when MAP_VECTOR_TILES is off. Places are drawn from
+    tiles in the overviews only; a selected district shows its places as markers.
+    """
+    if not MAP_VECTOR_TILES:
+        return None
+    base_url = base_url or public_base_url()
+    return tile_layers(
+        base_url + vector_tiles.url_template('places'),
+        base_url + vector_tiles.url_template('districts'),
+        visible_conditions,
+        show_places,
+    )
+
+
+@cache.memoize()
+def build_map_view(selected_district, selected_region, data_version):
+    """
+    Build the explore map contents for a dropdown state.
+
+    Parameters:
+        selected_district (str or None): Selected district name
+        selected_region (str or None): Selected region name
+        data_version (str): Fingerprint of the loaded datasets (part of the cache key)
+
+    Returns:
+        tuple: (map view, see utils.appFunctions.district_map_view; outline state for
+            map-outline-store)
+    """
     # Case 1: District selected - show all places
     if selected_district:
-        district_code = district_to_code_dynamic.get(selected_district)
+        district_code = catalog.district_to_code.get(selected_district)
 
-        # Calculate centroid inline to ensure we zoom to the NEWLY selected district
+        # Use the NEWLY selected district's centroid
         # (ignoring district_viewdata which might be stale due to callback race conditions)
-        filtered_geo = geo_df_dynamic[geo_df_dynamic['code'] == str(district_code)]
-        if not filtered_geo.empty:
-            centroid = filtered_geo['geometry'].iloc[0].centroid
-            view_data = {'zoom': 13, 'center': {'lat': centroid.y, 'lon': centroid.x}}
-        else:
-            view_data = {}
+        view_data = catalog.district_view(district_code)
 
-        return plot_interactive_district(
-            place_data,
-            geo_df_dynamic,
+        view = district_map_view(
+            catalog.places_in_district(district_code),
+            catalog.district_frame(district_code)['geometry'].iloc[0],
             district_code,
             view_data,
+            district_outlines,
         )
+        # Remember which outline is drawn so zooming can swap its level of detail
+        outline_state = {
+            'code': str(district_code),
+            'level': detail_level_for_zoom(view_data.get('zoom', 14.5)),
+        }
+        return view, outline_state
 
     # Case 2: Handle region selection - center only (no outlines)
-    if selected_region or triggered_id == 'region-dropdown':
-        region_name = region_to_name.get(selected_region)
-        if region_name:
-            # Center the map on the region centroid without drawing boundaries
-            return plot_region_center_view(district_df, region_name)
+    region_name = region_to_name.get(selected_region)
+    if region_name:
+        # Center the map on the region centroid without drawing boundaries
+        return region_map_view(catalog.districts, region_name), {}
 
     # Default fallback case: Show entire Hong Kong map
-    return default_map_figure()
+    return empty_map_view(HONG_KONG_VIEW, 'Hong Kong'), {}
+
+
+@app.callback(
+    [
+        Output('map-display', 'figure', allow_duplicate=True),
+        Output('map-outline-store', 'data', allow_duplicate=True),
+    ],
+    Input('map-view-store-mainpage', 'data'),
+    [
+        State('map-outline-store', 'data'),
+        State('condition-filter', 'value'),
+    ],
+    prevent_initial_call=True,
+)
+def update_map_detail(mapview_data, outline_state, visible_conditions):
+    """
+    Follow zooming and panning: swap the district outline for the level of detail matching the
+    zoom and recluster the markers for the new viewport. Only what changed is sent.
+    """
+    if not mapview_data or mapview_data.get('zoom') is None or not mapview_data.get('center'):
+        raise PreventUpdate
+    if not (outline_state or {}).get('code'):  # No district on the map
+        raise PreventUpdate
+
+    patched_figure = Patch()
+    new_state = dict(outline_state)
+
+    level = detail_level_for_zoom(mapview_data['zoom'])
+    if level != outline_state.get('level'):
+        # The outline trace is always the first one
+        lons, lats = district_outlines.outline(outline_state['code'], level)
+        patched_figure['data'][0]['lon'] = lons
+        patched_figure['data'][0]['lat'] = lats
+        new_state['level'] = level
+
+    visible = MAP_CONDITIONS if visible_conditions is None else visible_conditions
+    markers, signature = place_clusters.markers(
+        outline_state['code'], mapview_data['zoom'], mapview_data['center'], visible
+    )
+    if signature != outline_state.get('markers'):
+        marker_patch(markers, patched_figure)
+        new_state['markers'] = signature
+
+    if new_state == outline_state:
+        raise PreventUpdate
+    return patched_figure, new_state
+
+
+@app.callback(
+    [
+        Output('map-display', 'figure', allow_duplicate=True),
+        Output('map-outline-store', 'data', allow_duplicate=True),
+    ],
+    Input('condition-filter', 'value'),
+    [
+        State('map-outline-store', 'data'),
+        State('map-view-store-mainpage', 'data'),
+    ],
+    prevent_initial_call=True,
+)
+def filter_map_conditions(visible_conditions, outline_state, mapview_data):
+    """
+    Show only the places with the selected conditions (replaces the marker trace data, and the
+    visibility of the places tile layers, only).
+    """
+    if not (outline_state or {}).get('fixed_traces'):
+        raise PreventUpdate  # The first full render reads the filter itself
+    code = outline_state.get('code')
+    if not code and not MAP_VECTOR_TILES:
+        raise PreventUpdate  # No district, so no markers
+
+    visible = visible_conditions or []
+    patched_figure = Patch()
+    if code:
+        # Current view, or the district's default one until the user zooms or pans
+        view = mapview_data if (mapview_data or {}).get('center') else None
+        view = view or catalog.district_view(code)
+        markers, signature = place_clusters.markers(code, view['zoom'], view['center'], visible)
+        marker_patch(markers, patched_figure)
+        outline_state = {**outline_state, 'markers': signature}
+
+    layers = map_tile_layers(visible, show_places=not code)
+    if layers is not None:
+        patched_figure['layout']['map']['layers'] = layers
+    return patched_figure, outline_state
 
 
 @app.callback(
@@ -613,32 +881,39 @@ def calculate_district_centroid(selected_district, selected_region):
     if not selected_district:
         return {}
 
-    # Get HK districts geo data
-    geo_df_dynamic = district_df
-
-    # Generate district_to_code dynamically
-    district_to_code_dynamic = (
-        geo_df_dynamic.drop_duplicates(subset='district').set_index('district')['code'].to_dict()
-    )
-    district_code = district_to_code_dynamic.get(selected_district)
-
+    district_code = catalog.district_to_code.get(selected_district)
     if not district_code:
         return {}
 
-    filtered_geo = geo_df_dynamic[geo_df_dynamic['code'] == str(district_code)]
-    if filtered_geo.empty:
-        return {}
+    # Hong Kong districts use a standard zoom level (precomputed with the centroid)
+    return catalog.district_view(district_code)
 
-    specific_geometry = filtered_geo['geometry'].iloc[0]
-    centroid = specific_geometry.centroid
 
-    # Hong Kong districts use a standard zoom level
-    zoom_level = 13
+# Keep the user's zoom/center in the store; reset when region or district changes
+app.clientside_callback(
+    """
+    function(relayoutData, selectedRegion, selectedDistrict, existingData) {
+        const ctx = window.dash_clientside.callback_context;
+        const triggeredInput = ctx.triggered.length ? ctx.triggered[0].prop_id.split('.')[0] : null;
 
-    return {'zoom': zoom_level, 'center': {'lat': centroid.y, 'lon': centroid.x}}
+        if (triggeredInput === 'region-dropdown' || triggeredInput === 'district-dropdown') {
+            return {};
+        }
 
+        // Only user interactions (zoom or pan) update the store
+        if (!relayoutData || !('map.zoom' in relayoutData || 'map.center' in relayoutData)) {
+            throw window.dash_clientside.PreventUpdate;
+        }
 
-@app.callback(
+        const data = existingData || {};
+        const zoom = 'map.zoom' in relayoutData ? relayoutData['map.zoom'] : data.zoom;
+        const center = 'map.center' in relayoutData ? relayoutData['map.center'] : data.center;
+        if (zoom === undefined || zoom === null || center === undefined || center === null) {
+            throw window.dash_clientside.PreventUpdate;
+        }
+        return Object.assign({}, data, {zoom: zoom, center: center});
+    }
+    """,
     Output('map-view-store-mainpage', 'data'),
     [
         Input('map-display', 'relayoutData'),
@@ -647,46 +922,31 @@ def calculate_district_centroid(selected_district, selected_region):
     ],
     [State('map-view-store-mainpage', 'data')],
 )
-def store_map_view_mainpage(relayout_data, selected_region, selected_district, existing_data):
-    # Initialize existing_data if it's None
-    if existing_data is None:
-        existing_data = {}
-
-    # Reset zoom data when region or district changes
-    ctx = dash.callback_context
-    triggered_input = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
-
-    if triggered_input in ['region-dropdown', 'district-dropdown']:
-        return {}
-
-    # If relayoutData is None or empty, do not update the store
-    if not relayout_data:
-        raise dash.exceptions.PreventUpdate
-
-    # Define the keys that indicate a user interaction
-    user_interaction_keys = {'map.zoom', 'map.center'}
-
-    # Check if relayoutData contains any of the user interaction keys
-    if user_interaction_keys.intersection(relayout_data.keys()):
-        # Extract zoom and center from relayoutData
-        zoom = relayout_data.get('map.zoom', existing_data.get('zoom'))
-        center = relayout_data.get('map.center', existing_data.get('center'))
-
-        if zoom is not None and center is not None:
-            # Update the existing_data with new zoom and center
-            existing_data['zoom'] = zoom
-            existing_data['center'] = center
-
-            return existing_data
-
-    # If no user interaction keys are present, prevent updating the store
-    raise dash.exceptions.PreventUpdate
 
 
 # -----------------------> "Chat Widget"
 
 
-@app.callback(
+# Toggle chat window open/closed
+app.clientside_callback(
+    """
+    function(toggleClicks, closeClicks, isOpen) {
+        const ctx = window.dash_clientside.callback_context;
+        const closed = [{display: 'none'}, {display: 'flex'}, false];
+        if (!ctx.triggered.length) {
+            // Initial state: closed
+            return closed;
+        }
+
+        const triggerId = ctx.triggered[0].prop_id.split('.')[0];
+        if (triggerId === 'chat-toggle-button') {
+            return [{display: 'flex'}, {display: 'none'}, true];
+        } else if (triggerId === 'chat-close-button') {
+            return closed;
+        }
+        throw window.dash_clientside.PreventUpdate;
+    }
+    """,
     [
         Output('chat-window', 'style'),
         Output('chat-toggle-button', 'style'),
@@ -698,40 +958,10 @@ def store_map_view_mainpage(relayout_data, selected_region, selected_district, e
     ],
     [State('chat-is-open-store', 'data')],
 )
-def toggle_chat_window(toggle_clicks, close_clicks, is_open):
-    """Toggle chat window open/closed."""
-    ctx = callback_context
-    if not ctx.triggered:
-        # Initial state: closed
-        return (
-            {'display': 'none'},
-            {'display': 'flex'},
-            False,
-        )
-
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    if trigger_id == 'chat-toggle-button':
-        # Toggle button clicked - open chat
-        return (
-            {'display': 'flex'},
-            {'display': 'none'},
-            True,
-        )
-    elif trigger_id == 'chat-close-button':
-        # Close button clicked - close chat
-        return (
-            {'display': 'none'},
-            {'display': 'flex'},
-            False,
-        )
-
-    # Default: no change
-    raise PreventUpdate
 
 
-def create_thinking_indicator():
-    """Create animated thinking dots indicator."""
+def create_thinking_indicator(reply_id):
+    """Create animated thinking dots indicator, tagged with the id of the reply it waits for."""
     return html.Div(
         [
             html.Div(
@@ -743,29 +973,25 @@ def create_thinking_indicator():
                             html.Span(),
                         ],
                         className='chat-thinking-dots',
-                    )
+                    ),
+                    # Filled in token by token when streaming is enabled
+                    html.Span(className='chat-stream-text'),
                 ],
                 className='chat-message chat-message-assistant chat-message-thinking',
             )
         ],
+        id=f'chat-thinking-{reply_id}',
         className='chat-message-wrapper',
+        disable_n_clicks=True,  # Clicks would change the component and break Patch.remove()
     )
 
 
-def build_message_components(conversation_history):
-    """Build message components from conversation history."""
-    message_components = []
-    for msg in conversation_history:
-        role = msg.get('role', 'user')
-        content = msg.get('content', '')
-        message_class = 'chat-message-user' if role == 'user' else 'chat-message-assistant'
-        message_components.append(
-            html.Div(
-                [html.P(content, className=f'chat-message {message_class}')],
-                className='chat-message-wrapper',
-            )
-        )
-    return message_components
+def build_message_component(content, message_class):
+    """Build one chat bubble (message_class: chat-message-user, -assistant or -error)."""
+    return html.Div(
+        [html.P(content, className=f'chat-message {message_class}')],
+        className='chat-message-wrapper',
+    )
 
 
 @app.callback(
@@ -774,19 +1000,18 @@ def build_message_components(conversation_history):
         Output('chat-input', 'value'),
         Output('chat-pending-message-store', 'data'),
         Output('chat-conversation-store', 'data', allow_duplicate=True),
+        Output('chat-job-store', 'data', allow_duplicate=True),
+        Output('chat-job-poll', 'disabled', allow_duplicate=True),
     ],
     [
         Input('chat-send-button', 'n_clicks'),
         Input('chat-clear-button', 'n_clicks'),
         Input('chat-input', 'n_submit'),  # Enter key support
     ],
-    [
-        State('chat-input', 'value'),
-        State('chat-conversation-store', 'data'),
-    ],
+    [State('chat-input', 'value'), State('chat-pending-message-store', 'data')],
     prevent_initial_call=True,
 )
-def handle_chat_send(send_clicks, clear_clicks, enter_submit, input_value, conversation_history):
+def handle_chat_send(send_clicks, clear_clicks, enter_submit, input_value, pending_message):
     """Handle sending chat messages - shows user message immediately with thinking indicator."""
     ctx = callback_context
 
@@ -797,73 +1022,79 @@ def handle_chat_send(send_clicks, clear_clicks, enter_submit, input_value, conve
 
     # Handle clear button
     if trigger_id == 'chat-clear-button':
-        welcome_message = html.Div(
-            [
-                html.Div(
-                    [
-                        html.P(
-                            "Chat cleared. How can I help you learn about Hong Kong's history?",
-                            className='chat-message chat-message-assistant',
-                        )
-                    ],
-                    className='chat-message-wrapper',
-                )
-            ]
+        welcome_message = build_message_component(
+            "Chat cleared. How can I help you learn about Hong Kong's history?",
+            'chat-message-assistant',
         )
-        return welcome_message, '', None, []
+        # Also forget (and stop polling for) a reply still being computed
+        return [welcome_message], '', None, [], None, True
 
     # Handle send button or Enter key
     if trigger_id in ['chat-send-button', 'chat-input']:
         if not input_value or not input_value.strip():
             raise PreventUpdate
-
-        # Initialize conversation history if needed
-        if conversation_history is None:
-            conversation_history = []
+        if pending_message:
+            raise PreventUpdate  # One reply at a time (Enter while the send button is disabled)
 
         user_message = input_value.strip()
+        reply_id = uuid.uuid4().hex
 
-        # Build message components with existing messages + new user message
-        message_components = build_message_components(conversation_history)
-
-        # Add current user message
-        message_components.append(
-            html.Div(
-                [html.P(user_message, className='chat-message chat-message-user')],
-                className='chat-message-wrapper',
-            )
-        )
-
-        # Add thinking indicator
-        message_components.append(create_thinking_indicator())
+        # Append the user message and a thinking indicator to the transcript; only the new
+        # bubbles travel to the browser, not the whole conversation
+        messages = Patch()
+        messages.append(build_message_component(user_message, 'chat-message-user'))
+        messages.append(create_thinking_indicator(reply_id))
 
         # Update conversation history with user message
-        updated_history = conversation_history + [{'role': 'user', 'content': user_message}]
+        history = Patch()
+        history.append({'role': 'user', 'content': user_message})
 
-        # Return immediately with user message + thinking indicator
-        # Store user message to trigger AI callback
         return (
-            html.Div(message_components, id='chat-messages-list'),
+            messages,
             '',  # Clear input
-            user_message,  # Store message to trigger AI callback
-            updated_history,  # Update history with user message
+            {'id': reply_id, 'message': user_message},  # Trigger AI callback
+            history,
+            dash.no_update,
+            dash.no_update,
         )
 
     raise PreventUpdate
 
 
-@app.callback(
-    [
-        Output('chat-messages-container', 'children', allow_duplicate=True),
-        Output('chat-conversation-store', 'data'),
-        Output('chat-pending-message-store', 'data', allow_duplicate=True),
-    ],
-    [Input('chat-pending-message-store', 'data')],
-    [State('chat-conversation-store', 'data')],
-    prevent_initial_call=True,
-)
-def handle_ai_response(pending_message, conversation_history):
-    """Handle AI response - triggered when pending message is set."""
+def show_ai_reply(reply, pending_message):
+    """
+    Swap the thinking indicator for the AI response (or error).
+
+    Replies are matched to the pending message by id: a reply arriving after the chat was
+    cleared, or for an earlier message, is dropped.
+    """
+    if not reply or not pending_message or reply.get('id') != pending_message['id']:
+        raise PreventUpdate
+
+    messages = Patch()
+    messages.remove(create_thinking_indicator(reply['id']))
+
+    if reply['success']:
+        # Add AI response to history and display
+        history = Patch()
+        history.append({'role': 'assistant', 'content': reply['message']})
+        messages.append(build_message_component(reply['message'], 'chat-message-assistant'))
+    else:
+        # Show error message but don't add to history
+        history = dash.no_update
+        messages.append(build_message_component(reply['message'], 'chat-message-error'))
+
+    return (
+        messages,
+        history,
+        None,  # Clear pending message
+        None,  # Stop polling for a background job
+        True,
+    )
+
+
+def start_ai_job(pending_message, conversation_history):
+    """Start computing the AI response in the background and begin polling for it."""
     if not pending_message:
         raise PreventUpdate
 
@@ -871,49 +1102,238 @@ def handle_ai_response(pending_message, conversation_history):
     if conversation_history is None:
         conversation_history = []
 
-    # Get AI response
-    ai_response = get_ai_response(pending_message, conversation_history)
+    # The DeepSeek call runs on the job pool, so this worker is free for other requests
+    job_id = chat_jobs.submit(get_ai_response, pending_message['message'], conversation_history)
+    job = {'id': job_id, 'reply_id': pending_message['id'], 'submitted': time.time()}
+    return job, False
 
-    # Build message components (without thinking indicator)
-    message_components = build_message_components(conversation_history)
 
-    if ai_response['success']:
-        # Add AI response to history
-        updated_history = conversation_history + [
-            {'role': 'assistant', 'content': ai_response['message']}
-        ]
-        # Add AI message to display
-        message_components.append(
-            html.Div(
-                [
-                    html.P(
-                        ai_response['message'],
-                        className='chat-message chat-message-assistant',
-                    )
-                ],
-                className='chat-message-wrapper',
-            )
+def collect_ai_job(n_intervals, job):
+    """Hand the AI response to show_ai_reply once its background job has finished."""
+    if not job:
+        raise PreventUpdate
+
+    ai_response = chat_jobs.result(job['id'])
+    if ai_response is None:
+        if time.time() - job['submitted'] < CHAT_JOB_TIMEOUT:
+            raise PreventUpdate  # Still running
+        ai_response = {
+            'success': False,
+            'message': 'Sorry, the response took too long. Please try again.',
+            'error': 'Job timed out',
+        }
+
+    # Polling stops once the reply is shown; until then a repeated poll returns it again
+    return {**ai_response, 'id': job['reply_id']}
+
+
+@server.route('/api/chat/stream', methods=['POST'])
+def stream_chat():
+    """Server-sent events endpoint streaming the AI reply for the chat widget."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    message = payload.get('message')
+    if not isinstance(message, str) or not message.strip():
+        return jsonify({'error': 'Empty message'}), 400
+    history = payload.get('history') or []
+    if not isinstance(history, list):
+        return jsonify({'error': 'History must be a list'}), 400
+
+    # Validate before streaming: once the 200 headers are sent, an error can only cut the stream
+    message = message.strip()
+    history = [
+        {'role': item['role'], 'content': item['content']}
+        for item in history
+        if isinstance(item, dict)
+        and item.get('role') in ('user', 'assistant')
+        and isinstance(item.get('content'), str)
+    ]
+
+    def generate():
+        for event in stream_ai_response(message, history):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@server.route('/api/search')
+def search_places():
+    """
+    JSON full-text search over places and articles.
+
+    Query parameters: q (search text) and limit (default SEARCH_RESULT_LIMIT). Results are
+    BM25-ranked and include the place slug, district, region, score and a text snippet.
+    """
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', SEARCH_RESULT_LIMIT, type=int), SEARCH_MAX_LIMIT)
+    started = time.perf_counter()
+    results = search_index.search(query, limit=max(limit, 1)) if query else []
+    return jsonify(
+        {
+            'query': query,
+            'took_ms': round((time.perf_counter() - started) * 1000, 3),
+            'results': results,
+        }
+    )
+
+
+@server.route('/tiles/<layer>/<int:z>/<int:x>/<int:y>')
+def serve_tile(layer, z, x, y):
+    """Mapbox Vector Tile of places or district polygons (see utils.vectorTiles)."""
+    response = vector_tiles.response(layer, z, x, y, request)
+    if response is None:
+        abort(404)
+    return response
+
+
+@server.route('/basemap/style.json')
+def basemap_style():
+    """Positron basemap style with its tiles, fonts and sprites served by this server."""
+    data = json.dumps(basemap.style(public_base_url())).encode('utf-8')
+    response = basemap.response(data, 'application/json', request)
+    response.cache_control.max_age = None
+    response.cache_control.no_cache = True  # Revalidate; the host is part of the content
+    return response
+
+
+@server.route('/basemap/tiles/<int:z>/<int:x>/<int:y>.pbf')
+def basemap_tile(z, x, y):
+    """Basemap vector tile, proxied and cached on disk (see utils.basemapTiles)."""
+    data = basemap.tile(z, x, y)
+    if data is None:
+        abort(404)
+    return basemap.response(data, 'application/x-protobuf', request)
+
+
+@server.route('/basemap/fonts/<fontstack>/<glyph_range>.pbf')
+def basemap_font(fontstack, glyph_range):
+    """Basemap label glyphs, proxied and cached on disk."""
+    data = basemap.font(fontstack, glyph_range)
+    if data is None:
+        abort(404)
+    return basemap.response(data, 'application/x-protobuf', request)
+
+
+@server.route('/basemap/sprite<suffix>')
+def basemap_sprite(suffix):
+    """Basemap icon sprite (sheet or index), proxied and cached on disk."""
+    data = basemap.sprite(suffix)
+    if data is None:
+        abort(404)
+    mimetype = 'application/json' if suffix.endswith('.json') else 'image/png'
+    return basemap.response(data, mimetype, request)
+
+
+@server.route('/api/basemap/stats')
+def basemap_stats():
+    """Basemap proxy counters (disk cache hits, upstream fetches and failures) for this worker."""
+    return jsonify({'pid': os.getpid(), **basemap.stats()})
+
+
+@server.route('/api/tiles/stats')
+def tile_stats():
+    """Tiles served from memory and disk and tiles rendered by this worker."""
+    return jsonify({'pid': os.getpid(), **vector_tiles.stats()})
+
+
+@server.route('/api/chat/cache-stats')
+def chat_cache_stats():
+    """Answer cache counters (hit rate, API latency and tokens saved) for this worker."""
+    return jsonify({'pid': os.getpid(), **answer_cache.stats()})
+
+
+@server.route('/api/chat/prompt-stats')
+def chat_prompt_stats():
+    """Prompt sizes sent to the API (estimated tokens, history compaction) for this worker."""
+    return jsonify({'pid': os.getpid(), **prompt_stats.stats()})
+
+
+@server.route('/api/chat/job-stats')
+def chat_job_stats():
+    """Background chat jobs (running, completed, replies kept) for this worker."""
+    return jsonify({'pid': os.getpid(), **chat_jobs.stats()})
+
+
+# Browser cache lifetime for original models (revalidated with ETags afterwards)
+MODEL_MAX_AGE = 3600
+
+
+@server.route('/models/<path:filename>')
+def serve_model(filename):
+    """
+    Serve GLB models with byte-range and conditional request support.
+
+    LOD variants built by utils.modelDerivatives carry a content hash in their name and are
+    cached for a year; the originals in assets/3d-models are cached briefly and revalidated.
+    """
+    if not filename.endswith('.glb'):
+        abort(404)
+    if (MODEL_DERIVATIVES_DIR / filename).is_file():
+        response = send_from_directory(
+            MODEL_DERIVATIVES_DIR, filename, conditional=True, max_age=365 * 24 * 3600
         )
+        response.cache_control.immutable = True
     else:
-        # Show error message but don't add to history
-        updated_history = conversation_history
-        message_components.append(
-            html.Div(
-                [
-                    html.P(
-                        ai_response['message'],
-                        className='chat-message chat-message-error',
-                    )
-                ],
-                className='chat-message-wrapper',
-            )
+        response = send_from_directory(
+            MODELS_DIR, filename, conditional=True, max_age=MODEL_MAX_AGE
         )
+    response.accept_ranges = 'bytes'  # Advertise ranges so viewers can resume partial downloads
+    return response
 
-    return (
-        html.Div(message_components, id='chat-messages-list'),
-        updated_history,
-        None,  # Clear pending message
+
+if CHAT_STREAMING:
+    # Stream tokens into the thinking bubble (assets/chat_stream.js), which then sets the reply
+    app.clientside_callback(
+        ClientsideFunction(namespace='chat', function_name='streamResponse'),
+        Output('chat-reply-store', 'data'),
+        Input('chat-pending-message-store', 'data'),
+        State('chat-conversation-store', 'data'),
+        prevent_initial_call=True,
     )
+else:
+    # Compute the reply as a background job and poll for it (see utils.chatJobs)
+    app.callback(
+        [Output('chat-job-store', 'data'), Output('chat-job-poll', 'disabled')],
+        [Input('chat-pending-message-store', 'data')],
+        [State('chat-conversation-store', 'data')],
+        prevent_initial_call=True,
+    )(start_ai_job)
+    app.callback(
+        Output('chat-reply-store', 'data'),
+        [Input('chat-job-poll', 'n_intervals')],
+        [State('chat-job-store', 'data')],
+        prevent_initial_call=True,
+    )(collect_ai_job)
+
+app.callback(
+    [
+        Output('chat-messages-container', 'children', allow_duplicate=True),
+        Output('chat-conversation-store', 'data'),
+        Output('chat-pending-message-store', 'data', allow_duplicate=True),
+        Output('chat-job-store', 'data', allow_duplicate=True),
+        Output('chat-job-poll', 'disabled', allow_duplicate=True),
+    ],
+    [Input('chat-reply-store', 'data')],
+    [State('chat-pending-message-store', 'data')],
+    prevent_initial_call=True,
+)(show_ai_reply)
+
+
+# Only one message waits for a reply at a time
+app.clientside_callback(
+    """
+    function(pendingMessage) {
+        return Boolean(pendingMessage);
+    }
+    """,
+    Output('chat-send-button', 'disabled'),
+    Input('chat-pending-message-store', 'data'),
+)
 
 
 # Auto-scroll chat messages to bottom
@@ -0,0 +1,90 @@
+"""
+Gunicorn Configuration
+Production profile: the app and its datasets are loaded once in the master and shared with the
+workers copy-on-write
+
+Usage:
+    gunicorn -c gunicorn.conf.py cyber_wc_app:server
+    GUNICORN_PROFILE=chat gunicorn -c gunicorn.conf.py cyber_wc_app:server
+
+Settings can be overridden with GUNICORN_WORKERS, GUNICORN_THREADS and GUNICORN_PRELOAD=0
+(or the usual gunicorn command-line flags). CACHE_BACKEND defaults to 'shm' here, and the
+per-process 'simple' cache is refused with more than one worker.
+"""
+
+import gc
+import os
+
+from utils.processMemory import available_cpus, format_memory, memory_usage
+
+CPUS = available_cpus()
+
+# Worker/thread presets
+#   chat:     I/O-bound, most time is spent waiting on DeepSeek; few processes, many threads
+#   figures:  CPU-bound map and figure building; one single-threaded process per core (+1)
+#   balanced: a bit of both (default)
+PRESETS = {
+    'chat': {'worker_class': 'gthread', 'workers': max(2, round(CPUS)), 'threads': 16},
+    'figures': {'worker_class': 'sync', 'workers': round(CPUS) + 1, 'threads': 1},
+    'balanced': {'worker_class': 'gthread', 'workers': round(CPUS) + 1, 'threads': 4},
+}
+PROFILE = os.getenv('GUNICORN_PROFILE', 'balanced')
+if PROFILE not in PRESETS:
+    raise RuntimeError(f"Unknown GUNICORN_PROFILE {PROFILE!r} (use {', '.join(PRESETS)})")
+preset = PRESETS[PROFILE]
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8050')}"
+workers = int(os.getenv('GUNICORN_WORKERS', preset['workers']))
+threads = int(os.getenv('GUNICORN_THREADS', preset['threads']))
+worker_class = preset['worker_class'] if threads == 1 else 'gthread'
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Chat job results (and cached figures) must be visible to every worker: a poll can reach any
+# of them. Set before the app (and so utils.sharedCache) is imported, in the master or workers
+os.environ.setdefault('CACHE_BACKEND', 'shm')
+
+# Import cyber_wc_app (CSV, GeoJSON, outlines, search index, ...) once in the master
+preload_app = os.getenv('GUNICORN_PRELOAD', '1').lower() not in ('0', 'false', 'no')
+
+
+def on_starting(server):
+    """Refuse a per-process cache when requests are spread over several workers."""
+    backend = os.environ['CACHE_BACKEND'].lower()
+    if server.num_workers > 1 and backend == 'simple':
+        raise RuntimeError(
+            f"CACHE_BACKEND {backend!r} is per process, but gunicorn runs {server.num_workers} "
+            "workers: chat job polls reaching another worker would never see the reply "
+            "(use 'shm', 'filesystem' or 'redis', or GUNICORN_WORKERS=1)"
+        )
+
+
+def when_ready(server):
+    """Freeze everything loaded so far before the first worker is forked."""
+    if preload_app:
+        # Move all live objects to the permanent generation: the collector then never writes
+        # to their headers, so the pages holding the datasets stay shared with the workers
+        gc.collect()
+        gc.freeze()
+    server.log.info(
+        'Profile %s: %d worker(s) x %d thread(s) (%s), preload %s, cache %s; master %s',
+        PROFILE,
+        server.num_workers,
+        threads,
+        worker_class,
+        'on' if preload_app else 'off',
+        os.environ['CACHE_BACKEND'],
+        format_memory(memory_usage()),
+    )
+
+
+def post_worker_init(worker):
+    """Log what a freshly booted worker costs (private memory is what it adds)."""
+    worker.log.info('Worker %s ready: %s', worker.pid, format_memory(memory_usage()))
+
+
+def worker_exit(server, worker):
+    """Log what the worker grew to while serving (compare with its 'ready' line)."""
+    if os.getpid() == worker.pid:  # Also called in the master for workers that already died
+        worker.log.info('Worker %s exiting: %s', worker.pid, format_memory(memory_usage()))
@@ -6,6 +6,9 @@ Shows all historic Hong Kong places in a card grid format
 from dash import html, dcc
 from .layout_main import get_header_with_buttons, condition_color_map
 
+# Number of place cards built and sent per gallery page
+GALLERY_PAGE_SIZE = 12
+
 
 def create_place_card(place_data, slug):
     """
@@ -104,14 +107,94 @@ def create_place_card(place_data, slug):
     return card
 
 
-def get_gallery_layout(places_df, slug_map):
+def create_place_cards(places_df, slug_map):
     """
-    Create the main gallery layout with all place cards.
+    Create cards for the given places, skipping rows without a name or slug.
 
     Parameters:
-        places_df (pd.DataFrame): DataFrame containing all places
+        places_df (pd.DataFrame): Places to render (typically one page)
         slug_map (dict): Mapping of place names to slugs
 
+    Returns:
+        list: Card components
+    """
+    place_cards = []
+    for _, place in places_df.iterrows():
+        if place['name'] and place['name'] != '':  # Skip empty rows
+            slug = slug_map.get(place['name'])
+            if slug:
+                place_cards.append(create_place_card(place, slug))
+    return place_cards
+
+
+def get_gallery_page_summary(page, total, page_size=GALLERY_PAGE_SIZE):
+    """
+    Describe which places are shown on a gallery page.
+
+    Parameters:
+        page (int): Zero-based page number
+        total (int): Number of places matching the filters
+        page_size (int): Cards per page
+
+    Returns:
+        str: Summary such as 'Showing 1-12 of 15 places'
+    """
+    if total == 0:
+        return ''
+    first = page * page_size + 1
+    last = min((page + 1) * page_size, total)
+    return f'Showing {first}-{last} of {total} places'
+
+
+def get_gallery_pagination(total, page_size=GALLERY_PAGE_SIZE):
+    """
+    Create the pagination controls for the first gallery page.
+
+    Parameters:
+        total (int): Number of places in the gallery
+        page_size (int): Cards per page
+
+    Returns:
+        html.Div: Previous/next buttons with the page summary
+    """
+    return html.Div(
+        [
+            html.Button(
+                '← Previous',
+                id='gallery-prev-button',
+                className='gallery-page-button',
+                n_clicks=0,
+                disabled=True,
+            ),
+            html.Span(
+                get_gallery_page_summary(0, total, page_size),
+                id='gallery-page-info',
+                className='gallery-page-info',
+            ),
+            html.Button(
+                'Next →',
+                id='gallery-next-button',
+                className='gallery-page-button',
+                n_clicks=0,
+                disabled=total <= page_size,
+            ),
+            # Current page cursor, sent back with every page request
+            dcc.Store(id='gallery-page-store', data=0),
+        ],
+        className='gallery-pagination',
+    )
+
+
+def get_gallery_layout(places_df, slug_map, total=None):
+    """
+    Create the main gallery layout with the first page of place cards.
+
+    Parameters:
+        places_df (pd.DataFrame): DataFrame containing the places (at least the first page)
+        slug_map (dict): Mapping of place names to slugs
+        total (int, optional): Number of places in the gallery, if places_df only holds the
+            first page (defaults to len(places_df))
+
     Returns:
         html.Div: Complete gallery layout
     """
@@ -176,14 +259,8 @@ def get_gallery_layout(places_df, slug_map):
         className='gallery-filter-section',
     )
 
-    # Create cards for all places
-    place_cards = []
-    for _, place in places_df.iterrows():
-        if place['name'] and place['name'] != '':  # Skip empty rows
-            slug = slug_map.get(place['name'])
-            if slug:
-                card = create_place_card(place, slug)
-                place_cards.append(card)
+    # Only the first page of cards is built; later pages are requested by the pagination
+    place_cards = create_place_cards(places_df.iloc[:GALLERY_PAGE_SIZE], slug_map)
 
     # Gallery grid container
     gallery_grid = html.Div(place_cards, className='gallery-grid', id='gallery-grid-container')
@@ -194,6 +271,7 @@ def get_gallery_layout(places_df, slug_map):
             gallery_header,
             filter_section,
             gallery_grid,
+            get_gallery_pagination(len(places_df) if total is None else total),
         ],
         className='gallery-content',
     )
@@ -1,6 +1,8 @@
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 
+from utils.staticAssets import asset_url
+
 
 color_map = {0.25: '#808080', 0.5: '#B40505', 1: '#FFB84D', 2: '#FE6F64', 3: '#C2282D'}
 
@@ -125,7 +127,7 @@ def get_footer():
         children=[
             html.Div(
                 children=[
-                    html.Img(src='assets/Images/github-mark.png', className='info-image'),
+                    html.Img(src=asset_url('Images/github-mark.png'), className='info-image'),
                     html.Div(
                         children=[
                             # Info text on one line
@@ -197,6 +199,21 @@ def get_main_content_with_city_match(unique_regions):
                 ],
                 className='instructions-container',
             ),
+            # Full-text search over place records and articles
+            html.Div(
+                [
+                    html.H6('Search Places and Stories', className='dropdown-title'),
+                    dcc.Input(
+                        id='place-search-input',
+                        type='search',
+                        placeholder='e.g. Blue House, pawn shop, 灣仔',
+                        debounce=True,
+                        className='place-search-input',
+                    ),
+                    html.Div(id='place-search-results', className='place-search-results'),
+                ],
+                className='place-search-container',
+            ),
             # Dropdown blocks wrapped in a flex container
             html.Div(
                 [
@@ -226,6 +243,34 @@ def get_main_content_with_city_match(unique_regions):
                 ],
                 className='dropdowns-container-main',
             ),  # Flex container for dropdowns
+            # Show or hide places by their current condition (toggles map traces only)
+            html.Div(
+                [
+                    html.H6('Filter by Condition', className='dropdown-title'),
+                    dcc.Checklist(
+                        id='condition-filter',
+                        options=[
+                            {
+                                'label': html.Span(
+                                    [
+                                        html.Span(
+                                            className='condition-swatch',
+                                            style={'backgroundColor': color},
+                                        ),
+                                        condition,
+                                    ]
+                                ),
+                                'value': condition,
+                            }
+                            for condition, color in condition_color_map.items()
+                        ],
+                        value=list(condition_color_map),
+                        inline=True,
+                        className='condition-filter',
+                    ),
+                ],
+                className='condition-filter-container',
+            ),
             # Buttons and restaurant details
             html.Div(
                 [
@@ -277,6 +322,7 @@ def get_main_content_with_city_match(unique_regions):
                 },
             ),
             dcc.Store(id='map-view-store-mainpage', data={}),
+            dcc.Store(id='map-outline-store', data={}),  # District and outline detail on the map
         ],
         className='map-section',
     )
@@ -7,6 +7,66 @@ from dash import html, dcc
 from .layout_main import get_header_with_buttons, get_footer, condition_color_map
 from utils.markdownRenderer import render_markdown_file
 
+MODEL_VIEWER_URL = 'https://ajax.googleapis.com/ajax/libs/model-viewer/3.3.0/model-viewer.min.js'
+
+# Loads model-viewer only when a viewer scrolls into view, starting with a light LOD variant
+# (low on small screens or data saver, otherwise medium) and upgrading to the full model once
+# the reader interacts with it
+MODEL_LOADER_SCRIPT = f"""
+<script>
+(function () {{
+    var scriptAdded = false;
+
+    function pickSource(viewer) {{
+        var data = viewer.dataset;
+        var connection = navigator.connection || {{}};
+        var constrained = window.screen.width < 768 || connection.saveData ||
+            (navigator.deviceMemory && navigator.deviceMemory <= 2);
+        return (constrained && data.srcLow) || data.srcMedium || data.srcLow || data.srcFull;
+    }}
+
+    function activate(viewer) {{
+        if (!scriptAdded) {{
+            scriptAdded = true;
+            var script = document.createElement('script');
+            script.type = 'module';
+            script.src = '{MODEL_VIEWER_URL}';
+            document.head.appendChild(script);
+        }}
+        var source = pickSource(viewer);
+        viewer.setAttribute('src', source);
+        if (source !== viewer.dataset.srcFull) {{
+            viewer.addEventListener('camera-change', function upgrade(event) {{
+                if (event.detail.source === 'user-interaction') {{
+                    viewer.removeEventListener('camera-change', upgrade);
+                    viewer.setAttribute('src', viewer.dataset.srcFull);
+                }}
+            }});
+        }}
+    }}
+
+    document.addEventListener('DOMContentLoaded', function () {{
+        var viewers = document.querySelectorAll('model-viewer[data-src-full]');
+        if (!('IntersectionObserver' in window)) {{
+            viewers.forEach(activate);
+            return;
+        }}
+        var observer = new IntersectionObserver(function (entries) {{
+            entries.forEach(function (entry) {{
+                if (entry.isIntersecting) {{
+                    observer.unobserve(entry.target);
+                    activate(entry.target);
+                }}
+            }});
+        }}, {{ rootMargin: '200px 0px' }});
+        viewers.forEach(function (viewer) {{
+            observer.observe(viewer);
+        }});
+    }});
+}})();
+</script>
+"""
+
 
 def get_place_detail_layout(place_data, slug):
     """
@@ -47,6 +107,7 @@ def get_place_detail_layout(place_data, slug):
 
     # Render markdown content
     article_html = render_markdown_file(slug)
+    model_loader = MODEL_LOADER_SCRIPT if '<model-viewer' in article_html else ''
 
     # Header
     header = html.Div(children=[get_header_with_buttons()], className='header')
@@ -164,7 +225,7 @@ def get_place_detail_layout(place_data, slug):
                     <html>
                     <head>
                         <meta charset="utf-8">
-                        <script type="module" src="https://ajax.googleapis.com/ajax/libs/model-viewer/3.3.0/model-viewer.min.js"></script>
+                        {model_loader}
                         <style>
                             body {{
                                 font-family: 'Libre Franklin', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
@@ -226,13 +287,23 @@ def get_place_detail_layout(place_data, slug):
                                 text-align: center;
                                 color: #666;
                             }}
+                            img {{
+                                max-width: 100%;
+                                height: auto;
+                            }}
                             model-viewer {{
+                                display: block;
                                 width: 100%;
                                 height: 500px;
                                 margin: 2em 0;
                                 border-radius: 8px;
                                 background-color: #f0f0f0;
                             }}
+                            model-viewer .model-poster {{
+                                width: 100%;
+                                height: 100%;
+                                object-fit: contain;
+                            }}
                         </style>
                     </head>
                     <body>
@@ -0,0 +1,4 @@
+"""
+Load Test Suite
+Replays realistic user sessions against the Dash callback endpoints with a stubbed LLM
+"""
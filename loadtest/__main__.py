@@ -0,0 +1,223 @@
+"""
+Load Test Runner
+Starts the fake LLM and a gunicorn deployment, replays user sessions and reports latencies
+
+Usage:
+    python -m loadtest --workers 2 --threads 4 --users 20 --duration 60
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+from loadtest.dash_session import DashSession, load_callbacks
+from loadtest.fake_llm import start_fake_llm
+from loadtest.fake_redis import start_fake_redis
+from loadtest.recorder import Recorder, format_report
+from loadtest.scenarios import DEFAULT_MIX, SCENARIOS
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m loadtest', description='Load test the Dash callbacks of cyber_wc_app.'
+    )
+    target = parser.add_argument_group('server')
+    target.add_argument('--url', help='Test an already running deployment instead of gunicorn')
+    target.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    target.add_argument('--threads', type=int, default=1, help='threads per worker')
+    target.add_argument('--worker-class', default='sync', help='gunicorn worker class')
+    target.add_argument('--port', type=int, default=0, help='port for gunicorn (0 picks one)')
+    target.add_argument(
+        '--streaming', action='store_true', help='run the server with CHAT_STREAMING=1'
+    )
+    target.add_argument(
+        '--cache',
+        choices=('simple', 'filesystem', 'shm', 'redis'),
+        help='CACHE_BACKEND for the server (redis starts a local stand-in unless '
+        'CACHE_REDIS_URL is set)',
+    )
+
+    load = parser.add_argument_group('load')
+    load.add_argument('--users', type=int, default=10, help='concurrent simulated users')
+    load.add_argument('--duration', type=float, default=60, help='seconds to run')
+    load.add_argument('--ramp-up', type=float, default=5, help='seconds to start all users')
+    load.add_argument('--think-time', type=float, default=1.0, help='mean pause between actions')
+    load.add_argument(
+        '--mix',
+        default=','.join(f'{name}={share}' for name, share in DEFAULT_MIX.items()),
+        help='scenario shares, e.g. explore=0.5,gallery=0.3,chat=0.2',
+    )
+    load.add_argument('--seed', type=int, help='random seed for reproducible sessions')
+    load.add_argument('--json', dest='json_path', help='also write the report to this file')
+
+    llm = parser.add_argument_group('fake LLM')
+    llm.add_argument('--first-token-latency', type=float, default=0.5)
+    llm.add_argument('--token-latency', type=float, default=0.02)
+    return parser.parse_args(argv)
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, share = part.partition('=')
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f'Unknown scenario {name!r} (choose from {", ".join(SCENARIOS)})')
+        mix[name.strip()] = float(share or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(args, llm_url, extra_env):
+    """Launch cyber_wc_app:server under gunicorn and wait until it answers."""
+    port = args.port or free_port()
+    env = dict(
+        os.environ,
+        DEEPSEEK_BASE_URL=llm_url,
+        DEEPSEEK_API_KEY='loadtest',
+        CHAT_STREAMING='1' if args.streaming else '0',
+        **extra_env,
+    )
+    command = [
+        sys.executable,
+        '-m',
+        'gunicorn',
+        'cyber_wc_app:server',
+        '--bind',
+        f'127.0.0.1:{port}',
+        '--workers',
+        str(args.workers),
+        '--threads',
+        str(args.threads),
+        '--worker-class',
+        args.worker_class,
+        '--timeout',
+        '120',
+        '--log-level',
+        'warning',
+    ]
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'gunicorn exited with code {process.returncode}')
+        try:
+            if httpx.get(f'{url}/_dash-layout', timeout=5).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit('gunicorn did not become ready within 120s')
+
+
+def run_user(url, callbacks, recorder, mix, think_time, stop):
+    """Replay sessions until the stop event is set."""
+    names, weights = list(mix), list(mix.values())
+
+    def sleep(seconds):
+        stop.wait(seconds)
+
+    with httpx.Client(base_url=url, timeout=120) as http:
+        while not stop.is_set():
+            name = random.choices(names, weights)[0]
+            session = DashSession(http, callbacks, recorder)
+            start = time.perf_counter()
+            try:
+                SCENARIOS[name](session, sleep, think_time)
+            except Exception as error:
+                recorder.record(f'session: {name}', time.perf_counter() - start, None, error)
+            else:
+                recorder.record(f'session: {name}', time.perf_counter() - start)
+            sleep(think_time)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+    if args.seed is not None:
+        random.seed(args.seed)
+    # Callback names come from importing the app, which must match the server's chat mode
+    os.environ['CHAT_STREAMING'] = '1' if args.streaming else '0'
+
+    llm = start_fake_llm(
+        first_token_latency=args.first_token_latency, token_latency=args.token_latency
+    )
+    process = redis = None
+    cache_env = {}
+    if args.cache:
+        cache_env['CACHE_BACKEND'] = args.cache
+        if args.cache == 'redis' and not os.getenv('CACHE_REDIS_URL'):
+            redis = start_fake_redis()
+            cache_env['CACHE_REDIS_URL'] = redis.url
+    try:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            process, url = start_gunicorn(args, llm.base_url, cache_env)
+            print(
+                f'gunicorn: {args.workers} worker(s) x {args.threads} thread(s) '
+                f'({args.worker_class}) on {url}, cache: {args.cache or "default"}'
+            )
+
+        with httpx.Client(base_url=url, timeout=60) as http:
+            callbacks = load_callbacks(http)
+        print(f'{len(callbacks)} server callbacks; {args.users} users for {args.duration:.0f}s')
+
+        recorder = Recorder()
+        stop = threading.Event()
+        users = []
+        started = time.perf_counter()
+        for _ in range(args.users):
+            user = threading.Thread(
+                target=run_user,
+                args=(url, callbacks, recorder, mix, args.think_time, stop),
+                daemon=True,
+            )
+            user.start()
+            users.append(user)
+            stop.wait(args.ramp_up / args.users)
+        stop.wait(max(0.0, args.duration - (time.perf_counter() - started)))
+        stop.set()
+        for user in users:
+            user.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        llm.shutdown()
+        if redis is not None:
+            redis.shutdown()
+
+    rows = recorder.report(elapsed)
+    print()
+    print(format_report(rows, elapsed))
+    print(f'fake LLM served {llm.requests_served} completions')
+    if redis is not None:
+        print(f'fake Redis served {redis.commands_served} cache commands')
+    if args.json_path:
+        config = {key: value for key, value in vars(args).items() if key != 'json_path'}
+        with open(args.json_path, 'w') as file:
+            json.dump({'config': config, 'elapsed': elapsed, 'callbacks': rows}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,331 @@
+"""
+Dash Session
+Minimal stand-in for the Dash renderer that drives /_dash-update-component over HTTP
+"""
+
+import copy
+import json
+import math
+import time
+from urllib.parse import urlsplit
+
+# How many rounds of output -> input chaining to follow after a user action
+MAX_CASCADE_DEPTH = 4
+
+
+def parse_output(part):
+    """Split 'id.prop' or 'id.prop@hash' (allow_duplicate outputs) into an output spec."""
+    base, _, duplicate = part.partition('@')
+    component_id, prop = base.rsplit('.', 1)
+    return {'id': component_id, 'property': prop + (f'@{duplicate}' if duplicate else '')}
+
+
+def apply_patch(value, operations):
+    """
+    Apply the list operations of a Dash Patch (partial property update) to a value.
+
+    Covers what the app sends (Assign, Merge, Append, Prepend, Extend, Insert, Delete, Remove
+    and Clear); other operations leave the value unchanged.
+    """
+    value = copy.deepcopy(value)
+    for operation in operations:
+        name, location, params = operation['operation'], operation['location'], operation['params']
+        if name == 'Delete':
+            *location, key = location
+        parent = None
+        target = value
+        for key_part in location:
+            parent, target = target, target[key_part]
+        if name == 'Assign':
+            if parent is None:
+                value = params['value']
+            else:
+                parent[location[-1]] = params['value']
+        elif name == 'Merge':
+            target.update(params['value'])
+        elif name == 'Append':
+            target.append(params['value'])
+        elif name == 'Prepend':
+            target.insert(0, params['value'])
+        elif name == 'Extend':
+            target.extend(params['value'])
+        elif name == 'Insert':
+            target.insert(params['index'], params['value'])
+        elif name == 'Delete':
+            del target[key]
+        elif name == 'Remove':
+            target[:] = [item for item in target if item != params['value']]
+        elif name == 'Clear':
+            target.clear()
+    return value
+
+
+class Callback:
+    """A server-side callback as described by /_dash-dependencies."""
+
+    def __init__(self, dependency, name=None):
+        self.output = dependency['output']
+        self.multi = self.output.startswith('..')
+        parts = self.output[2:-2].split('...') if self.multi else [self.output]
+        self.outputs = [parse_output(part) for part in parts]
+        self.inputs = [f"{i['id']}.{i['property']}" for i in dependency['inputs']]
+        self.state = [f"{s['id']}.{s['property']}" for s in dependency['state']]
+        self.prevent_initial_call = dependency.get('prevent_initial_call', False)
+        self.name = name or self.outputs[0]['id'] + '.' + self.outputs[0]['property'].split('@')[0]
+
+    def payload(self, props, changed):
+        def spec(prop_id):
+            component_id, prop = prop_id.rsplit('.', 1)
+            return {'id': component_id, 'property': prop, 'value': props.get(prop_id)}
+
+        return {
+            'output': self.output,
+            'outputs': self.outputs if self.multi else self.outputs[0],
+            'inputs': [spec(prop_id) for prop_id in self.inputs],
+            'state': [spec(prop_id) for prop_id in self.state],
+            'changedPropIds': changed,
+        }
+
+
+def load_callbacks(http):
+    """
+    Fetch the app's server-side callbacks.
+
+    Parameters:
+        http (httpx.Client): Client bound to the app's base URL
+
+    Returns:
+        list: Callback objects (clientside and pattern-matching callbacks excluded)
+    """
+    names = callback_names()
+    callbacks = []
+    for dependency in http.get('/_dash-dependencies').json():
+        if dependency.get('clientside_function'):
+            continue
+        ids = [i['id'] for i in dependency['inputs'] + dependency['state']]
+        if any(component_id.startswith('{') for component_id in ids):
+            continue
+        callbacks.append(Callback(dependency, names.get(dependency['output'])))
+    return callbacks
+
+
+def callback_names():
+    """Map callback outputs to their Python function names (when the app is importable)."""
+    try:
+        from cyber_wc_app import app
+    except Exception:
+        return {}
+    return {
+        output: getattr(entry.get('callback'), '__name__', output)
+        for output, entry in app.callback_map.items()
+    }
+
+
+class DashSession:
+    """
+    One simulated browser tab.
+
+    Keeps the current value of every component property it has seen, fires the server callbacks
+    an input change would trigger (including the initial calls for newly rendered components and
+    the cascade caused by their outputs) and records each request's latency.
+
+    Parameters:
+        http (httpx.Client): Client bound to the app's base URL
+        callbacks (list): Server callbacks from load_callbacks()
+        recorder (Recorder): Collects per-callback timings
+    """
+
+    def __init__(self, http, callbacks, recorder):
+        self.http = http
+        self.callbacks = callbacks
+        self.recorder = recorder
+        self.props = {}
+        self.links = set()
+        self.tiles = set()  # Tile URLs already fetched (the browser's cache)
+        self.basemap_sources = ()
+
+    def load(self, pathname='/'):
+        """Open the app: fetch the layout and fire the initial callbacks."""
+        start = time.perf_counter()
+        response = self.http.get('/_dash-layout')
+        self.recorder.record('_dash-layout', time.perf_counter() - start, response)
+        self.props['url.pathname'] = pathname
+        new_ids = self.register_layout(response.json())
+        self.fire_initial(new_ids)
+
+    def set(self, prop_id, value):
+        """Change a property without triggering callbacks (e.g. typing into an input)."""
+        self.props[prop_id] = value
+
+    def trigger(self, prop_id, value):
+        """Change a property as the user would and run every callback it triggers."""
+        self.props[prop_id] = value
+        self.fire_changed([prop_id])
+
+    def click(self, component_id):
+        """Increment a component's n_clicks."""
+        prop_id = f'{component_id}.n_clicks'
+        self.trigger(prop_id, (self.props.get(prop_id) or 0) + 1)
+
+    def handles(self, prop_id):
+        """Whether any server callback takes the property as an input."""
+        return any(prop_id in callback.inputs for callback in self.callbacks)
+
+    def register_layout(self, tree):
+        """Record the props and internal links of a layout tree and return its component ids."""
+        ids = set()
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node)
+            elif isinstance(node, dict) and 'props' in node:
+                props = node['props']
+                if isinstance(props.get('href'), str) and props['href'].startswith('/'):
+                    self.links.add(props['href'])
+                component_id = props.get('id')
+                if isinstance(component_id, str):
+                    ids.add(component_id)
+                    for prop, value in props.items():
+                        if prop not in ('id', 'children'):
+                            self.props[f'{component_id}.{prop}'] = value
+                stack.append(props.get('children'))
+        return ids
+
+    def fire_initial(self, new_ids, depth=0):
+        """Fire the initial calls Dash makes for callbacks whose inputs were just rendered."""
+        for callback in self.callbacks:
+            if callback.prevent_initial_call:
+                continue
+            if any(prop_id.rsplit('.', 1)[0] in new_ids for prop_id in callback.inputs):
+                self.fire(callback, [], depth)
+
+    def fire_changed(self, changed, depth=0, source=None):
+        if depth > MAX_CASCADE_DEPTH:
+            return
+        for callback in self.callbacks:
+            if callback is source:
+                continue  # Like the renderer, a callback is not re-triggered by its own outputs
+            triggered = [prop_id for prop_id in changed if prop_id in callback.inputs]
+            if triggered:
+                self.fire(callback, triggered, depth)
+
+    def fire(self, callback, changed, depth=0):
+        body = callback.payload(self.props, changed)
+        start = time.perf_counter()
+        try:
+            response = self.http.post('/_dash-update-component', json=body)
+        except Exception as error:
+            self.recorder.record(callback.name, time.perf_counter() - start, None, error)
+            return
+        self.recorder.record(callback.name, time.perf_counter() - start, response)
+        if response.status_code != 200:
+            return  # 204 is PreventUpdate
+
+        changed_props, new_ids = [], set()
+        for component_id, values in response.json().get('response', {}).items():
+            for prop, value in values.items():
+                if isinstance(value, dict) and '__dash_patch_update' in value:
+                    if prop == 'children':
+                        # Register components added by the patch
+                        new_ids |= self.register_layout(
+                            [operation['params'].get('value') for operation in value['operations']]
+                        )
+                    else:
+                        previous = self.props.get(f'{component_id}.{prop}')
+                        self.props[f'{component_id}.{prop}'] = apply_patch(
+                            previous if previous is not None else [], value['operations']
+                        )
+                elif prop == 'children':
+                    new_ids |= self.register_layout(value)
+                else:
+                    self.props[f'{component_id}.{prop}'] = value
+                changed_props.append(f'{component_id}.{prop}')
+
+        if new_ids:
+            self.fire_initial(new_ids, depth + 1)
+        self.fire_changed(changed_props, depth + 1, source=callback)
+
+    def fetch_map_tiles(self, radius=1):
+        """
+        Fetch the vector tiles the map's visible tile layers (and a local basemap) need around the
+        current view, as the browser would (tiles already fetched in this session are skipped).
+
+        Parameters:
+            radius (int): Tiles fetched on each side of the centre tile
+        """
+        figure = self.props.get('map-display.figure') or {}
+        map_layout = figure.get('layout', {}).get('map', {})
+        view = self.props.get('map-view-store-mainpage.data') or {}
+        zoom = view.get('zoom', map_layout.get('zoom'))
+        center = view.get('center', map_layout.get('center'))
+        if zoom is None or not center:
+            return
+
+        # Tile URL template -> (name recorded, highest zoom served)
+        sources = {
+            layer['source'][0]: ('tiles/' + urlsplit(layer['source'][0]).path.split('/')[2], 16)
+            for layer in map_layout.get('layers') or []
+            if layer.get('sourcetype') == 'vector' and layer.get('visible', True)
+        }
+        style = map_layout.get('style')
+        if isinstance(style, str) and style.endswith('/basemap/style.json'):
+            # Local basemap (utils.basemapTiles): its style, then its tiles
+            path = urlsplit(style).path
+            if path not in self.tiles:
+                self.tiles.add(path)
+                start = time.perf_counter()
+                response = self.http.get(path)
+                self.recorder.record('basemap/style', time.perf_counter() - start, response)
+                self.basemap_sources = response.json().get('sources', {}).values()
+            for source in self.basemap_sources:
+                for template in source.get('tiles', ()):
+                    sources[template] = ('basemap/tiles', source.get('maxzoom', 14))
+
+        for source, (name, max_zoom) in sorted(sources.items()):
+            z = max(0, min(max_zoom, int(zoom)))
+            n = 2**z
+            lat = math.radians(center['lat'])
+            center_x = int((center['lon'] + 180) / 360 * n)
+            center_y = int((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+            parts = urlsplit(source)
+            template = parts.path + (f'?{parts.query}' if parts.query else '')
+            for x in range(center_x - radius, center_x + radius + 1):
+                for y in range(center_y - radius, center_y + radius + 1):
+                    url = template.format(z=z, x=x % n, y=y % n)
+                    if url in self.tiles:
+                        continue
+                    self.tiles.add(url)
+                    start = time.perf_counter()
+                    response = self.http.get(url)
+                    self.recorder.record(name, time.perf_counter() - start, response)
+
+    def stream_chat(self, message):
+        """POST to the SSE chat endpoint, recording time to first token and to completion."""
+        start = time.perf_counter()
+        first_token = None
+        reply = None
+        history = self.props.get('chat-conversation-store.data') or []
+        try:
+            with self.http.stream(
+                'POST', '/api/chat/stream', json={'message': message, 'history': history}
+            ) as response:
+                event = None
+                for line in response.iter_lines():
+                    if line.startswith('event: '):
+                        event = line[7:]
+                    elif line.startswith('data: '):
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                            self.recorder.record('chat_stream (first token)', first_token, response)
+                        if event in ('done', 'error'):
+                            reply = {
+                                'success': event == 'done',
+                                'message': json.loads(line[6:]),
+                                'received': time.time() * 1000,
+                            }
+        except Exception as error:
+            self.recorder.record('chat_stream (complete)', time.perf_counter() - start, None, error)
+            return None
+        self.recorder.record('chat_stream (complete)', time.perf_counter() - start, response)
+        return reply
@@ -0,0 +1,161 @@
+"""
+Fake DeepSeek Endpoint
+Local OpenAI-compatible chat completions server with configurable latency
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    'The Blue House is a tong lau on Stone Nullah Lane in Wan Chai, built in the 1920s and '
+    'named after the blue paint on its external walls.'
+)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Handles POST /chat/completions (blocking and streaming) like the DeepSeek API."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Keep load-test output readable
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        config = self.server.config
+        tokens = config['reply'].split(' ')
+        tokens = [token if i == 0 else ' ' + token for i, token in enumerate(tokens)]
+        self.server.record_request()
+
+        time.sleep(config['first_token_latency'])
+        if body.get('stream'):
+            self._stream(body, tokens, config['token_latency'])
+        else:
+            time.sleep(config['token_latency'] * len(tokens))
+            self._complete(body, tokens)
+
+    def _complete(self, body, tokens):
+        payload = json.dumps(
+            {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'deepseek-chat'),
+                'choices': [
+                    {
+                        'index': 0,
+                        'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                        'finish_reason': 'stop',
+                    }
+                ],
+                'usage': {
+                    'prompt_tokens': len(json.dumps(body.get('messages', []))) // 4,
+                    'completion_tokens': len(tokens),
+                    'total_tokens': len(json.dumps(body.get('messages', []))) // 4 + len(tokens),
+                },
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body, tokens, token_latency):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(token_latency)
+            chunk = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model', 'deepseek-chat'),
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}],
+            }
+            self._write_chunk(f'data: {json.dumps(chunk)}\n\n'.encode())
+        self._write_chunk(b'data: [DONE]\n\n')
+        self._write_chunk(b'')
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """
+    Threaded fake LLM server.
+
+    Parameters:
+        address (tuple): (host, port) to bind; port 0 picks a free port.
+        first_token_latency (float): Seconds before the first token (or full reply) is sent.
+        token_latency (float): Seconds between tokens.
+        reply (str): Assistant reply returned for every request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, first_token_latency=0.5, token_latency=0.02, reply=DEFAULT_REPLY):
+        super().__init__(address, FakeLLMHandler)
+        self.config = {
+            'first_token_latency': first_token_latency,
+            'token_latency': token_latency,
+            'reply': reply,
+        }
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def start_fake_llm(host='127.0.0.1', port=0, **latency):
+    """
+    Start a fake LLM server in a background thread.
+
+    Parameters:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+        **latency: first_token_latency, token_latency and reply (see FakeLLMServer)
+
+    Returns:
+        FakeLLMServer: Running server; use .base_url as DEEPSEEK_BASE_URL and .shutdown() to stop
+    """
+    server = FakeLLMServer((host, port), **latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a fake DeepSeek endpoint.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-latency', type=float, default=0.5)
+    parser.add_argument('--token-latency', type=float, default=0.02)
+    args = parser.parse_args()
+
+    fake = FakeLLMServer(
+        ('127.0.0.1', args.port),
+        first_token_latency=args.first_token_latency,
+        token_latency=args.token_latency,
+    )
+    print(f'Fake DeepSeek endpoint on {fake.base_url} (Ctrl+C to stop)')
+    fake.serve_forever()
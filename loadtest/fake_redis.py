@@ -0,0 +1,220 @@
+"""
+Fake Redis Server
+In-memory server speaking the Redis protocol, enough for the shared cache backend
+"""
+
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Reads RESP commands from one connection and answers them from the server's store."""
+
+    def handle(self):
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, ValueError):
+                return
+            if command is None:
+                return
+            name, args = command[0].upper().decode(), command[1:]
+            handler = getattr(self.server, f'cmd_{name.lower()}', None)
+            try:
+                reply = handler(*args) if handler else Error(f"ERR unknown command '{name}'")
+            except (TypeError, ValueError):
+                reply = Error(f"ERR wrong arguments for '{name}' command")
+            self.wfile.write(encode(reply))
+            self.wfile.flush()
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            return line.split()  # Inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+class Error(str):
+    """Error reply."""
+
+
+class Status(str):
+    """Simple string reply."""
+
+
+def encode(reply):
+    if isinstance(reply, Error):
+        return b'-%s\r\n' % reply.encode()
+    if isinstance(reply, Status):
+        return b'+%s\r\n' % reply.encode()
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(encode(item) for item in reply)
+    if isinstance(reply, str):
+        reply = reply.encode()
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+OK = Status('OK')
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded in-memory Redis stand-in.
+
+    Supports PING, AUTH, SELECT, GET, MGET, SET (EX/PX/NX/XX), DEL, EXISTS, EXPIRE, TTL, SCAN,
+    DBSIZE, FLUSHDB and FLUSHALL, with a single keyspace and lazy expiry.
+
+    Parameters:
+        address (tuple): (host, port) to bind; port 0 picks a free port.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, FakeRedisHandler)
+        self.store = {}  # key -> (value, expires at or None)
+        self.commands_served = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def _live(self, key):
+        entry = self.store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.store[key]
+            return None
+        return entry
+
+    def _count(self):
+        self.commands_served += 1
+
+    def cmd_ping(self, message=None):
+        return message if message is not None else Status('PONG')
+
+    def cmd_auth(self, *credentials):
+        return OK
+
+    def cmd_select(self, db):
+        return OK
+
+    def cmd_get(self, key):
+        with self._lock:
+            self._count()
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def cmd_mget(self, *keys):
+        with self._lock:
+            self._count()
+            return [entry[0] if entry else None for entry in map(self._live, keys)]
+
+    def cmd_set(self, key, value, *options):
+        expires, condition = None, None
+        options = list(options)
+        while options:
+            option = options.pop(0).upper()
+            if option in (b'EX', b'PX'):
+                amount = int(options.pop(0))
+                expires = time.monotonic() + (amount if option == b'EX' else amount / 1000)
+            elif option in (b'NX', b'XX'):
+                condition = option
+            else:
+                return Error('ERR syntax error')
+        with self._lock:
+            self._count()
+            exists = self._live(key) is not None
+            if (condition == b'NX' and exists) or (condition == b'XX' and not exists):
+                return None
+            self.store[key] = (value, expires)
+        return OK
+
+    def cmd_del(self, *keys):
+        with self._lock:
+            self._count()
+            return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, *keys):
+        with self._lock:
+            self._count()
+            return sum(self._live(key) is not None for key in keys)
+
+    def cmd_expire(self, key, seconds):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return 0
+            self.store[key] = (entry[0], time.monotonic() + int(seconds))
+            return 1
+
+    def cmd_ttl(self, key):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return -2
+            return -1 if entry[1] is None else int(entry[1] - time.monotonic())
+
+    def cmd_scan(self, cursor, *options):
+        # Single pass: returns every matching key with cursor 0
+        pattern = b'*'
+        for name, value in zip(options[::2], options[1::2]):
+            if name.upper() == b'MATCH':
+                pattern = value
+        with self._lock:
+            keys = [key for key in list(self.store) if self._live(key) is not None]
+        matching = [key for key in keys if fnmatch.fnmatchcase(key, pattern)]
+        return [b'0', matching]
+
+    def cmd_dbsize(self):
+        with self._lock:
+            return len(self.store)
+
+    def cmd_flushdb(self, *options):
+        with self._lock:
+            self.store.clear()
+        return OK
+
+    cmd_flushall = cmd_flushdb
+
+
+def start_fake_redis(host='127.0.0.1', port=0):
+    """
+    Start a fake Redis server in a background thread.
+
+    Parameters:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+
+    Returns:
+        FakeRedisServer: Running server; use .url as CACHE_REDIS_URL and .shutdown() to stop
+    """
+    server = FakeRedisServer((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run an in-memory Redis stand-in.')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+
+    fake = FakeRedisServer(('127.0.0.1', args.port))
+    print(f'Fake Redis on {fake.url} (Ctrl+C to stop)')
+    fake.serve_forever()
@@ -0,0 +1,112 @@
+"""
+Map Benchmark
+Times building the explore map for a district with many places (server side), unclustered and
+clustered at several zooms
+
+Usage:
+    python -m loadtest.map_benchmark --points 10000
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from utils.appFunctions import (
+    MAP_CONDITIONS,
+    add_marker_columns,
+    district_map_view,
+    map_view_figure,
+    map_view_patch,
+    marker_patch,
+)
+from utils.dataSnapshot import load_datasets
+from utils.placeClusters import PlaceClusters
+
+
+def synthetic_places(places, district_code, geometry, points, seed=0):
+    """Copies of real places scattered over a district's bounding box."""
+    rng = np.random.default_rng(seed)
+    sample = places.iloc[rng.integers(0, len(places), points)].reset_index(drop=True)
+    min_lon, min_lat, max_lon, max_lat = geometry.bounds
+    sample['latitude'] = rng.uniform(min_lat, max_lat, points)
+    sample['longitude'] = rng.uniform(min_lon, max_lon, points)
+    sample['district_num'] = district_code
+    return sample
+
+
+def best_of(repeat, function):
+    """Fastest of several runs in milliseconds, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m loadtest.map_benchmark',
+        description='Time the explore map build for a district with many places.',
+    )
+    parser.add_argument('--points', type=int, default=10000, help='places in the district')
+    parser.add_argument('--district', default='WC', help='district code')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per step (best is reported)')
+    parser.add_argument(
+        '--zooms', default='12,13,14,15,16,17', help='zooms for clustered markers (comma-separated)'
+    )
+    args = parser.parse_args(argv)
+
+    datasets = load_datasets()
+    districts = datasets.districts
+    geometry = districts.loc[districts['code'] == args.district, 'geometry'].iloc[0]
+    places = synthetic_places(datasets.places, args.district, geometry, args.points)
+
+    def build_view(places_df):
+        zoom_data = {'zoom': 13}
+        return district_map_view(places_df, geometry, args.district, zoom_data, datasets.outlines)
+
+    styled = add_marker_columns(places)
+    view = build_view(styled)
+    center = view['center']
+    everything = PlaceClusters(styled, min_points=len(styled))
+    clusters = PlaceClusters(styled)
+    markers, _ = everything.markers(args.district, view['zoom'], view['center'], MAP_CONDITIONS)
+    figure = map_view_figure(view, markers)
+    steps = [
+        ('marker columns (startup)', lambda: add_marker_columns(places)),
+        ('cluster index (startup)', lambda: PlaceClusters(styled)),
+        ('map view', lambda: build_view(styled)),
+        ('all markers', lambda: everything.markers(args.district, 13, center, MAP_CONDITIONS)),
+        ('full figure', lambda: map_view_figure(view, markers)),
+        ('full figure JSON', lambda: json.dumps(figure)),
+        ('patch JSON', lambda: json.dumps(map_view_patch(view, markers).to_plotly_json())),
+    ]
+    for zoom in map(float, args.zooms.split(',')):
+        steps.append((
+            f'clustered, zoom {zoom:g}',
+            lambda zoom=zoom: clusters.markers(args.district, zoom, center, MAP_CONDITIONS),
+        ))
+        steps.append((
+            f'  patch JSON, zoom {zoom:g}',
+            lambda zoom=zoom: json.dumps(marker_patch(
+                clusters.markers(args.district, zoom, center, MAP_CONDITIONS)[0]
+            ).to_plotly_json()),
+        ))
+
+    print(f"{args.points} places, {len(figure['data'])} traces")
+    for name, function in steps:
+        milliseconds, result = best_of(args.repeat, function)
+        if isinstance(result, str):
+            size = f'{len(result) / 1024:8.0f} KB'
+        elif isinstance(result, tuple):
+            size = f"{len(result[0]['lat']):8d} markers"
+        else:
+            size = ''
+        print(f'{name:<26} {milliseconds:8.1f} ms {size}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+/*
+ * Map render timing
+ * Measures how long Plotly takes to apply each update to the explore map (full figures and
+ * partial updates alike). Timings are kept in window.mapRenderTimings (last 100) and logged
+ * with console.debug, e.g. to compare update strategies in the browser's dev tools.
+ *
+ * Not served by the app: paste it into the browser console on the explore page when needed.
+ */
+
+(function () {
+    const MAX_SAMPLES = 100;
+    window.mapRenderTimings = window.mapRenderTimings || [];
+
+    function isMap(target) {
+        const element = typeof target === 'string' ? document.getElementById(target) : target;
+        return Boolean(element && element.closest && element.closest('#map-display'));
+    }
+
+    function wrap(Plotly) {
+        if (Plotly.__mapTimingWrapped) {
+            return;
+        }
+        const react = Plotly.react;
+        Plotly.react = function (target) {
+            const started = performance.now();
+            const result = react.apply(this, arguments);
+            if (isMap(target) && result && typeof result.then === 'function') {
+                result.then(function () {
+                    const duration = performance.now() - started;
+                    window.mapRenderTimings.push(duration);
+                    if (window.mapRenderTimings.length > MAX_SAMPLES) {
+                        window.mapRenderTimings.shift();
+                    }
+                    console.debug('map render: ' + duration.toFixed(1) + ' ms');
+                });
+            }
+            return result;
+        };
+        Plotly.__mapTimingWrapped = true;
+    }
+
+    // plotly.js is loaded asynchronously by dcc.Graph; wait for it briefly if it is not there yet
+    const WAIT_MS = 10000;
+    const started = Date.now();
+    const poll = setInterval(function () {
+        if (window.Plotly && window.Plotly.react) {
+            wrap(window.Plotly);
+            clearInterval(poll);
+        } else if (Date.now() - started > WAIT_MS) {
+            console.warn('map render timing: plotly.js not loaded, nothing to measure');
+            clearInterval(poll);
+        }
+    }, 200);
+})();
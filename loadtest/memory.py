@@ -0,0 +1,139 @@
+"""
+Worker Memory Report
+Compares per-worker memory of gunicorn with and without preloading the app in the master
+
+Usage:
+    python -m loadtest.memory --workers 4 --threads 2 --warmup 20
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+import httpx
+
+from loadtest.__main__ import run_user, start_gunicorn
+from loadtest.dash_session import load_callbacks
+from loadtest.fake_llm import start_fake_llm
+from loadtest.recorder import Recorder
+from utils.processMemory import child_pids, memory_usage
+
+# Sessions used to warm the workers up (figures, articles and search are built lazily)
+WARMUP_MIX = {'explore': 0.6, 'gallery': 0.4}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m loadtest.memory',
+        description='Measure gunicorn worker memory with and without preload_app.',
+    )
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=2, help='threads per worker')
+    parser.add_argument('--worker-class', default='gthread', help='gunicorn worker class')
+    parser.add_argument('--users', type=int, default=8, help='simulated users during warm-up')
+    parser.add_argument('--warmup', type=float, default=20, help='seconds of traffic per run')
+    parser.add_argument('--json', dest='json_path', help='also write the results to this file')
+    args = parser.parse_args(argv)
+    # Fields read by start_gunicorn
+    args.port, args.streaming = 0, False
+    return args
+
+
+def snapshot(master_pid):
+    """Memory of the master and each worker."""
+    workers = [usage for usage in map(memory_usage, child_pids(master_pid)) if usage]
+    return {'master': memory_usage(master_pid), 'workers': workers}
+
+
+def summarize(state):
+    """Per-worker averages and the instance total (PSS counts shared pages once)."""
+    workers = state['workers']
+    count = max(len(workers), 1)
+    return {
+        'workers': len(workers),
+        'worker_rss': sum(worker['rss'] for worker in workers) / count,
+        'worker_private': sum(worker['uss'] for worker in workers) / count,
+        'worker_shared': sum(worker['shared'] for worker in workers) / count,
+        'total_pss': state['master']['pss'] + sum(worker['pss'] for worker in workers),
+    }
+
+
+def measure(args, preload, llm_url):
+    """Boot gunicorn, record memory, replay traffic, record memory again."""
+    process, url = start_gunicorn(args, llm_url, {'GUNICORN_PRELOAD': '1' if preload else '0'})
+    try:
+        time.sleep(2)  # Let every worker finish booting
+        boot = snapshot(process.pid)
+
+        with httpx.Client(base_url=url, timeout=60) as http:
+            callbacks = load_callbacks(http)
+        stop = threading.Event()
+        users = [
+            threading.Thread(
+                target=run_user,
+                args=(url, callbacks, Recorder(), WARMUP_MIX, 0.2, stop),
+                daemon=True,
+            )
+            for _ in range(args.users)
+        ]
+        for user in users:
+            user.start()
+        stop.wait(args.warmup)
+        stop.set()
+        for user in users:
+            user.join()
+        warm = snapshot(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {'boot': summarize(boot), 'warm': summarize(warm)}
+
+
+def format_results(results):
+    lines = [
+        f"{'preload':<8} {'stage':<6} {'workers':>7} {'RSS/worker':>11} {'private/worker':>15} "
+        f"{'shared/worker':>14} {'total PSS':>10}",
+        '-' * 77,
+    ]
+    for preload, stages in results.items():
+        for stage, row in stages.items():
+            lines.append(
+                f"{preload:<8} {stage:<6} {row['workers']:>7} {row['worker_rss']:>8.1f} MB "
+                f"{row['worker_private']:>12.1f} MB {row['worker_shared']:>11.1f} MB "
+                f"{row['total_pss']:>7.1f} MB"
+            )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if memory_usage() is None:
+        raise SystemExit('Memory figures need Linux (/proc/<pid>/smaps_rollup)')
+    os.environ['CHAT_STREAMING'] = '0'
+
+    llm = start_fake_llm(first_token_latency=0.05, token_latency=0)
+    try:
+        results = {}
+        for preload in (False, True):
+            print(f"Measuring preload {'on' if preload else 'off'} ...")
+            results['on' if preload else 'off'] = measure(args, preload, llm.base_url)
+    finally:
+        llm.shutdown()
+
+    print()
+    print(format_results(results))
+    before, after = results['off']['warm'], results['on']['warm']
+    saved = before['worker_private'] - after['worker_private']
+    print(
+        f"\nPreloading saves {saved:.1f} MB private memory per worker "
+        f"({before['total_pss'] - after['total_pss']:.1f} MB for {args.workers} workers)."
+    )
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump({'config': vars(args), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Load Test Recorder
+Thread-safe collection of request timings and the per-callback latency report
+"""
+
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+
+class Recorder:
+    """Collects (latency, status) samples per callback from every simulated user."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.response_bytes = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, response=None, error=None):
+        """
+        Record one request.
+
+        Parameters:
+            name (str): Callback or endpoint name
+            seconds (float): Wall-clock latency
+            response (httpx.Response or None): Response, if the sample is a single request
+            error (Exception or None): Transport error, if the request failed
+        """
+        failed = error is not None or (response is not None and response.status_code >= 400)
+        size = response.num_bytes_downloaded if response is not None else 0
+        with self._lock:
+            self.samples[name].append(seconds)
+            self.response_bytes[name] += size
+            if failed:
+                self.errors[name] += 1
+
+    def report(self, elapsed):
+        """
+        Summarise the run.
+
+        Parameters:
+            elapsed (float): Duration of the measured run in seconds
+
+        Returns:
+            list: One dict per callback with count, errors, p50/p95/p99 (ms), req/s and KB/req
+        """
+        rows = []
+        with self._lock:
+            for name, samples in sorted(self.samples.items(), key=lambda item: -len(item[1])):
+                p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+                rows.append(
+                    {
+                        'callback': name,
+                        'count': len(samples),
+                        'errors': self.errors[name],
+                        'p50': p50,
+                        'p95': p95,
+                        'p99': p99,
+                        'rps': len(samples) / elapsed if elapsed else 0.0,
+                        'kb': self.response_bytes[name] / len(samples) / 1024,
+                    }
+                )
+        return rows
+
+
+def format_report(rows, elapsed):
+    """Render report rows as a fixed-width table."""
+    header = (
+        f"{'callback':<34}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'p99 ms':>10}{'req/s':>9}{'KB/req':>9}"
+    )
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['callback'][:33]:<34}{row['count']:>8}{row['errors']:>8}{row['p50']:>10.1f}"
+            f"{row['p95']:>10.1f}{row['p99']:>10.1f}{row['rps']:>9.2f}{row['kb']:>9.1f}"
+        )
+    requests = [row for row in rows if not row['callback'].startswith('session: ')]
+    total = sum(row['count'] for row in requests)
+    errors = sum(row['errors'] for row in requests)
+    lines.append('-' * len(header))
+    lines.append(
+        f'{total} requests, {errors} errors in {elapsed:.1f}s ({total / elapsed:.1f} req/s overall)'
+    )
+    return '\n'.join(lines)
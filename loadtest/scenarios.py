@@ -0,0 +1,167 @@
+"""
+Load Test Scenarios
+Realistic user sessions replayed through DashSession
+"""
+
+import random
+import time
+
+from utils.chatJobs import CHAT_JOB_POLL_MS, CHAT_JOB_TIMEOUT
+
+SEARCH_QUERIES = (
+    'Stone Nullah Lane',
+    "Queen's Road East",
+    'Hennessy Road',
+    'Johnston Rd',
+    'lockhart',
+    'Wan Chai Road',
+)
+
+PLACE_SEARCH_QUERIES = ('blue house', 'pawn shop', 'temple', 'tenement 1920s', '灣仔', 'sailors')
+
+CHAT_QUESTIONS = (
+    'What is the history of the Blue House?',
+    'Why is Wan Chai called Wan Chai?',
+    'Which tong lau in Wan Chai are still standing?',
+    'What did the Wan Chai waterfront look like in the 1950s?',
+)
+
+# Give up on a background chat reply a little after the server would
+CHAT_JOB_WAIT = CHAT_JOB_TIMEOUT + 5
+
+
+def pause(think_time):
+    """Seconds a user spends between actions (uniform around the mean think time)."""
+    return random.uniform(0, 2 * think_time) if think_time else 0
+
+
+def option_values(session, prop_id):
+    return [option['value'] for option in session.props.get(prop_id) or [] if option.get('value')]
+
+
+def map_place_indices(session):
+    """Place indices carried by the markers of the current map figure."""
+    figure = session.props.get('map-display.figure') or {}
+    indices = []
+    for trace in figure.get('data', []):
+        customdata = trace.get('customdata')
+        if isinstance(customdata, list):
+            indices.extend(value for value in customdata if value is not None)
+    return indices
+
+
+def explore_session(session, sleep, think_time):
+    """Open the map, pick a region and district, click places, zoom and search."""
+    session.load('/')
+    sleep(pause(think_time))
+
+    regions = option_values(session, 'region-dropdown.options')
+    if regions:
+        session.trigger('region-dropdown.value', random.choice(regions))
+        sleep(pause(think_time))
+
+    session.fetch_map_tiles()
+
+    districts = option_values(session, 'district-dropdown.options')
+    if districts:
+        session.trigger('district-dropdown.value', random.choice(districts))
+        sleep(pause(think_time))
+
+    conditions = option_values(session, 'condition-filter.options')
+    if conditions and random.random() < 0.5:
+        session.trigger('condition-filter.value', random.sample(conditions, random.randint(1, len(conditions))))
+        sleep(pause(think_time))
+
+    for _ in range(random.randint(1, 3)):
+        indices = map_place_indices(session)
+        if not indices:
+            break
+        point = {'customdata': random.choice(indices), 'curveNumber': 0, 'pointNumber': 0}
+        session.trigger('map-display.clickData', {'points': [point]})
+        sleep(pause(think_time))
+
+    # Zooming is tracked clientside; the server only sees the resulting view store
+    view = dict(session.props.get('district-centroid-store.data') or {})
+    if view.get('center'):
+        view['zoom'] = random.choice((11, 12.5, 14.5))
+        session.trigger('map-view-store-mainpage.data', view)
+        session.fetch_map_tiles()
+        sleep(pause(think_time))
+
+    session.set('city-input-mainpage.value', random.choice(SEARCH_QUERIES))
+    session.click('submit-city-button-mainpage')
+    sleep(pause(think_time))
+
+    session.trigger('place-search-input.value', random.choice(PLACE_SEARCH_QUERIES))
+
+
+def gallery_session(session, sleep, think_time):
+    """Open the gallery, filter it, page through it and read an article."""
+    session.load('/')
+    session.trigger('url.pathname', '/gallery')
+    sleep(pause(think_time))
+
+    if random.random() < 0.6:
+        regions = option_values(session, 'gallery-region-filter.options')
+        if regions:
+            session.trigger('gallery-region-filter.value', random.choice(regions))
+            sleep(pause(think_time))
+    if random.random() < 0.3:
+        statuses = option_values(session, 'gallery-status-filter.options')
+        if statuses:
+            session.trigger('gallery-status-filter.value', random.choice(statuses))
+            sleep(pause(think_time))
+
+    for _ in range(random.randint(0, 2)):
+        if session.props.get('gallery-next-button.disabled'):
+            break
+        session.click('gallery-next-button')
+        sleep(pause(think_time))
+
+    articles = sorted(link for link in session.links if link.startswith('/gallery/'))
+    if articles:
+        session.trigger('url.pathname', random.choice(articles))
+
+
+def wait_for_chat_job(session):
+    """Poll for a background chat reply like the chat widget's interval does."""
+    start = time.perf_counter()
+    n_intervals = session.props.get('chat-job-poll.n_intervals') or 0
+    while session.props.get('chat-job-poll.disabled') is False:
+        if time.perf_counter() - start > CHAT_JOB_WAIT:
+            raise TimeoutError(f'No chat reply within {CHAT_JOB_WAIT}s')
+        time.sleep(CHAT_JOB_POLL_MS / 1000)  # Not think time: keeps ticking while the run drains
+        n_intervals += 1
+        session.trigger('chat-job-poll.n_intervals', n_intervals)
+    session.recorder.record('chat reply (background job)', time.perf_counter() - start)
+
+
+def chat_session(session, sleep, think_time):
+    """Open the map page and ask the AI assistant a couple of questions."""
+    session.load('/')
+    sleep(pause(think_time))
+
+    for _ in range(random.randint(1, 2)):
+        question = random.choice(CHAT_QUESTIONS)
+        session.set('chat-input.value', question)
+        # Sends the message; with blocking replies this cascades into start_ai_job
+        session.click('chat-send-button')
+        if session.handles('chat-job-poll.n_intervals'):
+            wait_for_chat_job(session)
+        else:
+            # Streaming mode: the browser fetches the reply itself, then hands it to the server
+            reply = session.stream_chat(question)
+            pending = session.props.get('chat-pending-message-store.data')
+            if reply is not None and pending:
+                session.trigger('chat-reply-store.data', {**reply, 'id': pending['id']})
+        sleep(pause(think_time))
+
+
+SCENARIOS = {
+    'explore': explore_session,
+    'gallery': gallery_session,
+    'chat': chat_session,
+}
+
+# Share of sessions per scenario
+DEFAULT_MIX = {'explore': 0.5, 'gallery': 0.3, 'chat': 0.2}
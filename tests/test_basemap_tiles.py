@@ -0,0 +1,182 @@
+"""
+Basemap Proxy Tests
+Offline checks of the /basemap/ routes against a pre-seeded cache and a fake upstream
+"""
+
+import json
+
+import httpx
+import pytest
+
+import cyber_wc_app
+from utils.basemapTiles import BASEMAP_STYLE_PATH, HONG_KONG_BOUNDS, BasemapProxy, tile_range
+
+# A tile over Hong Kong and one far away from it
+Z = 12
+HK_X, HK_Y = tile_range(HONG_KONG_BOUNDS, Z)[:2]
+FAR_X, FAR_Y = 0, 0
+
+
+class FakeUpstream:
+    """Upstream serving a fixed set of paths; records every request it gets."""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request.url.path)
+        data = self.files.get(request.url.path)
+        return httpx.Response(404) if data is None else httpx.Response(200, content=data)
+
+
+def tile_path(x, y, z=Z):
+    return f'tiles/{z}/{x}/{y}.pbf'
+
+
+def make_proxy(cache_dir, upstream=None, **kwargs):
+    proxy = BasemapProxy(
+        cache_dir=cache_dir,
+        tile_url='https://upstream.test/tiles/{z}/{x}/{y}.pbf',
+        offline=upstream is None,
+        **kwargs,
+    )
+    if upstream is not None:
+        proxy._client = httpx.Client(transport=httpx.MockTransport(upstream))
+    return proxy
+
+
+@pytest.fixture
+def seeded_cache(tmp_path):
+    """Cache directory holding one tile with data and one empty tile."""
+    for name, data in [(tile_path(HK_X, HK_Y), b'tile-data'), (tile_path(HK_X + 1, HK_Y), b'')]:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return tmp_path
+
+
+def client_for(proxy, monkeypatch):
+    monkeypatch.setattr(cyber_wc_app, 'basemap', proxy)
+    return cyber_wc_app.server.test_client()
+
+
+def test_cached_tile_is_served_with_etag(seeded_cache, monkeypatch):
+    """A seeded tile is a cache hit, and revalidates to 304."""
+    proxy = make_proxy(seeded_cache)
+    client = client_for(proxy, monkeypatch)
+
+    response = client.get(f'/basemap/tiles/{Z}/{HK_X}/{HK_Y}.pbf')
+    assert response.status_code == 200
+    assert response.data == b'tile-data'
+    assert response.mimetype == 'application/x-protobuf'
+
+    etag = response.headers['ETag']
+    response = client.get(f'/basemap/tiles/{Z}/{HK_X}/{HK_Y}.pbf', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert proxy.stats()['hits'] == 2
+
+
+def test_cached_empty_tile_is_served_empty(seeded_cache, monkeypatch):
+    """An empty tile (open sea, or missing upstream) is a 200 with no content."""
+    client = client_for(make_proxy(seeded_cache), monkeypatch)
+
+    response = client.get(f'/basemap/tiles/{Z}/{HK_X + 1}/{HK_Y}.pbf')
+    assert response.status_code == 200
+    assert response.data == b''
+
+
+def test_offline_miss_is_404(seeded_cache, monkeypatch):
+    """Offline, a tile that is not cached is a 404 and is not requested upstream."""
+    proxy = make_proxy(seeded_cache)
+    upstream = FakeUpstream({})
+    proxy._client = httpx.Client(transport=httpx.MockTransport(upstream))
+    client = client_for(proxy, monkeypatch)
+
+    assert client.get(f'/basemap/tiles/{Z}/{HK_X + 2}/{HK_Y}.pbf').status_code == 404
+    assert client.get('/basemap/sprite.json').status_code == 404
+    assert upstream.requests == []
+    assert proxy.stats()['missing'] == 2
+
+
+def test_invalid_addresses_are_404(seeded_cache, monkeypatch):
+    """Zooms beyond the upstream, tiles off the grid, unknown sprites and bad glyph ranges."""
+    client = client_for(make_proxy(seeded_cache), monkeypatch)
+
+    assert client.get(f'/basemap/tiles/15/{HK_X}/{HK_Y}.pbf').status_code == 404
+    assert client.get(f'/basemap/tiles/{Z}/{2**Z}/{HK_Y}.pbf').status_code == 404
+    assert client.get('/basemap/sprite.svg').status_code == 404
+    assert client.get('/basemap/fonts/Open Sans Regular/0-abc.pbf').status_code == 404
+
+
+def test_fetched_tile_is_cached(tmp_path, monkeypatch):
+    """A tile is fetched once; upstream 404s become empty tiles."""
+    upstream = FakeUpstream({f'/{tile_path(HK_X, HK_Y)}': b'fetched'})
+    proxy = make_proxy(tmp_path, upstream)
+    client = client_for(proxy, monkeypatch)
+
+    for _ in range(2):
+        assert client.get(f'/basemap/tiles/{Z}/{HK_X}/{HK_Y}.pbf').data == b'fetched'
+    response = client.get(f'/basemap/tiles/{Z}/{HK_X + 1}/{HK_Y}.pbf')
+    assert response.status_code == 200
+    assert response.data == b''
+
+    assert len(upstream.requests) == 2
+    assert (tmp_path / tile_path(HK_X, HK_Y)).read_bytes() == b'fetched'
+    assert proxy.stats()['hits'] == 1
+
+
+def test_tiles_outside_bounds_are_not_proxied(tmp_path, monkeypatch):
+    """Tiles away from Hong Kong are served empty without an upstream request or a cache file."""
+    upstream = FakeUpstream({f'/{tile_path(FAR_X, FAR_Y)}': b'elsewhere'})
+    proxy = make_proxy(tmp_path, upstream)
+    client = client_for(proxy, monkeypatch)
+
+    response = client.get(f'/basemap/tiles/{Z}/{FAR_X}/{FAR_Y}.pbf')
+    assert response.status_code == 200
+    assert response.data == b''
+    assert upstream.requests == []
+    assert not any(tmp_path.iterdir())
+    assert proxy.stats()['outside'] == 1
+
+
+def test_only_style_fonts_are_proxied(tmp_path, monkeypatch):
+    """Glyphs are proxied for the font stacks the style names, and no others."""
+    style = json.loads(BASEMAP_STYLE_PATH.read_text(encoding='utf-8'))
+    style['glyphs'] = 'https://upstream.test/fonts/{fontstack}/{range}.pbf'
+    style['layers'].append(
+        {
+            'id': 'place-label',
+            'type': 'symbol',
+            'source': next(iter(style['sources'])),
+            'source-layer': 'place',
+            'layout': {'text-field': '{name}', 'text-font': ['Noto Sans Regular']},
+        }
+    )
+    style_path = tmp_path / 'style.json'
+    style_path.write_text(json.dumps(style), encoding='utf-8')
+    upstream = FakeUpstream({'/fonts/Noto Sans Regular/0-255.pbf': b'glyphs'})
+    client = client_for(
+        make_proxy(tmp_path / 'cache', upstream, style_path=style_path), monkeypatch
+    )
+
+    assert client.get('/basemap/fonts/Noto Sans Regular/0-255.pbf').data == b'glyphs'
+    assert client.get('/basemap/fonts/Comic Sans/0-255.pbf').status_code == 404
+    assert upstream.requests == ['/fonts/Noto Sans Regular/0-255.pbf']
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    """Beyond max_bytes the least recently used files are removed from disk."""
+    names = [tile_path(HK_X + i, HK_Y) for i in range(3)]
+    upstream = FakeUpstream({f'/{name}': b'x' * 10 for name in names})
+    proxy = make_proxy(tmp_path, upstream, max_bytes=25)
+
+    proxy.tile(Z, HK_X, HK_Y)
+    proxy.tile(Z, HK_X + 1, HK_Y)
+    proxy.tile(Z, HK_X, HK_Y)  # Now more recent than the second tile
+    proxy.tile(Z, HK_X + 2, HK_Y)
+
+    assert (tmp_path / names[0]).exists()
+    assert not (tmp_path / names[1]).exists()
+    assert (tmp_path / names[2]).exists()
+    assert proxy.stats()['bytes'] == 20
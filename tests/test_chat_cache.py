@@ -0,0 +1,114 @@
+"""
+Chat Cache Tests
+Question normalization, answer cache keys and the two cache tiers
+"""
+
+import pytest
+from flask_caching.backends.simplecache import SimpleCache
+
+from utils import chatCache
+from utils.chatCache import ChatAnswerCache, normalize_question
+
+SETTINGS = {'model': 'deepseek-chat', 'temperature': 0.7, 'max_tokens': 500}
+
+
+@pytest.mark.parametrize(
+    'question, normalized',
+    [
+        ("Hi, what's the Blue House?", 'what is the blue house'),
+        ('WHAT IS THE BLUE HOUSE', 'what is the blue house'),
+        ('Hello! Please tell me   what is the Blue House, thanks!', 'what is the blue house'),
+        ('What’s in Wan Chai？', 'what is in wan chai'),
+        ("Is it the Pawn's building?", "is it the pawn's building"),
+        ('Ｔａｉ Ｏ', 'tai o'),
+        ('藍屋在哪裡？', '藍屋在哪裡'),
+        ('Thanks', 'thanks'),
+        ('', ''),
+        (None, ''),
+    ],
+)
+def test_normalize_question(question, normalized):
+    assert normalize_question(question) == normalized
+
+
+def test_equivalent_questions_share_a_key():
+    """Phrasings that normalize the same share a key; settings are part of the key."""
+    cache = ChatAnswerCache(shared=None)
+    key = cache.key("Hi, what's the Blue House?", [], SETTINGS)
+
+    assert key.startswith('chat-answer:')
+    assert cache.key('what is the blue house', [], dict(reversed(SETTINGS.items()))) == key
+    assert cache.key('What is the Pawn?', [], SETTINGS) != key
+    assert cache.key('what is the blue house', [], {**SETTINGS, 'temperature': 0.2}) != key
+
+
+def test_follow_up_questions():
+    """The current message at the end of the context is ignored; earlier turns key follow-ups."""
+    question = 'How old is it?'
+    current = {'role': 'user', 'content': question}
+    earlier = [
+        {'role': 'user', 'content': 'What is the Blue House?'},
+        {'role': 'assistant', 'content': 'A tenement in Wan Chai.'},
+    ]
+
+    single_turn = ChatAnswerCache(shared=None)
+    assert single_turn.key(question, [current], SETTINGS) == single_turn.key(question, [], SETTINGS)
+    assert single_turn.key(question, earlier + [current], SETTINGS) is None
+
+    multi_turn = ChatAnswerCache(multi_turn=True, shared=None)
+    follow_up = multi_turn.key(question, earlier + [current], SETTINGS)
+    assert follow_up is not None
+    assert follow_up != multi_turn.key(question, [], SETTINGS)
+    assert follow_up != multi_turn.key(question, earlier[:1], SETTINGS)
+
+
+def test_disabled_cache_has_no_keys():
+    assert ChatAnswerCache(timeout=0, shared=None).key('What?', [], SETTINGS) is None
+
+
+def test_put_get_and_stats():
+    """Hits credit the latency and tokens of the original call; None keys are bypassed."""
+    cache = ChatAnswerCache(shared=None)
+    key = cache.key('What is the Blue House?', [], SETTINGS)
+
+    assert cache.get(key) is None
+    cache.put(key, 'A tenement.', latency=2.5, tokens=120)
+    cache.put(cache.key('Empty?', [], SETTINGS), '', latency=1.0)
+    assert cache.get(key) == 'A tenement.'
+    assert cache.get(None) is None
+
+    assert cache.stats() == {
+        'hits': 1,
+        'misses': 1,
+        'bypassed': 1,
+        'hit_rate': 0.5,
+        'latency_saved_seconds': 2.5,
+        'tokens_saved': 120,
+        'entries': 1,
+    }
+
+
+def test_memory_tier_is_bounded_and_expires(monkeypatch):
+    """The least recently used answer is dropped first; answers expire after the timeout."""
+    now = [1000.0]
+    monkeypatch.setattr(chatCache.time, 'time', lambda: now[0])
+    cache = ChatAnswerCache(timeout=60, max_entries=2, shared=None)
+    for key in ('a', 'b'):
+        cache.put(key, key.upper(), latency=1.0)
+    cache.get('a')
+    cache.put('c', 'C', latency=1.0)
+    assert [cache.get(key) for key in ('a', 'b', 'c')] == ['A', None, 'C']
+
+    now[0] += 61
+    assert cache.get('a') is None
+
+
+def test_shared_tier_serves_other_workers():
+    """An answer stored by one worker is found by another through the shared cache."""
+    shared = SimpleCache()
+    first, second = ChatAnswerCache(shared=shared), ChatAnswerCache(shared=shared)
+    key = first.key('What is the Blue House?', [], SETTINGS)
+
+    first.put(key, 'A tenement.', latency=2.0)
+    assert second.get(key) == 'A tenement.'
+    assert second.stats()['entries'] == 1  # Now also in the second worker's memory
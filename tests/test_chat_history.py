@@ -0,0 +1,145 @@
+"""
+Chat History Tests
+Token estimates, message condensing and fitting the history into the prompt budget
+"""
+
+from utils.chatHistory import (
+    SUMMARY_HEADER,
+    PromptStats,
+    compact_history,
+    condense,
+    estimate_tokens,
+    message_tokens,
+)
+
+LONG_ANSWER = (
+    'The Blue House is a tenement building in Wan Chai built in the 1920s. '
+    'It is painted blue because the only paint left in the government store was blue. '
+    'The building is one of the few remaining examples of balcony tenements in Hong Kong. '
+    'Today the Blue House hosts a community museum called the House of Stories. '
+    'Tenants still live in the building, which won a UNESCO award for conservation in 2017. '
+    'Nearby you can also visit the Yellow House and the Orange House, part of the same cluster.'
+)
+
+
+def conversation(turns):
+    """Alternating user/assistant messages, oldest first."""
+    messages = []
+    for i in range(turns):
+        messages.append({'role': 'user', 'content': f'Question {i} about the Blue House?'})
+        messages.append({'role': 'assistant', 'content': LONG_ANSWER})
+    return messages
+
+
+def test_estimate_tokens():
+    """About 0.3 tokens per character and 0.6 per Chinese character, rounded up."""
+    assert estimate_tokens('') == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens('a' * 100) == 31
+    assert estimate_tokens('灣' * 10) == 7
+    assert estimate_tokens('Blue House 藍屋') == int(11 * 0.3 + 2 * 0.6) + 1
+
+
+def test_condense_keeps_short_text():
+    assert condense('  A short   answer. ') == 'A short answer.'
+
+
+def test_condense_picks_sentences_within_budget():
+    """Long text is reduced to whole sentences, in order, starting with the topic sentence."""
+    summary = condense(LONG_ANSWER, max_tokens=50)
+
+    assert estimate_tokens(summary) <= 50
+    assert summary.startswith('The Blue House is a tenement building in Wan Chai')
+    sentences = [sentence + '.' for sentence in summary.rstrip('.').split('. ')]
+    assert all(sentence in LONG_ANSWER for sentence in sentences)
+    assert [LONG_ANSWER.index(sentence) for sentence in sentences] == sorted(
+        LONG_ANSWER.index(sentence) for sentence in sentences
+    )
+
+
+def test_condense_truncates_a_single_long_sentence():
+    """Without a sentence that fits, the first one is cut at a word boundary."""
+    summary = condense(' '.join(['word'] * 200), max_tokens=20)
+    assert summary.endswith('word…')
+    assert estimate_tokens(summary[:-1]) <= 20
+
+
+def test_short_history_is_unchanged():
+    """A conversation that fits is sent as is, minus empty messages and the current message."""
+    history = conversation(2) + [
+        {'role': 'assistant', 'content': ''},
+        {'role': 'user', 'content': 'And the Pawn?'},
+    ]
+    messages, report = compact_history(history, 'And the Pawn?', budget=3000)
+
+    assert messages == conversation(2)
+    assert report == {
+        'history_tokens': sum(map(message_tokens, messages)),
+        'original_tokens': sum(map(message_tokens, messages)),
+        'verbatim': 4,
+        'summarized': 0,
+        'dropped': 0,
+    }
+
+
+def test_older_turns_are_summarized():
+    """Beyond `recent` messages, older turns become one summary before the verbatim ones."""
+    history = conversation(6)
+    messages, report = compact_history(history, 'Next?', fixed_tokens=200, budget=3000, recent=4)
+
+    assert messages[1:] == history[-4:]
+    summary = messages[0]
+    assert summary['role'] == 'system'
+    lines = summary['content'].split('\n')
+    assert lines[0] == SUMMARY_HEADER
+    assert lines[1] == 'User: Question 0 about the Blue House?'
+    assert lines[2].startswith('Assistant: The Blue House is a tenement building')
+    assert len(lines[2]) < len('Assistant: ' + LONG_ANSWER)
+    assert report['verbatim'] == 4
+    assert report['summarized'] == 8
+    assert report['dropped'] == 0
+    assert report['history_tokens'] == sum(map(message_tokens, messages))
+    assert report['history_tokens'] < report['original_tokens']
+
+
+def test_history_fits_the_budget():
+    """Whatever the budget, the history sent plus the fixed part never exceeds it."""
+    history = conversation(20)
+    for budget in (0, 100, 300, 1000, 3000):
+        messages, report = compact_history(history, 'Next?', fixed_tokens=150, budget=budget)
+        assert report['history_tokens'] == sum(map(message_tokens, messages))
+        assert report['history_tokens'] <= max(budget - 150, 0)
+        assert report['verbatim'] + report['summarized'] + report['dropped'] == len(history)
+
+
+def test_oldest_summary_lines_are_dropped_first():
+    """When the summary itself does not fit, the newest older turns are the ones kept."""
+    history = conversation(20)
+    messages, report = compact_history(history, 'Next?', budget=400, recent=2)
+
+    assert report['dropped'] > 0
+    assert messages[-2:] == history[-2:]
+    assert messages[0]['content'].split('\n')[-1].startswith('Assistant:')
+    assert 'Question 18 about' in messages[0]['content']
+    assert 'Question 0 about' not in messages[0]['content']
+
+
+def test_prompt_stats():
+    """Totals count compacted requests and the history tokens compaction saved."""
+    stats = PromptStats()
+    report = {'original_tokens': 900, 'history_tokens': 300, 'summarized': 2, 'dropped': 0}
+    stats.record({**report, 'prompt_tokens': 500, 'api_prompt_tokens': 480})
+    report = {'original_tokens': 50, 'history_tokens': 50, 'summarized': 0, 'dropped': 0}
+    stats.record({**report, 'prompt_tokens': 100})
+
+    assert stats.stats() == {
+        'requests': 2,
+        'prompt_tokens': 600,
+        'mean_prompt_tokens': 300.0,
+        'max_prompt_tokens': 500,
+        'api_prompt_tokens': 480,
+        'history_tokens_saved': 600,
+        'compacted_requests': 1,
+    }
+    stats.reset()
+    assert stats.stats()['requests'] == 0
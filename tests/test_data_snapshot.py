@@ -0,0 +1,93 @@
+"""
+Data Snapshot Tests
+Round trip of the parsed datasets through the binary snapshot, and when it is not used
+"""
+
+import shutil
+from dataclasses import replace
+
+import pytest
+
+from utils.dataSnapshot import (
+    DISTRICTS_PATH,
+    PLACES_PATH,
+    load_datasets,
+    load_from_files,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+@pytest.fixture(scope='module')
+def from_files():
+    return load_from_files()
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    """Copies of the source files, so a test can change them."""
+    places, districts = tmp_path / 'places.csv', tmp_path / 'districts.geojson'
+    shutil.copy(PLACES_PATH, places)
+    shutil.copy(DISTRICTS_PATH, districts)
+    return places, districts
+
+
+def test_round_trip(from_files, tmp_path):
+    """Everything read back from a snapshot equals what was parsed from the files."""
+    path = tmp_path / 'geodata.npz'
+    assert write_snapshot(from_files, path) == path.stat().st_size
+
+    loaded = read_snapshot(from_files.version, path)
+
+    assert loaded.source == 'snapshot'
+    assert loaded.version == from_files.version
+    assert loaded.places.equals(from_files.places)
+    assert list(loaded.places.dtypes) == list(from_files.places.dtypes)
+    assert loaded.districts.drop(columns='geometry').equals(
+        from_files.districts.drop(columns='geometry')
+    )
+    assert loaded.districts.geometry.geom_equals_exact(from_files.districts.geometry, 0).all()
+    assert loaded.districts.crs == from_files.districts.crs
+    assert loaded.slug_map == from_files.slug_map
+    assert loaded.outlines.arc_ids == from_files.outlines.arc_ids
+    assert loaded.outlines.levels == from_files.outlines.levels
+    assert loaded.outlines.vertex_counts() == from_files.outlines.vertex_counts()
+
+
+def test_missing_values_survive(from_files, tmp_path):
+    """Missing strings come back as NaN, not as empty strings."""
+    places = from_files.places.copy()
+    places.loc[0, 'name'] = None
+    datasets = replace(from_files, places=places)
+    path = tmp_path / 'geodata.npz'
+    write_snapshot(datasets, path)
+
+    loaded = read_snapshot(datasets.version, path)
+    assert loaded.places['name'].isna().tolist() == places['name'].isna().tolist()
+    assert loaded.places['name'][1] == places['name'][1]
+
+
+def test_changed_files_load_from_files(data_files, tmp_path):
+    """A snapshot of other data is ignored and the files are parsed instead."""
+    places, districts = data_files
+    path = tmp_path / 'geodata.npz'
+    write_snapshot(load_from_files(places, districts), path)
+    assert load_datasets(places, districts, path).source == 'snapshot'
+
+    with open(places, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert load_datasets(places, districts, path).source == 'files'
+
+
+def test_unreadable_snapshot_loads_from_files(data_files, tmp_path):
+    """A missing, truncated or foreign snapshot falls back to the files."""
+    places, districts = data_files
+    path = tmp_path / 'geodata.npz'
+    assert load_datasets(places, districts, path).source == 'files'
+
+    write_snapshot(load_from_files(places, districts), path)
+    path.write_bytes(path.read_bytes()[: path.stat().st_size // 2])
+    assert load_datasets(places, districts, path).source == 'files'
+
+    path.write_bytes(b'not a snapshot')
+    assert load_datasets(places, districts, path).source == 'files'
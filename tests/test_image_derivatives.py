@@ -0,0 +1,88 @@
+"""
+Image Derivatives Tests
+Variant paths, URLs and incremental rebuilds of the article photo derivatives
+"""
+
+import pytest
+from PIL import Image
+
+from utils.imageDerivatives import build_derivatives, referenced_images, target_widths
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Assets with a photo under Images/ and a logo directly in assets/, used by one article."""
+    assets_dir = tmp_path / 'assets'
+    (assets_dir / 'Images' / 'street').mkdir(parents=True)
+    Image.new('RGB', (1000, 500), 'red').save(assets_dir / 'Images' / 'street' / 'photo.jpg')
+    Image.new('RGB', (300, 300), 'blue').save(assets_dir / 'logo.png')
+
+    articles_dir = assets_dir / 'articles'
+    articles_dir.mkdir()
+    (articles_dir / 'street.md').write_text(
+        '![A street](/assets/Images/street/photo.jpg)\n<img src="/assets/logo.png" alt="Logo">\n',
+        encoding='utf-8',
+    )
+    return assets_dir, articles_dir, tmp_path / 'derived'
+
+
+def build(site, **kwargs):
+    assets_dir, articles_dir, output_dir = site
+    return build_derivatives(
+        output_dir=output_dir,
+        formats=['webp'],
+        url_prefix='/static/derived/',
+        articles_dir=articles_dir,
+        assets_dir=assets_dir,
+        **kwargs,
+    )
+
+
+def test_target_widths():
+    assert target_widths(1000, (480, 800, 1200)) == [480, 800, 1000]
+    assert target_widths(2000, (480, 800, 1200)) == [480, 800, 1200]
+    assert target_widths(300, (480, 800, 1200)) == [300]
+
+
+def test_referenced_images(site):
+    _, articles_dir, _ = site
+    assert referenced_images(articles_dir) == [
+        '/assets/Images/street/photo.jpg',
+        '/assets/logo.png',
+    ]
+
+
+def test_variants_stay_in_output_dir(site):
+    """Images anywhere under assets/ get variants inside output_dir, with URLs under the prefix."""
+    output_dir = site[2]
+    manifest = build(site)
+
+    assert manifest['/assets/Images/street/photo.jpg']['variants']['webp'] == [
+        ['/static/derived/Images/street/photo-480.webp', 480],
+        ['/static/derived/Images/street/photo-800.webp', 800],
+        ['/static/derived/Images/street/photo-1000.webp', 1000],
+    ]
+    assert manifest['/assets/logo.png']['variants']['webp'] == [
+        ['/static/derived/logo-300.webp', 300]
+    ]
+    for entry in manifest.values():
+        for url, width in entry['variants']['webp']:
+            with Image.open(output_dir / url.removeprefix('/static/derived/')) as variant:
+                assert variant.width == width
+    assert (output_dir / 'manifest.json').exists()
+
+
+def test_rebuild_skips_unchanged_images(site):
+    """Unchanged images are not re-encoded; new target widths rebuild their variants."""
+    output_dir = site[2]
+    build(site)
+    variant = output_dir / 'Images' / 'street' / 'photo-480.webp'
+    mtime = variant.stat().st_mtime_ns
+
+    assert build(site) == build(site)
+    assert variant.stat().st_mtime_ns == mtime
+
+    manifest = build(site, widths=(480, 640))
+    variants = manifest['/assets/Images/street/photo.jpg']['variants']['webp']
+    assert [width for _, width in variants] == [480, 640]
+    assert variant.stat().st_mtime_ns != mtime
@@ -0,0 +1,100 @@
+"""
+Location Matcher Tests
+Trigram-shortlisted matching against a plain linear fuzzy scan
+"""
+
+import pandas as pd
+import pytest
+from fuzzywuzzy import fuzz, process
+
+from utils.locationMatcher import LocationMatcher
+
+CATALOG = pd.DataFrame(
+    [
+        ('Wan Chai, 000', 'Hong Kong Island', 'Wan Chai'),
+        ('Wan Chai Gap', 'Hong Kong Island', 'Wan Chai'),
+        ('Causeway Bay', 'Hong Kong Island', 'Wan Chai'),
+        ('Sheung Wan', 'Hong Kong Island', 'Central and Western'),
+        ('Sai Wan', 'Hong Kong Island', 'Central and Western'),
+        ('Tai O', 'New Territories', 'Islands'),
+        ('Mong Kok', 'Kowloon', 'Yau Tsim Mong'),
+        ('Sham Shui Po', 'Kowloon', 'Sham Shui Po'),
+        ('Sha Tin', 'New Territories', 'Sha Tin'),
+        ('Tsim Sha Tsui', 'Kowloon', 'Yau Tsim Mong'),
+        ('Tsuen Wan', 'New Territories', 'Tsuen Wan'),
+        ('Yau Ma Tei', 'Kowloon', 'Yau Tsim Mong'),
+        ('Kowloon City', 'Kowloon', 'Kowloon City'),
+        ('Wan Chai', 'Hong Kong Island', 'Other'),  # Same city as the first: the first wins
+    ],
+    columns=['location', 'region', 'district'],
+)
+
+QUERIES = [
+    'Wan Chai',
+    'WAN CHAI ',
+    'wan chia',
+    'Bay Causeway',
+    'Mongkok',
+    'Tai 0',
+    'Sha Tn',
+    'Tsim Sha Tsu',
+    'Sai Wan Ho',
+    'Kwun Tong',
+    'Shatin',
+    'Tsuen',
+    'Sia Wan',
+    'Wan Chaig Ap',
+]
+
+
+def linear_scan(city, threshold=80):
+    """The matcher's answer as an extractOne scan over every row."""
+    normalized = LocationMatcher.normalize_text(city)
+    cities = [
+        LocationMatcher.normalize_text(LocationMatcher.split_location_field(location)[0])
+        for location in CATALOG['location']
+    ]
+    match = process.extractOne(normalized, cities, scorer=fuzz.token_sort_ratio)
+    if not match or match[1] < threshold:
+        return None
+    return CATALOG['location'][cities.index(match[0])]
+
+
+@pytest.mark.parametrize('max_candidates', [1, 3, 25])
+def test_matches_linear_scan(max_candidates):
+    """Shortlisting, including its fallback to a full scan, gives the linear scan's answers."""
+    matcher = LocationMatcher(CATALOG, max_candidates=max_candidates)
+    for query in QUERIES:
+        result = matcher.get_region_district(query)
+        assert (result and result['matched_city']) == linear_scan(query), query
+
+
+def test_pinned_matches():
+    """Typos, word order, case and accents; unknown places give None."""
+    matcher = LocationMatcher(CATALOG)
+
+    assert matcher.get_region_district('wan chia')['matched_city'] == 'Wan Chai, 000'
+    assert matcher.get_region_district('Bay Causeway')['matched_city'] == 'Causeway Bay'
+    assert matcher.get_region_district('Tsim Sha Tsu')['district'] == 'Yau Tsim Mong'
+    assert matcher.get_region_district('Kwun Tong') is None
+
+
+def test_shortlist_miss_falls_back_to_full_scan():
+    """A transposed name whose match is not shortlisted is still found by scoring every city."""
+    matcher = LocationMatcher(CATALOG, max_candidates=1)
+    assert [matcher.cities[i] for i in matcher.shortlist('sia wan')] == ['sheung wan']
+    assert matcher.get_region_district('Sia Wan')['matched_city'] == 'Sai Wan'
+
+
+def test_find_region_district():
+    """Postal codes are split off; empty and unknown inputs give messages."""
+    matcher = LocationMatcher(CATALOG)
+
+    assert matcher.find_region_district('Sheung Wan, 999') == {
+        'Matched Location': 'Sheung Wan',
+        'Region': 'Hong Kong Island',
+        'District': 'Central and Western',
+        'Is Capital': '',
+    }
+    assert matcher.find_region_district('Atlantis') == 'No match found.'
+    assert matcher.find_region_district('') == 'Invalid input.'
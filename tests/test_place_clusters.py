@@ -0,0 +1,138 @@
+"""
+Place Clusters Tests
+Grid clustering of dense districts and the signature of the markers sent for a view
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from layouts.layout_main import condition_color_map
+from utils.appFunctions import add_marker_columns
+from utils.placeClusters import (
+    CLUSTER_COLOR,
+    CLUSTER_MAX_SIZE,
+    PlaceClusters,
+    cluster_size,
+    mercator,
+)
+
+ALL_CONDITIONS = list(condition_color_map)
+
+# Two groups of 100 places about 2 km apart, and a tight group of 10 within a few metres
+WAN_CHAI = {'lat': 22.2770, 'lon': 114.1730}
+SHEUNG_WAN = {'lat': 22.2830, 'lon': 114.1550}
+TIGHT = {'lat': 22.2800, 'lon': 114.1650}
+
+
+def spread(center, count, metres, rng):
+    degrees = metres / 111_000
+    return [
+        (center['lat'] + dlat, center['lon'] + dlon)
+        for dlat, dlon in rng.uniform(-degrees, degrees, size=(count, 2))
+    ]
+
+
+@pytest.fixture(scope='module')
+def places():
+    rng = np.random.default_rng(7)
+    rows = [
+        ('1', lat, lon, 'In use')
+        for lat, lon in spread(WAN_CHAI, 100, 100, rng) + spread(SHEUNG_WAN, 100, 100, rng)
+    ]
+    rows += [('1', lat, lon, 'In use') for lat, lon in spread(TIGHT, 10, 3, rng)]
+    rows += [('1', WAN_CHAI['lat'], WAN_CHAI['lon'], 'Unknown')]
+    rows += [('2', 22.3, 114.2 + i / 1000, 'Ruin') for i in range(3)]
+    frame = pd.DataFrame(rows, columns=['district_num', 'latitude', 'longitude', 'curr_condition'])
+    frame['name'] = [f'Place {i}' for i in range(len(frame))]
+    frame['location'] = 'Hong Kong'
+    return add_marker_columns(frame)
+
+
+@pytest.fixture(scope='module')
+def clusters(places):
+    return PlaceClusters(places, min_points=20, radius=60)
+
+
+def cluster_counts(markers):
+    """Place count of each cluster marker, from its hover text."""
+    return [
+        int(re.match(r"<span[^>]*>(\d+) places", text).group(1))
+        for text, customdata in zip(markers['text'], markers['customdata'])
+        if customdata is None
+    ]
+
+
+def test_mercator():
+    """Longitude and latitude map to [0, 1] world coordinates, y growing southwards."""
+    x, y = mercator([0, 180, -180], [0, 0, 0])
+    assert x.tolist() == [0.5, 1.0, 0.0]
+    assert y[0] == pytest.approx(0.5)
+    assert mercator([0], [45])[1][0] < 0.5 < mercator([0], [-45])[1][0]
+
+
+def test_cluster_size():
+    sizes = [cluster_size(count) for count in (2, 10, 100, 10_000)]
+    assert sizes == sorted(sizes)
+    assert sizes[-1] == CLUSTER_MAX_SIZE
+
+
+def test_small_district_is_not_clustered(clusters):
+    """Districts with few places send every place, and the view does not change them."""
+    markers, signature = clusters.markers('2', 11, WAN_CHAI, ALL_CONDITIONS)
+    assert markers['customdata'] == [211, 212, 213]
+    assert cluster_counts(markers) == []
+
+    other_view = clusters.markers('2', 16, SHEUNG_WAN, ALL_CONDITIONS)
+    assert other_view == (markers, signature)
+    assert clusters.markers('99', 11, WAN_CHAI, ALL_CONDITIONS)[0]['lat'] == []
+
+
+def test_dense_district_is_clustered(clusters):
+    """At a city zoom, 211 places become a few markers that still account for every place."""
+    center = {'lat': 22.28, 'lon': 114.164}
+    markers, _ = clusters.markers('1', 12, center, ALL_CONDITIONS)
+
+    singles = [customdata for customdata in markers['customdata'] if customdata is not None]
+    assert len(markers['lat']) <= 10
+    assert len(singles) + sum(cluster_counts(markers)) == 211
+    assert set(markers['color'][len(singles) :]) == {CLUSTER_COLOR}
+    assert all(len(values) == len(markers['lat']) for values in markers.values())
+
+
+def test_cluster_is_at_the_mean_position(clusters, places):
+    """A cell's cluster marker sits at the mean position of its places."""
+    markers, _ = clusters.markers('1', 14, TIGHT, ALL_CONDITIONS)
+    tight = places.iloc[200:210]
+
+    counts = cluster_counts(markers)
+    index = markers['customdata'].index(None) + counts.index(10)
+    assert markers['lat'][index] == pytest.approx(tight['latitude'].mean(), abs=1e-6)
+    assert markers['lon'][index] == pytest.approx(tight['longitude'].mean(), abs=1e-6)
+    assert markers['size'][index] == cluster_size(10)
+
+
+def test_zoomed_in_places_are_shown_individually(clusters):
+    """Beyond the cluster zoom every place in view is sent as itself; far places are not."""
+    markers, _ = clusters.markers('1', 19, TIGHT, ALL_CONDITIONS)
+    assert sorted(markers['customdata']) == list(range(200, 210))
+
+
+def test_signature_follows_the_markers(clusters):
+    """Short pans keep the signature (and markers); zooming or filtering changes it."""
+    markers, signature = clusters.markers('1', 12, WAN_CHAI, ALL_CONDITIONS)
+    nudged = {'lat': WAN_CHAI['lat'] + 0.0002, 'lon': WAN_CHAI['lon'] + 0.0002}
+
+    assert clusters.markers('1', 12, nudged, ALL_CONDITIONS) == (markers, signature)
+    assert clusters.markers('1', 12.6, WAN_CHAI, ALL_CONDITIONS)[1] == signature
+    assert clusters.markers('1', 13, WAN_CHAI, ALL_CONDITIONS)[1] != signature
+    assert clusters.markers('1', 12, WAN_CHAI, ALL_CONDITIONS[:1])[1] != signature
+
+
+def test_hidden_conditions_are_filtered(clusters):
+    """Places with a hidden condition are left out; unknown conditions are always shown."""
+    markers, _ = clusters.markers('1', 12, WAN_CHAI, ['Ruin'])
+    assert markers['customdata'] == [210]
+    assert markers['condition'] == ['Unknown']
@@ -0,0 +1,136 @@
+"""
+Search Index Tests
+Tokenizing of English/Chinese text and BM25 ranking of place documents
+"""
+
+import pandas as pd
+
+from utils.searchIndex import SearchIndex, article_text
+from utils.textTokens import tokenize
+
+DOCUMENTS = [
+    {
+        'slug': 'blue-house',
+        'position': 0,
+        'name': 'Blue House',
+        'address': '72-74A Stone Nullah Lane',
+        'district': 'Wan Chai',
+        'district_zh': '灣仔',
+        'description': 'A tenement painted blue, with a house museum.',
+    },
+    {
+        'slug': 'pawn',
+        'position': 1,
+        'name': 'The Pawn',
+        'address': '62 Johnston Road',
+        'district': 'Wan Chai',
+        'district_zh': '灣仔',
+        'description': 'A former pawn shop by the tram line.',
+    },
+    {
+        'slug': 'tai-o',
+        'position': 2,
+        'name': 'Tai O Stilt Houses',
+        'district': 'Islands',
+        'district_zh': '離島',
+        'description': 'Houses on stilts over the water.',
+    },
+]
+
+
+def slugs(results):
+    return [result['slug'] for result in results]
+
+
+def test_tokenize_words():
+    """Words are lowercased, transliterated and lightly stemmed; stopwords are dropped."""
+    assert tokenize("The Queen's Road, Café") == ['queen', 'road', 'cafe']
+    assert tokenize('Houses on stilts, 1925') == ['house', 'stilt', '1925']
+    assert tokenize('glass') == ['glass']
+    assert tokenize(None) == []
+
+
+def test_tokenize_chinese():
+    """Runs of Chinese characters give character unigrams and bigrams."""
+    assert tokenize('灣仔藍屋') == ['灣', '仔', '藍', '屋', '灣仔', '仔藍', '藍屋']
+    assert tokenize('Blue House 藍屋') == ['blue', 'house', '藍', '屋', '藍屋']
+
+
+def test_article_text():
+    """Markdown markup is removed, keeping the words of links and headings."""
+    source = '# Blue House\n\n![photo](/assets/a.jpg) A *blue* [tenement](https://x.test).'
+    assert article_text(source) == 'Blue House A blue tenement .'
+
+
+def test_name_matches_rank_first():
+    """A term in a place's name outweighs the same term in another place's description."""
+    index = SearchIndex(
+        [
+            {'slug': 'described', 'position': 0, 'description': 'Near the tram depot'},
+            {'slug': 'named', 'position': 1, 'name': 'Tram Depot'},
+        ]
+    )
+    assert slugs(index.search('tram')) == ['named', 'described']
+    assert index.search('kowloon') == []
+
+
+def test_shorter_documents_rank_higher():
+    """BM25 length normalisation: on equal term frequencies the shorter document wins."""
+    index = SearchIndex(DOCUMENTS)
+    # Both have 'house' in their name and description; the Blue House also has an address
+    assert slugs(index.search('house')) == ['tai-o', 'blue-house']
+    assert slugs(index.search('灣仔')) == ['pawn', 'blue-house']
+
+
+def test_rarer_terms_score_higher():
+    """BM25 idf: a term found in one document beats one found in most of them."""
+    index = SearchIndex(DOCUMENTS)
+    wan_chai = index.search('wan')[0]['score']
+    tram = index.search('tram')[0]['score']
+    assert tram > wan_chai
+
+
+def test_last_term_matches_as_prefix():
+    """Search as you type: the last term also matches longer terms, a little lower."""
+    index = SearchIndex(DOCUMENTS)
+    assert slugs(index.search('john')) == ['pawn']
+    assert slugs(index.search('stil')) == ['tai-o']
+    assert index.search('stil')[0]['score'] < index.search('stilt')[0]['score']
+    assert index.search('john road') == index.search('road')
+
+
+def test_chinese_queries():
+    """Chinese district names match on characters and bigrams."""
+    index = SearchIndex(DOCUMENTS)
+    assert slugs(index.search('離島')) == ['tai-o']
+    assert slugs(index.search('藍屋')) == []
+    assert slugs(index.search('仔')) == ['pawn', 'blue-house']
+
+
+def test_results_and_snippets():
+    """Results carry the document fields, and a snippet around the first match."""
+    index = SearchIndex(DOCUMENTS)
+    result = index.search('tram', limit=1)[0]
+    assert result['name'] == 'The Pawn'
+    assert result['position'] == 1
+    assert result['snippet'] == 'A former pawn shop by the tram line.'
+    assert len(index.search('wan', limit=1)) == 1
+
+
+def test_from_sources(tmp_path):
+    """Articles join their place by slug; other articles become documents of their own."""
+    places = pd.DataFrame(
+        [{'name': 'Blue House', 'district': 'Wan Chai', 'description': float('nan')}]
+    )
+    (tmp_path / 'blue-house.md').write_text('# Blue House\n\nA kitchen garden.', encoding='utf-8')
+    (tmp_path / 'tram-walk.md').write_text('# Tram Walk\n\nFrom Blue House.', encoding='utf-8')
+
+    index = SearchIndex.from_sources(places, {'Blue House': 'blue-house'}, tmp_path)
+
+    assert [(d['slug'], d['position'], d['name']) for d in index.documents] == [
+        ('blue-house', 0, 'Blue House'),
+        ('tram-walk', None, 'Tram Walk'),
+    ]
+    assert index.documents[0]['description'] is None
+    assert slugs(index.search('kitchen')) == ['blue-house']
+    assert slugs(index.search('tram')) == ['tram-walk']
@@ -0,0 +1,222 @@
+"""
+Shared Cache Tests
+The shared memory slot table and the Redis protocol client (against loadtest.fake_redis)
+"""
+
+import io
+import multiprocessing
+import os
+import socket
+
+import pytest
+
+from loadtest.fake_redis import start_fake_redis
+from utils import sharedCache
+from utils.sharedCache import RedisProtocolCache, RedisProtocolError, SharedMemoryCache
+
+
+class Clock:
+    """Stand-in for time.time that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sharedCache.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def shm(tmp_path):
+    """A 1 MB table of 4 KB slots (128 buckets)."""
+    return SharedMemoryCache(path=str(tmp_path / 'table'), size_mb=1, slot_kb=4)
+
+
+def test_shm_set_get_delete(shm):
+    """Values round-trip; add never overwrites; deleted keys miss."""
+    assert shm.get('missing') is None
+    assert shm.set('place', {'name': 'Blue House', 'stars': [1, 2]})
+    assert shm.get('place') == {'name': 'Blue House', 'stars': [1, 2]}
+    assert shm.has('place')
+
+    assert not shm.add('place', 'other')
+    assert shm.add('new', 'value')
+    assert shm.get('place')['name'] == 'Blue House'
+
+    assert shm.delete('place')
+    assert not shm.delete('place')
+    assert shm.get('place') is None
+    assert shm.clear()
+    assert shm.get('new') is None
+
+
+def test_shm_slot_size_limit(shm):
+    """Values are compressed to fit a slot; ones that still do not fit are not cached."""
+    assert shm.set('repetitive', 'x' * 100_000)
+    assert shm.get('repetitive') == 'x' * 100_000
+
+    random_bytes = os.urandom(5000)
+    assert not shm.set('random', random_bytes)
+    assert shm.get('random') is None
+
+
+def test_shm_expiry(shm, clock):
+    """Entries expire after their timeout; a timeout of 0 never expires."""
+    shm.set('short', 1, timeout=10)
+    shm.set('forever', 2, timeout=0)
+    clock.now += 11
+    assert shm.get('short') is None
+    assert not shm.has('short')
+    assert shm.get('forever') == 2
+
+
+def test_shm_bucket_evicts_oldest_write(tmp_path, clock):
+    """A full bucket of two slots replaces the slot written longest ago."""
+    cache = SharedMemoryCache(path=str(tmp_path / 'table'), size_mb=0, slot_kb=4)
+    assert (cache.n_buckets, cache.n_slots) == (1, 2)
+
+    for key in ('a', 'b'):
+        cache.set(key, key)
+        clock.now += 1
+    cache.set('a', 'a2')  # Rewrites its own slot, so 'b' is now the oldest
+    clock.now += 1
+    cache.set('c', 'c')
+
+    assert [cache.get(key) for key in ('a', 'b', 'c')] == ['a2', None, 'c']
+
+
+def test_shm_bucket_reuses_expired_slot(tmp_path, clock):
+    """An expired slot is replaced before a live one, even if the live one is older."""
+    cache = SharedMemoryCache(path=str(tmp_path / 'table'), size_mb=0, slot_kb=4)
+    cache.set('old', 1, timeout=0)
+    clock.now += 1
+    cache.set('expiring', 2, timeout=5)
+    clock.now += 10
+    cache.set('new', 3)
+
+    assert [cache.get(key) for key in ('old', 'expiring', 'new')] == [1, None, 3]
+
+
+def _set_in_child(path, key, value):
+    SharedMemoryCache(path=path, size_mb=1, slot_kb=4).set(key, value)
+
+
+def test_shm_is_shared_between_processes(shm):
+    """A value written by another process (a forked worker) is read from the same file."""
+    shm.set('before', 'fork')  # Maps the table before forking, as a preloaded app does
+    process = multiprocessing.get_context('fork').Process(
+        target=_set_in_child, args=(shm.path, 'from-child', 42)
+    )
+    process.start()
+    process.join(10)
+
+    assert process.exitcode == 0
+    assert shm.get('from-child') == 42
+    assert shm.get('before') == 'fork'
+
+
+def test_shm_layout_change_resets_table(shm):
+    """A table opened with another slot size starts empty instead of misreading slots."""
+    shm.set('key', 'value')
+    other = SharedMemoryCache(path=shm.path, size_mb=1, slot_kb=8)
+    assert other.get('key') is None
+    other.set('key', 'other')
+    assert other.get('key') == 'other'
+
+
+@pytest.fixture
+def redis_server():
+    server = start_fake_redis()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def redis(redis_server):
+    return RedisProtocolCache(url=redis_server.url, key_prefix='test:')
+
+
+def test_resp_encoding():
+    """Commands are RESP arrays of bulk strings."""
+    assert RedisProtocolCache._encode(('SET', 'k', b'\x00v', 5)) == (
+        b'*4\r\n$3\r\nSET\r\n$1\r\nk\r\n$2\r\n\x00v\r\n$1\r\n5\r\n'
+    )
+
+
+def test_resp_replies():
+    """Status, integer, bulk, null and array replies are decoded; errors raise."""
+    cache = RedisProtocolCache()
+    reader = io.BytesIO(b'+OK\r\n:3\r\n$5\r\na\r\nbc\r\n$-1\r\n*2\r\n$1\r\n0\r\n*0\r\n')
+    assert [cache._read_reply(reader) for _ in range(5)] == ['OK', 3, b'a\r\nbc', None, [b'0', []]]
+
+    with pytest.raises(RedisProtocolError, match='WRONGTYPE'):
+        cache._read_reply(io.BytesIO(b'-WRONGTYPE bad\r\n'))
+    with pytest.raises(ConnectionError):
+        cache._read_reply(io.BytesIO(b'$5\r\nab'))
+
+
+def test_redis_set_get_delete(redis, redis_server):
+    """Values round-trip under the key prefix; add is SET NX."""
+    assert redis.set('place', {'name': 'Blue House'})
+    assert redis.get('place') == {'name': 'Blue House'}
+    assert redis.has('place')
+    assert b'test:place' in redis_server.store
+
+    assert not redis.add('place', 'other')
+    assert redis.add('other', 'x' * 10_000)  # Compressed
+    assert redis.get_many('place', 'missing', 'other') == [
+        {'name': 'Blue House'},
+        None,
+        'x' * 10_000,
+    ]
+
+    assert redis.delete('place')
+    assert not redis.has('place')
+
+
+def test_redis_timeouts(redis, redis_server):
+    """Timeouts are sent in milliseconds; 0 stores without expiry."""
+    redis.set('short', 1, timeout=30)
+    redis.set('forever', 2, timeout=0)
+    assert redis.execute('TTL', 'test:short') in (29, 30)
+    assert redis.execute('TTL', 'test:forever') == -1
+
+
+def test_redis_clear_keeps_other_prefixes(redis, redis_server):
+    """clear() removes only this cache's keys when it has a prefix."""
+    other = RedisProtocolCache(url=redis_server.url, key_prefix='other:')
+    redis.set('a', 1)
+    other.set('a', 2)
+
+    assert redis.clear()
+    assert redis.get('a') is None
+    assert other.get('a') == 2
+
+
+def test_redis_reconnects(redis, redis_server):
+    """A connection the server closed is replaced on the next command."""
+    redis.set('key', 'value')
+    redis._local.connection[0].shutdown(socket.SHUT_RDWR)
+    assert redis.get('key') == 'value'
+
+
+def test_redis_unreachable_server_misses():
+    """Without a server, reads miss and writes report failure instead of raising."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    cache = RedisProtocolCache(url=f'redis://127.0.0.1:{port}/0', socket_timeout=0.5)
+
+    assert cache.get('key') is None
+    assert not cache.set('key', 'value')
+    assert not cache.has('key')
+    assert cache.get_many('a', 'b') == [None, None]
+    with pytest.raises(OSError):
+        cache.execute('PING')
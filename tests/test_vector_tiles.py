@@ -0,0 +1,241 @@
+"""
+Vector Tiles Tests
+The protocol buffer and MVT geometry encoders, checked with a minimal decoder
+"""
+
+import struct
+
+import geopandas as gpd
+import pandas as pd
+import pytest
+from shapely.geometry import Polygon, box
+from shapely.geometry.polygon import orient
+
+from utils.placeClusters import mercator
+from utils.vectorTiles import (
+    EMPTY_TILE,
+    POINT,
+    POLYGON,
+    TILE_EXTENT,
+    VectorTiles,
+    _varint,
+    _zigzag,
+    encode_layer,
+    encode_tile,
+    point_geometry,
+    polygon_geometry,
+)
+
+
+def read_varint(data, i):
+    value = shift = 0
+    while True:
+        byte = data[i]
+        i += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, i
+
+
+def read_fields(data):
+    """(field number, value) pairs of a protocol buffer message."""
+    fields, i = [], 0
+    while i < len(data):
+        key, i = read_varint(data, i)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, i = read_varint(data, i)
+        elif wire_type == 1:
+            value, i = struct.unpack('<d', data[i : i + 8])[0], i + 8
+        else:
+            length, i = read_varint(data, i)
+            value, i = data[i : i + length], i + length
+        fields.append((field, value))
+    return fields
+
+
+def read_packed(data):
+    values, i = [], 0
+    while i < len(data):
+        value, i = read_varint(data, i)
+        values.append(value)
+    return values
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_geometry(commands):
+    """Rings (or points) of a geometry as lists of absolute tile coordinates."""
+    parts, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            continue
+        for _ in range(count):
+            x, y = x + unzigzag(commands[i]), y + unzigzag(commands[i + 1])
+            i += 2
+            if command == 1:
+                parts.append([])
+            parts[-1].append((x, y))
+    return parts
+
+
+def decode_tile(data):
+    """Layers of a tile: {name: {'version', 'extent', 'features': [(id, props, type, parts)]}}."""
+    layers = {}
+    for field, layer in read_fields(data):
+        assert field == 3
+        fields = read_fields(layer)
+        keys = [value.decode() for field, value in fields if field == 3]
+        values = []
+        for field, value in fields:
+            if field == 4:
+                ((kind, raw),) = read_fields(value)
+                decoders = {1: bytes.decode, 3: float, 6: unzigzag, 7: bool}
+                values.append(decoders[kind](raw))
+        features = []
+        for field, value in fields:
+            if field == 2:
+                feature = dict(read_fields(value))
+                tags = read_packed(feature.get(2, b''))
+                properties = {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}
+                geometry = decode_geometry(read_packed(feature[4]))
+                features.append((feature.get(1), properties, feature[3], geometry))
+        name = next(value for field, value in fields if field == 1).decode()
+        layers[name] = {
+            'version': next(value for field, value in fields if field == 15),
+            'extent': next(value for field, value in fields if field == 5),
+            'features': features,
+        }
+    return layers
+
+
+def signed_area(ring):
+    """Shoelace area; positive is clockwise on screen (tile y grows downwards)."""
+    return sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1])) / 2
+
+
+@pytest.mark.parametrize(
+    'value, encoded',
+    [(0, 0), (-1, 1), (1, 2), (-2, 3), (2**31 - 1, 2**32 - 2), (-(2**31), 2**32 - 1)],
+)
+def test_zigzag(value, encoded):
+    assert _zigzag(value) == encoded
+    assert unzigzag(encoded) == value
+
+
+def test_varint():
+    assert _varint(1) == b'\x01'
+    assert _varint(300) == b'\xac\x02'
+    assert read_varint(_varint(2**40), 0) == (2**40, 6)
+
+
+def test_point_geometry():
+    """The example of the vector tile specification: MoveTo(25, 17)."""
+    assert point_geometry(25, 17) == [9, 50, 34]
+
+
+def test_polygon_geometry_matches_specification():
+    """The specification's polygon example: MoveTo, LineTo with deltas, ClosePath."""
+    polygon = Polygon([(3, 6), (8, 12), (20, 34)])
+    assert polygon_geometry([polygon]) == [9, 6, 12, 18, 10, 12, 24, 44, 15]
+
+
+def test_polygon_cursor_carries_across_rings():
+    """Every ring starts relative to the last point of the previous ring, not to the origin."""
+    first = orient(box(0, 0, 10, 10, ccw=False), sign=1.0)
+    second = orient(box(20, 20, 30, 30), sign=1.0)
+    commands = polygon_geometry([first, second])
+
+    rings = decode_geometry(commands)
+    assert rings == [list(first.exterior.coords)[:-1], list(second.exterior.coords)[:-1]]
+    second_move = commands.index(9, 1)
+    (last_x, last_y), (start_x, start_y) = rings[0][-1], rings[1][0]
+    assert commands[second_move + 1 : second_move + 3] == [
+        _zigzag(start_x - last_x),
+        _zigzag(start_y - last_y),
+    ]
+
+
+def test_polygon_winding():
+    """Oriented polygons give exteriors with positive area in tile space and holes negative."""
+    square = [(0, 0), (100, 0), (100, 100), (0, 100)]
+    hole = [(40, 40), (60, 40), (60, 60), (40, 60)]
+    polygon = orient(Polygon(square, [hole]), sign=1.0)
+    exterior, interior = decode_geometry(polygon_geometry([polygon]))
+    assert signed_area(exterior) == 100 * 100
+    assert signed_area(interior) == -20 * 20
+
+
+def test_encode_layer_round_trip():
+    """Ids, geometry types and typed properties survive; keys and values are shared."""
+    properties = {'name': 'Blue House', 'floors': 4, 'height': 12.5, 'listed': True}
+    features = [
+        (7, properties, POINT, point_geometry(1, 2)),
+        (None, {'name': 'Blue House', 'floors': -1, 'missing': None}, POINT, point_geometry(3, 4)),
+    ]
+    layer = encode_layer('in-use', features, extent=512)
+    layers = decode_tile(encode_tile([layer, b'']))
+
+    assert list(layers) == ['in-use']
+    assert layers['in-use']['version'] == 2
+    assert layers['in-use']['extent'] == 512
+    assert layers['in-use']['features'] == [
+        (7, properties, POINT, [[(1, 2)]]),
+        (None, {'name': 'Blue House', 'floors': -1}, POINT, [[(3, 4)]]),
+    ]
+    assert layer.count(b'Blue House') == 1
+
+
+@pytest.fixture
+def tiles(tmp_path):
+    places = pd.DataFrame(
+        {
+            'latitude': [22.2770, 22.2780],
+            'longitude': [114.1730, 114.1740],
+            'name': ['Blue House', 'The Pawn'],
+            'location': ['Wan Chai', 'Wan Chai'],
+            'curr_condition': ['In use', 'Ruin'],
+        },
+        index=[10, 11],
+    )
+    districts = gpd.GeoDataFrame(
+        {'code': ['A'], 'district': ['Wan Chai'], 'region': ['Hong Kong Island']},
+        geometry=[box(114.16, 22.27, 114.19, 22.285)],
+        crs='EPSG:4326',
+    )
+    return VectorTiles(places, districts, 'v1', cache_dir=tmp_path)
+
+
+def test_rendered_tiles(tiles):
+    """Places are points in their condition's layer; districts are clockwise polygons."""
+    z = 12
+    x, y = (int(value[0] * 2**z) for value in mercator([114.1735], [22.2775]))
+    places = decode_tile(tiles.tile('places', z, x, y))
+    assert sorted(places) == ['in-use', 'ruin']
+    feature_id, properties, geometry_type, ((point,),) = places['in-use']['features'][0]
+    assert (feature_id, geometry_type) == (10, POINT)
+    assert properties == {
+        'name': 'Blue House',
+        'location': 'Wan Chai',
+        'condition': 'In use',
+        'id': 10,
+    }
+    assert all(0 <= value < TILE_EXTENT for value in point)
+
+    districts = decode_tile(tiles.tile('districts', z, x, y))
+    ((feature_id, properties, geometry_type, rings),) = districts['districts']['features']
+    assert (feature_id, geometry_type, properties['code']) == (1, POLYGON, 'A')
+    assert len(rings) == 1 and signed_area(rings[0]) > 0
+
+
+def test_tiles_outside_the_data_are_empty_and_uncached(tiles, tmp_path):
+    """Tiles away from the data are empty without rendering; off-grid tiles do not exist."""
+    assert tiles.tile('places', 12, 0, 0) == EMPTY_TILE
+    assert tiles.tile('places', 12, 4096, 0) is None
+    assert tiles.stats()['outside'] == 1
+    assert not any(tmp_path.iterdir())
@@ -3,14 +3,30 @@ AI Chat Utility Module
 Handles DeepSeek API integration for AI chat functionality
 """
 
+import hashlib
 import os
+import threading
+import time
+
+import httpx
 from openai import OpenAI
 
+from utils.chatCache import answer_cache
+from utils.chatHistory import compact_history, message_tokens, prompt_stats
+
 # DeepSeek API configuration - read directly from environment variables
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
-DEEPSEEK_BASE_URL = 'https://api.deepseek.com'
+# Any OpenAI-compatible endpoint works (e.g. a local stub server for testing)
+DEEPSEEK_BASE_URL = os.getenv('DEEPSEEK_BASE_URL', 'https://api.deepseek.com')
 DEEPSEEK_MODEL = 'deepseek-chat'
 
+# Stream tokens to the chat widget as they arrive instead of waiting for the full reply
+CHAT_STREAMING = os.getenv('CHAT_STREAMING', '').lower() in ('1', 'true', 'yes')
+
+# Generation parameters shared by the blocking and streaming paths
+CHAT_TEMPERATURE = 0.6
+CHAT_MAX_TOKENS = 1000
+
 # System prompt for Hong Kong history context
 SYSTEM_PROMPT = """You are a helpful AI assistant specializing in Hong Kong's history, culture, and historic places. 
 You help users explore and learn about Hong Kong's rich heritage, including:
@@ -28,21 +44,102 @@ Answer in the same language as the user use, particularly English or Chinese.
 Output your answer in pure text rather than markdown format.
 """
 
+# Shared client so TLS connections to the API are pooled and kept alive between messages
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OpenAI:
+    """
+    Return the shared DeepSeek client, creating it on first use.
+
+    The client is recreated after a fork (e.g. in gunicorn workers) so that processes
+    never share pooled sockets.
 
-def get_ai_response(user_message: str, conversation_history: list = None) -> dict:
+    Returns:
+        OpenAI: Client bound to the DeepSeek endpoint
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = OpenAI(
+                    api_key=DEEPSEEK_API_KEY,
+                    base_url=DEEPSEEK_BASE_URL,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(
+                            max_connections=20,
+                            max_keepalive_connections=10,
+                            keepalive_expiry=120,
+                        ),
+                        timeout=httpx.Timeout(60.0, connect=5.0),
+                    ),
+                )
+                _client_pid = os.getpid()
+    return _client
+
+
+def build_messages(user_message: str, conversation_history: list = None) -> tuple:
+    """
+    Build the message list sent to the API.
+
+    The history is fitted into the prompt token budget (see utils.chatHistory): recent turns
+    are sent verbatim, older ones as a condensed summary.
+
+    Parameters:
+        user_message (str): The user's message
+        conversation_history (list): Previous messages (see get_ai_response)
+
+    Returns:
+        tuple: (system prompt, history and the current user message;
+            report with the estimated "prompt_tokens" and how the history was compacted)
+    """
+    system = {"role": "system", "content": SYSTEM_PROMPT}
+    current = {"role": "user", "content": user_message}
+    fixed_tokens = message_tokens(system) + message_tokens(current)
+    history, report = compact_history(conversation_history, user_message, fixed_tokens)
+    report["prompt_tokens"] = fixed_tokens + report["history_tokens"]
+    return [system, *history, current], report
+
+
+def answer_settings() -> dict:
+    """Everything besides the conversation that shapes an answer (part of the cache key)."""
+    return {
+        "model": DEEPSEEK_MODEL,
+        "temperature": CHAT_TEMPERATURE,
+        "max_tokens": CHAT_MAX_TOKENS,
+        "prompt": hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16],
+    }
+
+
+def answer_key(user_message: str, messages: list, use_cache: bool = True):
+    """Answer cache key for a request (None when the cache must be bypassed)."""
+    if not use_cache:
+        return None
+    # Context is what the model sees between the system prompt and the current message
+    return answer_cache.key(user_message, messages[1:-1], answer_settings())
+
+
+def get_ai_response(user_message: str, conversation_history: list = None, use_cache: bool = True) -> dict:
     """
     Send a message to DeepSeek API and get AI response.
+
+    Answers to questions asked before (after normalization, with the same context and model
+    settings) come from the answer cache (see utils.chatCache) without an API call.
     
     Parameters:
         user_message (str): The user's message
         conversation_history (list): List of previous messages in format:
             [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]
+        use_cache (bool): Set to False to always ask the API
     
     Returns:
         dict: Response dictionary with keys:
             - "success" (bool): Whether the request was successful
             - "message" (str): AI response message or error message
             - "error" (str, optional): Error details if success is False
+            - "prompt_tokens" (int, optional): Estimated prompt size, when the API was called
     """
     if not DEEPSEEK_API_KEY:
         return {
@@ -51,39 +148,36 @@ def get_ai_response(user_message: str, conversation_history: list = None) -> dic
             "error": "Missing API key"
         }
     
+    messages, report = build_messages(user_message, conversation_history)
+    key = answer_key(user_message, messages, use_cache)
+    cached = answer_cache.get(key)
+    if cached is not None:
+        return {
+            "success": True,
+            "message": cached
+        }
+
     try:
-        # Initialize OpenAI client with DeepSeek endpoint
-        client = OpenAI(
-            api_key=DEEPSEEK_API_KEY,
-            base_url=DEEPSEEK_BASE_URL
-        )
-        
-        # Build messages list
-        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-        
-        # Add conversation history if provided
-        if conversation_history:
-            # Limit to last 10 messages to manage context window
-            recent_history = conversation_history[-10:] if len(conversation_history) > 10 else conversation_history
-            messages.extend(recent_history)
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message + "\n Output your answer in pure text rather than markdown format."})
-        
-        # Make API request
-        response = client.chat.completions.create(
+        # Make API request over the shared client
+        started = time.perf_counter()
+        response = get_client().chat.completions.create(
             model=DEEPSEEK_MODEL,
             messages=messages,
-            temperature=0.6,
-            max_tokens=1000
+            temperature=CHAT_TEMPERATURE,
+            max_tokens=CHAT_MAX_TOKENS
         )
         
         # Extract AI response
         ai_message = response.choices[0].message.content
+        tokens = response.usage.total_tokens if response.usage else 0
+        answer_cache.put(key, ai_message, time.perf_counter() - started, tokens)
+        report["api_prompt_tokens"] = response.usage.prompt_tokens if response.usage else 0
+        prompt_stats.record(report)
         
         return {
             "success": True,
-            "message": ai_message
+            "message": ai_message,
+            "prompt_tokens": report["prompt_tokens"]
         }
         
     except Exception as e:
@@ -93,3 +187,61 @@ def get_ai_response(user_message: str, conversation_history: list = None) -> dic
             "error": str(e)
         }
 
+
+def stream_ai_response(user_message: str, conversation_history: list = None, use_cache: bool = True):
+    """
+    Stream a DeepSeek response token by token.
+
+    A cached answer (see get_ai_response) is sent as a single chunk.
+
+    Parameters:
+        user_message (str): The user's message
+        conversation_history (list): Previous messages (see get_ai_response)
+        use_cache (bool): Set to False to always ask the API
+
+    Yields:
+        dict: Events with keys "event" and "data":
+            - {"event": "delta", "data": "<text chunk>"} for each chunk received
+            - {"event": "done", "data": "<full message>"} once the reply is complete
+            - {"event": "error", "data": "<error message>"} if the request fails
+    """
+    if not DEEPSEEK_API_KEY:
+        yield {
+            "event": "error",
+            "data": "AI chat is not configured. Please set DEEPSEEK_API_KEY environment variable."
+        }
+        return
+
+    messages, report = build_messages(user_message, conversation_history)
+    key = answer_key(user_message, messages, use_cache)
+    cached = answer_cache.get(key)
+    if cached is not None:
+        yield {"event": "delta", "data": cached}
+        yield {"event": "done", "data": cached}
+        return
+
+    prompt_stats.record(report)
+    chunks = []
+    started = time.perf_counter()
+    try:
+        stream = get_client().chat.completions.create(
+            model=DEEPSEEK_MODEL,
+            messages=messages,
+            temperature=CHAT_TEMPERATURE,
+            max_tokens=CHAT_MAX_TOKENS,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                chunks.append(delta)
+                yield {"event": "delta", "data": delta}
+    except Exception as e:
+        yield {"event": "error", "data": f"Sorry, I encountered an error: {str(e)}"}
+        return
+
+    answer = "".join(chunks)
+    answer_cache.put(key, answer, time.perf_counter() - started)
+    yield {"event": "done", "data": answer}
@@ -1,181 +1,44 @@
+import hashlib
+
 import pandas as pd
-import geopandas as gpd
 import plotly.graph_objects as go
-from shapely.geometry import Point
-from dash import html
+from dash import Patch, html
 
+from utils.districtOutlines import detail_level_for_zoom
+from utils.vectorTiles import condition_layer
 from layouts.layout_main import (
     # michelin_stars,
     # bib_gourmand,
     # green_star,
-    color_map,
     condition_color_map,
 )
 
 
-def plot_geometry_outline(fig, geometry, line_width=0.2):
+# Basemap of every map: Plotly's built-in Positron style (see utils.basemapTiles for a local copy)
+MAP_STYLE = 'carto-positron'
+
+
+def add_outline_trace(fig, lons, lats, line_width=0.2):
     """
-    Draw the geographic boundary of a district or region on a Plotly map.
+    Add a boundary line trace to a Plotly map.
 
     Parameters:
         fig (go.Figure): The Plotly figure to which the outline will be added.
-        geometry (shapely.geometry.Polygon or MultiPolygon):
-            A geometry object representing the area to be outlined.
-            Typically obtained via `geometry = geo_df['geometry'].iloc[0]`
+        lons (list): Longitudes, with None separating disconnected lines.
+        lats (list): Latitudes, with None separating disconnected lines.
         line_width (float): Width of the outline line in pixels.
-
-    Notes:
-        This function handles both single Polygon and MultiPolygon geometries, and plots their exterior boundaries
-        using black lines on the map.
     """
-    if geometry.geom_type == 'Polygon':
-        x, y = geometry.exterior.xy
-        fig.add_trace(
-            go.Scattermap(
-                lat=list(y),
-                lon=list(x),
-                mode='lines',
-                line=dict(width=line_width, color='rgba(194, 40, 45, 0.8)'),
-                hoverinfo='none',
-                showlegend=False,
-            )
-        )
-    elif geometry.geom_type == 'MultiPolygon':
-        for poly in geometry.geoms:
-            x, y = poly.exterior.xy
-            fig.add_trace(
-                go.Scattermap(
-                    lat=list(y),
-                    lon=list(x),
-                    mode='lines',
-                    line=dict(width=line_width, color='rgba(194, 40, 45, 0.8)'),
-                    hoverinfo='none',
-                    showlegend=False,
-                )
-            )
-
-
-def plot_regional_outlines(region_df, region):
-    """
-    Plot the outlines of a selected region on a map.
-
-    Args:
-        region_df (GeoDataFrame): A GeoDataFrame containing geometries of regions with a 'region' column.
-        region (str): The name of the region to plot.
-
-    Returns:
-        fig (plotly.graph_objs.Figure): A Plotly Figure object with the region outlines plotted.
-
-    Raises:
-        ValueError: If the specified region is not found in region_df.
-    """
-    fig = go.Figure(go.Scattermap())  # Initialize empty figure with mapbox
-
-    # Filter the GeoDataFrame for the selected region
-    filtered_region = region_df[region_df['region'] == region]
-
-    if filtered_region.empty:
-        # Handle case when the region is not found
-        raise ValueError(f"Region '{region}' not found in the provided GeoDataFrame.")
-
-    # Loop through the filtered GeoDataFrame
-    for _, row in filtered_region.iterrows():
-        specific_geometry = row['geometry']
-        plot_geometry_outline(fig, specific_geometry, line_width=1)
-
-    # Default to geometry centroid
-    try:
-        combined_geom = filtered_region.unary_union
-        default_center_lat = combined_geom.centroid.y
-        default_center_lon = combined_geom.centroid.x
-    except Exception:
-        default_center_lat = 22.3193
-        default_center_lon = 114.1694
-
-    # Hardcoded centers and zooms per HK region
-    region_view = {
-        'New Territories': {'lat': 22.445222, 'lon': 114.095495, 'zoom': 11},
-        'Kowloon': {'lat': 22.321008, 'lon': 114.184753, 'zoom': 12.5},
-        'Hong Kong Island': {'lat': 22.270787, 'lon': 114.176715, 'zoom': 12.5},
-    }
-
-    view = region_view.get(region)
-    center_lat = view['lat'] if view else default_center_lat
-    center_lon = view['lon'] if view else default_center_lon
-    map_zoom = view['zoom'] if view else 11
-
-    # Update map layout settings for Hong Kong regions
-    fig.update_layout(
-        map_style='carto-positron',
-        map_zoom=map_zoom,
-        map_center_lat=center_lat,
-        map_center_lon=center_lon,
-        margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
-        showlegend=False,
-    )
-    return fig
-
-
-def plot_region_center_view(region_df, region):
-    """
-    Center and zoom the map to the centroid of a selected region without plotting boundaries.
-
-    Args:
-        region_df (GeoDataFrame): GeoDataFrame with 'region' and 'geometry' columns (Hong Kong districts).
-        region (str): Region name to center on.
-
-    Returns:
-        fig (go.Figure): Plotly map figure centered on the region centroid.
-    """
-    # Filter to selected region
-    filtered_region = region_df[region_df['region'] == region]
-    if filtered_region.empty:
-        # Fallback to default Hong Kong view
-        return go.Figure(go.Scattermap()).update_layout(
-            map_style='carto-positron',
-            map_zoom=11,
-            map_center_lat=22.3193,
-            map_center_lon=114.1694,
-            margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
+    fig.add_trace(
+        go.Scattermap(
+            lat=lats,
+            lon=lons,
+            mode='lines',
+            line=dict(width=line_width, color='rgba(194, 40, 45, 0.8)'),
+            hoverinfo='none',
             showlegend=False,
-            uirevision=region,
         )
-
-    # Compute centroid of the combined geometry
-    try:
-        combined_geom = filtered_region.unary_union
-        center_lat = combined_geom.centroid.y
-        center_lon = combined_geom.centroid.x
-    except Exception:
-        center_lat, center_lon = 22.3193, 114.1694
-
-    # Region-specific zoom defaults for Hong Kong
-    region_view = {
-        'New Territories': {'lat': 22.445222, 'lon': 114.095495, 'zoom': 11},
-        'Kowloon': {'lat': 22.321008, 'lon': 114.184753, 'zoom': 12.5},
-        'Hong Kong Island': {'lat': 22.270787, 'lon': 114.176715, 'zoom': 12.5},
-    }
-
-    view = region_view.get(region)
-    zoom = view['zoom'] if view else 11
-    # Prefer pre-defined center for better framing if available
-    center_lat = view['lat'] if view else center_lat
-    center_lon = view['lon'] if view else center_lon
-
-    # Build a bare map centered on the region (no outlines)
-    fig = go.Figure(go.Scattermap())
-    fig.update_layout(
-        map_style='carto-positron',
-        map_zoom=zoom,
-        map_center_lat=center_lat,
-        map_center_lon=center_lon,
-        margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
-        showlegend=False,
-        uirevision=region,
     )
 
-    return fig
-
 
 def get_place_details(row):
     """
@@ -273,193 +136,304 @@ def get_place_details(row):
     return details_layout
 
 
-def generate_hover_text(row):
+# Explore map traces, in this fixed order: the district outline, then a single marker trace
+# holding every place or cluster (colours and hover text are per-point arrays). Because every map
+# figure has the same two traces, switching views only replaces trace data (see map_view_patch).
+MAP_CONDITIONS = tuple(condition_color_map)
+OTHER_CONDITION_COLOR = '#FFB84D'
+MARKER_SIZE = 11
+
+# Per-point hover text is '<name><br><location><br>'; the shared styling is in the template
+HOVER_TEMPLATE = (
+    '<span style="font-family: \'Libre Franklin\', sans-serif; font-size: 12px; color: #000;">'
+    '%{text}</span><extra>%{hovertext}</extra>'
+)
+
+HONG_KONG_VIEW = {'zoom': 11, 'center': {'lat': 22.3193, 'lon': 114.1694}}
+
+# Region-specific zoom defaults for Hong Kong
+REGION_VIEWS = {
+    'New Territories': {'zoom': 11, 'center': {'lat': 22.445222, 'lon': 114.095495}},
+    'Kowloon': {'zoom': 12.5, 'center': {'lat': 22.321008, 'lon': 114.184753}},
+    'Hong Kong Island': {'zoom': 12.5, 'center': {'lat': 22.270787, 'lon': 114.176715}},
+}
+
+MARKER_FIELDS = ('lat', 'lon', 'text', 'condition', 'customdata', 'color', 'size')
+
+
+def add_marker_columns(places_df):
     """
-    Generate HTML-formatted hover text for a place.
+    Precompute the map marker styling of every place (vectorized, once at startup).
 
     Parameters:
-        row (pd.Series or dict): A pandas Series or dictionary containing place information.
+        places_df (pd.DataFrame): Places with 'name', 'location' and 'curr_condition'.
 
     Returns:
-        hover_text (str): An HTML-formatted string for hover text.
+        pd.DataFrame: Copy with 'hover_text', 'marker_color' and 'marker_size' columns
     """
-    try:
-        name = row['name']
-        location = row['location']
-    except KeyError as e:
-        raise KeyError(f'Missing expected key in row data: {e}')
+    names = places_df['name'].fillna('').astype(str)
+    locations = places_df['location'].fillna('').astype(str)
+    colors = places_df['curr_condition'].map(condition_color_map).fillna(OTHER_CONDITION_COLOR)
+    hover_text = "<span style='font-size: 14px;'>" + names + '</span><br>' + locations + '<br>'
+    return places_df.assign(
+        hover_text=hover_text,
+        marker_color=colors,
+        marker_size=MARKER_SIZE,
+    )
 
-    text_color = '#000'
 
-    hover_text = (
-        f'<span style="font-family: \'Libre Franklin\', sans-serif; font-size: 12px; color: {text_color};">'
-        f"<span style='font-size: 14px;'>{name}</span><br>"
-        f'{location}<br>'
-    )
-    return hover_text
+def empty_map_view(view, uirevision):
+    """
+    Map contents without outline or markers (region and Hong Kong overviews).
 
+    Parameters:
+        view (dict): {'zoom', 'center': {'lat', 'lon'}}
+        uirevision (str): Changes whenever the map should recentre
 
-def label_properties(star):
+    Returns:
+        dict: Map view (see district_map_view)
     """
-    Return:
-        display label
-        marker size
-        opacity
-        colour
-    for a given star rating.
+    return {
+        'district': None,
+        'outline': {'lon': [], 'lat': []},
+        'zoom': view['zoom'],
+        'center': dict(view['center']),
+        'uirevision': uirevision,
+    }
+
+
+def region_map_view(region_df, region):
     """
-    if star == 0.25:
-        return 'Selected', 9, 0.9, color_map[0.25]
-    elif star == 0.5:
-        return 'Bib', 11, 1, color_map[0.5]
-    else:
-        return '★' * int(star), 11, 1, color_map[star]
+    Map contents centred on a region, without boundaries.
 
+    Parameters:
+        region_df (GeoDataFrame): Districts with 'region' and 'geometry' columns.
+        region (str): Region name to center on.
 
-def add_star_trace(fig, subset, label_name, marker_size, marker_opacity, marker_color):
+    Returns:
+        dict: Map view (see district_map_view)
     """
-    Add a scatter marker layer to a Plotly map for a specific group of places.
+    view = REGION_VIEWS.get(region)
+    if view is None:
+        filtered_region = region_df[region_df['region'] == region]
+        if filtered_region.empty:
+            return empty_map_view(HONG_KONG_VIEW, region)
+        centroid = filtered_region.unary_union.centroid
+        view = {'zoom': 11, 'center': {'lat': centroid.y, 'lon': centroid.x}}
+    return empty_map_view(view, region)
 
-    Each trace corresponds to a single condition category and is styled with a consistent
-    marker size, opacity, and colour. Hover text and clickData are included for interactivity.
 
-    Parameters:
-        fig (go.Figure): The Plotly figure to which the trace will be added.
-        subset (pd.DataFrame): Subset of places sharing a specific condition.
-        label_name (str): Label used in the legend and for identifying the trace.
-        marker_size (int): Marker size for the place points.
-        marker_opacity (float): Opacity level for the markers.
-        marker_color (str): Colour to apply to the markers (hex or CSS format).
+def district_map_view(data_df, geometry, district_code, zoom_data, outlines):
     """
-    if subset.empty:
-        return
+    Map contents for one district: its outline, centre and zoom (its markers depend on the
+    current zoom and filter, see utils.placeClusters).
 
-    fig.add_trace(
-        go.Scattermap(
-            lat=subset['latitude'],
-            lon=subset['longitude'],
-            mode='markers',
-            marker=dict(size=marker_size, color=marker_color, opacity=marker_opacity),
-            text=subset['hover_text'],
-            customdata=subset.index,
-            hovertemplate='%{text}',
-            name=label_name,
-            showlegend=False,
-            meta=subset.index,  # <- NEW: include explicitly for clickData
-        )
-    )
+    Parameters:
+        data_df (pd.DataFrame): Places of the district, with the columns of add_marker_columns.
+        geometry (shapely geometry): District boundary (centres the map when it has no places).
+        district_code (str): District code.
+        zoom_data (dict): {'zoom', 'center'} to show; missing values fall back to the district.
+        outlines (DistrictOutlines): Precomputed outlines (level of detail picked by zoom).
+
+    Returns:
+        dict: {'district', 'outline': {'lon', 'lat'}, 'zoom', 'center', 'uirevision'}, plain
+            lists only (JSON-ready)
+    """
+    zoom = zoom_data.get('zoom', 14.5)
+    view = empty_map_view({'zoom': zoom, 'center': {'lat': None, 'lon': None}}, str(district_code))
+    lons, lats = outlines.outline(district_code, detail_level_for_zoom(zoom))
+    view['district'] = str(district_code)
+    view['outline'] = {'lon': list(lons), 'lat': list(lats)}
+
+    center = zoom_data.get('center') or {}
+    if center.get('lat') is not None and center.get('lon') is not None:
+        view['center'] = {'lat': center['lat'], 'lon': center['lon']}
+    elif not data_df.empty:
+        view['center'] = {'lat': data_df['latitude'].mean(), 'lon': data_df['longitude'].mean()}
+    else:
+        view['center'] = {'lat': geometry.centroid.y, 'lon': geometry.centroid.x}
+    return view
 
 
-def plot_interactive_district(data_df, geo_df, district_code, zoom_data=None):
+def marker_trace_data(markers):
     """
-    Plot an interactive map of a district, including place points.
+    Data of the marker trace.
 
-    Args:
-        data_df (pd.DataFrame): DataFrame containing place data with 'district_num', 'latitude', 'longitude', etc.
-        geo_df (GeoDataFrame): GeoDataFrame containing geometries of districts with 'code' and 'geometry'.
-        district_code (str or int): The code of the district to plot.
-        zoom_data (dict): Dictionary containing zoom level and center information.
+    Parameters:
+        markers (dict): Per-marker lists for each of MARKER_FIELDS (see utils.placeClusters)
 
     Returns:
-        fig (plotly.graph_objs.Figure): A Plotly Figure object with the district and places plotted.
+        dict: lat, lon, text, hovertext, customdata and marker colour and size (a single size
+            when all markers share it)
+    """
+    sizes = markers['size']
+    size = sizes if len(set(sizes)) > 1 else (sizes[0] if sizes else MARKER_SIZE)
+    return {
+        'lat': markers['lat'],
+        'lon': markers['lon'],
+        'text': markers['text'],
+        'hovertext': markers['condition'],
+        'customdata': markers['customdata'],
+        'marker': {
+            'color': markers['color'],
+            'size': size,
+        },
+    }
+
 
-    Raises:
-        ValueError: If the specified district code is not found in geo_df.
+def tile_layers(places_url, districts_url, visible_conditions=MAP_CONDITIONS, show_places=True):
     """
-    # Initialize zoom_data if not provided
-    if zoom_data is None:
-        zoom_data = {}
+    Map layers drawing the vector tiles of utils.vectorTiles beneath the traces.
 
-    # Get the zoom and center from zoom_data or fallback to district defaults
-    zoom = zoom_data.get('zoom', 14.5)
-    center_lat = zoom_data.get('center', {}).get('lat', None)
-    center_lon = zoom_data.get('center', {}).get('lon', None)
+    District borders are always drawn; places get one circle layer per condition (coloured like
+    the markers) and are only shown when show_places is set, i.e. in the overviews where the
+    marker trace is empty.
 
-    # Initialize a blank figure
-    fig = go.Figure()
-    fig.update_layout(autosize=True)
-
-    # Get the specific geometry for the district
-    filtered_geo = geo_df[geo_df['code'] == str(district_code)]
-    if filtered_geo.empty:
-        raise ValueError(f"District code '{district_code}' not found in the provided GeoDataFrame.")
-
-    specific_geometry = filtered_geo['geometry'].iloc[0]
-    # Plot district boundaries
-    plot_geometry_outline(fig, specific_geometry, line_width=1)
-
-    # Get all places in the district
-    dept_data = data_df[data_df['district_num'] == str(district_code)].copy()
-
-    # If dept_data is not empty, add place points
-    if not dept_data.empty:
-        dept_data['color'] = dept_data['curr_condition'].map(condition_color_map).fillna('#FFB84D')
-        dept_data['hover_text'] = dept_data.apply(generate_hover_text, axis=1)
-
-        # Plot each group by condition
-        for condition in dept_data['curr_condition'].unique():
-            subset = dept_data[dept_data['curr_condition'] == condition]
-            if subset.empty:
-                continue
-
-            marker_color = condition_color_map.get(condition, '#FFB84D')
-            marker_size = 11
-            marker_opacity = 1
-
-            add_star_trace(
-                fig,
-                subset,
-                condition,
-                marker_size,
-                marker_opacity,
-                marker_color,
-            )
-
-        # Calculate the center if zoom_data doesn't have it
-        if center_lat is None or center_lon is None:
-            map_center_lat = dept_data['latitude'].mean()
-            map_center_lon = dept_data['longitude'].mean()
-        else:
-            map_center_lat = center_lat
-            map_center_lon = center_lon
-    else:
-        # If no place data, center based on geometry's centroid
-        centroid = specific_geometry.centroid
-        map_center_lat = centroid.y
-        map_center_lon = centroid.x
+    Parameters:
+        places_url (str): Absolute tile URL template of the places tiles
+        districts_url (str): Absolute tile URL template of the districts tiles
+        visible_conditions (iterable): Conditions whose places are shown
+        show_places (bool): Draw the places layers
+
+    Returns:
+        list: Entries for layout.map.layers
+    """
+    layers = [
+        {
+            'sourcetype': 'vector',
+            'source': [districts_url],
+            'sourcelayer': 'districts',
+            'type': 'line',
+            'color': '#6B6B6B',
+            'line': {'width': 0.8},
+            'below': 'traces',
+        }
+    ]
+    for condition, color in [*condition_color_map.items(), (None, OTHER_CONDITION_COLOR)]:
+        layers.append({
+            'sourcetype': 'vector',
+            'source': [places_url],
+            'sourcelayer': condition_layer(condition),
+            'type': 'circle',
+            'color': color,
+            'circle': {'radius': 4},
+            'below': 'traces',
+            'visible': show_places and (condition is None or condition in visible_conditions),
+        })
+    return layers
+
+
+def map_view_figure(view, markers, layers=None, style=MAP_STYLE):
+    """
+    Build the complete explore map figure (first render of the map).
+
+    The marker arrays are filled in after the figure is built: plotly validates every element of
+    a per-point array, which costs far more than the rest of the figure for large districts.
+
+    Parameters:
+        view (dict): Map view (see district_map_view)
+        markers (dict): Per-marker lists for each of MARKER_FIELDS
+        layers (list, optional): Vector tile layers (see tile_layers)
+        style (str): Basemap style name or style JSON URL
 
-    # Update the layout with the correct zoom and center
+    Returns:
+        dict: Figure with the outline trace followed by the marker trace
+    """
+    fig = go.Figure()
+    add_outline_trace(fig, view['outline']['lon'], view['outline']['lat'], line_width=1)
+    fig.add_trace(
+        go.Scattermap(
+            mode='markers',
+            marker=dict(opacity=1),
+            hovertemplate=HOVER_TEMPLATE,
+            name='Places',
+            showlegend=False,
+        )
+    )
     fig.update_layout(
         font=dict(family='Courier New, monospace', size=18, color='white'),
         width=800,
         height=600,
         hovermode='closest',
         hoverdistance=10,
-        map_style='carto-positron',
-        map_zoom=zoom,  # Zoom level from zoom_data or default
-        map_center_lat=map_center_lat,
-        map_center_lon=map_center_lon,
-        margin={'r': 0, 't': 0, 'l': 0, 'b': 0},  # Remove margins
-        uirevision=district_code,  # Reset view when district changes
+        map_style=style,
+        map_zoom=view['zoom'],
+        map_center_lat=view['center']['lat'],
+        map_center_lon=view['center']['lon'],
+        margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
+        showlegend=False,
+        uirevision=view['uirevision'],  # Reset view when the district or region changes
     )
-    return fig
 
+    if layers is not None:
+        fig.update_layout(map_layers=layers)
 
-def default_map_figure():
+    figure = fig.to_plotly_json()
+    markers = marker_trace_data(markers)
+    figure['data'][1]['marker'].update(markers.pop('marker'))
+    figure['data'][1].update(markers)
+    return figure
+
+
+def marker_patch(markers, patched_figure=None):
     """
-    Generate a default map figure centered on Hong Kong.
+    Partial figure update replacing the data of the marker trace (e.g. for the condition filter).
+
+    Parameters:
+        markers (dict): Per-marker lists for each of MARKER_FIELDS
+        patched_figure (Patch, optional): Patch to add to
 
     Returns:
-        - fig (plotly.graph_objs.Figure): A Plotly Figure object with default map settings.
+        Patch: Update for the map's figure property
     """
-    return go.Figure(go.Scattermap()).update_layout(
-        font=dict(family='Courier New, monospace', size=18, color='white'),
-        width=800,
-        height=600,
-        map_style='carto-positron',
-        map_zoom=11,
-        map_center_lat=22.3193,
-        map_center_lon=114.1694,
-        margin={'r': 0, 't': 0, 'l': 0, 'b': 0},
-        uirevision='Hong Kong',  # persistent view for default map
-    )
+    patched_figure = Patch() if patched_figure is None else patched_figure
+    markers = marker_trace_data(markers)
+    for key, value in markers.pop('marker').items():
+        patched_figure['data'][1]['marker'][key] = value
+    for key, values in markers.items():
+        patched_figure['data'][1][key] = values
+    return patched_figure
+
+
+def map_view_patch(view, markers, layers=None):
+    """
+    Partial figure update that switches a map built by map_view_figure to another view.
+
+    Only trace data, the map centre and zoom and uirevision are sent; the layout and styling
+    already in the browser are kept.
+
+    Parameters:
+        view (dict): Map view (see district_map_view)
+        markers (dict): Per-marker lists for each of MARKER_FIELDS
+        layers (list, optional): Vector tile layers (see tile_layers)
+
+    Returns:
+        Patch: Update for the map's figure property
+    """
+    patched_figure = Patch()
+    patched_figure['data'][0]['lon'] = view['outline']['lon']
+    patched_figure['data'][0]['lat'] = view['outline']['lat']
+    marker_patch(markers, patched_figure)
+    patched_figure['layout']['map']['center'] = view['center']
+    patched_figure['layout']['map']['zoom'] = view['zoom']
+    patched_figure['layout']['uirevision'] = view['uirevision']
+    if layers is not None:
+        patched_figure['layout']['map']['layers'] = layers
+    return patched_figure
+
+
+def dataset_version(*paths):
+    """
+    Fingerprint data files by content.
+
+    Parameters:
+        *paths (str or Path): Files that make up a dataset
+
+    Returns:
+        str: Short hash that changes whenever any of the files changes
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
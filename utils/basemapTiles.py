@@ -0,0 +1,388 @@
+"""
+Basemap Tiles Utility
+Local Positron basemap: serves assets/basicTileMap.json with its tiles, fonts and sprites proxied
+through a disk-backed LRU, so maps paint without waiting on third-party servers
+
+Run ``python -m utils.basemapTiles`` at build time to prefetch the Hong Kong area at the zooms
+viewers use; everything else is fetched on first request.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import parse_qs, quote, urlsplit
+
+import httpx
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = Path(__file__).parent.parent
+BASEMAP_STYLE_PATH = PROJECT_DIR / 'assets' / 'basicTileMap.json'
+
+# Point every map at the local style instead of Plotly's built-in 'carto-positron'
+MAP_LOCAL_BASEMAP = os.getenv('MAP_LOCAL_BASEMAP', '').lower() in ('1', 'true', 'yes')
+
+# Where proxied tiles, fonts and sprites are stored, and the most that is kept (least recently
+# used files are removed first)
+BASEMAP_CACHE_DIR = Path(os.getenv('BASEMAP_CACHE_DIR', PROJECT_DIR / '.basemap_cache'))
+BASEMAP_CACHE_SIZE_MB = int(os.getenv('BASEMAP_CACHE_SIZE_MB', 512))
+
+# Serve only what is already cached (no upstream requests), e.g. for offline checks
+BASEMAP_OFFLINE = os.getenv('BASEMAP_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+# Upstream vector tiles; by default the OpenMapTiles tiles of the style's own provider and key
+BASEMAP_TILE_URL = os.getenv('BASEMAP_TILE_URL', '')
+
+# Browser cache lifetime of proxied files (the upstream data changes rarely)
+BASEMAP_MAX_AGE = 7 * 24 * 3600
+
+UPSTREAM_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+# Hong Kong bounding box (west, south, east, north) and the zooms prefetched for it; tiles are
+# only proxied for this area plus a margin of tiles around it at every zoom
+HONG_KONG_BOUNDS = (113.82, 22.15, 114.45, 22.57)
+BOUNDS_MARGIN = 1
+PREFETCH_ZOOMS = range(9, 15)
+
+# Highest zoom of the upstream tiles; the map overzooms them beyond this
+BASEMAP_MAX_ZOOM = 14
+
+SPRITE_SUFFIXES = ('.json', '.png', '@2x.json', '@2x.png')
+FONT_RANGE = re.compile(r'^\d+-\d+$')
+
+
+def tile_range(bounds, z):
+    """
+    Tiles covering a bounding box at a zoom.
+
+    Parameters:
+        bounds (tuple): (west, south, east, north) in degrees
+        z (int): Zoom
+
+    Returns:
+        tuple: (min_x, min_y, max_x, max_y) tile indices, inclusive
+    """
+    n = 2**z
+
+    def tile_xy(lon, lat):
+        lat = math.radians(lat)
+        x = int((lon + 180) / 360 * n)
+        y = int((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+        return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+    west, south, east, north = bounds
+    min_x, min_y = tile_xy(west, north)
+    max_x, max_y = tile_xy(east, south)
+    return min_x, min_y, max_x, max_y
+
+
+def style_fontstacks(style):
+    """
+    Font stacks a style's symbol layers use, as MapLibre names them in glyph URLs.
+
+    Parameters:
+        style (dict): Style JSON
+
+    Returns:
+        set: e.g. {'Noto Sans Regular'} or {'Open Sans Regular,Arial Unicode MS Regular'}
+    """
+    fontstacks = set()
+    for layer in style.get('layers', []):
+        fonts = layer.get('layout', {}).get('text-font')
+        if isinstance(fonts, list) and fonts and all(isinstance(font, str) for font in fonts):
+            fontstacks.add(','.join(fonts))
+    return fontstacks
+
+
+class BasemapProxy:
+    """
+    Local copy of the Positron vector style and a caching proxy for its resources.
+
+    style() returns the style in assets/basicTileMap.json with its tile source, glyphs and
+    sprite pointing at this server's /basemap/ routes. Each proxied file is fetched from the
+    style's upstream once and stored under cache_dir; the files form an LRU (recency is kept in
+    the files' modification times, so it survives restarts) capped at max_bytes. Tiles missing
+    upstream are served as empty, which the map treats as "nothing here". So that the proxy
+    cannot be used to spend the upstream key on the rest of the world, tiles outside bounds are
+    served empty without a request, and only the font stacks the style uses are proxied.
+
+    Parameters:
+        style_path (Path): Style JSON to serve
+        cache_dir (Path): Directory for proxied files
+        max_bytes (int): Disk cache size
+        offline (bool): Never contact the upstream servers
+        tile_url (str): Upstream tile URL template with {z}/{x}/{y} (default from the style)
+        bounds (tuple): Area proxied, (west, south, east, north) in degrees
+    """
+
+    def __init__(
+        self,
+        style_path=BASEMAP_STYLE_PATH,
+        cache_dir=BASEMAP_CACHE_DIR,
+        max_bytes=BASEMAP_CACHE_SIZE_MB * 1024 * 1024,
+        offline=BASEMAP_OFFLINE,
+        tile_url=BASEMAP_TILE_URL,
+        bounds=HONG_KONG_BOUNDS,
+    ):
+        with open(style_path, encoding='utf-8') as f:
+            self.upstream_style = json.load(f)
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.bounds = bounds
+
+        source = next(iter(self.upstream_style['sources'].values()))
+        key = parse_qs(urlsplit(source.get('url', '')).query).get('key', [''])[0]
+        self.tile_url = tile_url or (
+            f'https://api.maptiler.com/tiles/v3-openmaptiles/{{z}}/{{x}}/{{y}}.pbf?key={key}'
+        )
+        self.glyphs_url = self.upstream_style['glyphs']
+        self.sprite_url = self.upstream_style['sprite']
+        self.fontstacks = style_fontstacks(self.upstream_style)
+
+        self._client = None
+        self._lock = threading.Lock()
+        self._files = None  # relative path -> size, least recently used first
+        self._bytes = 0
+        self.hits = 0
+        self.fetched = 0
+        self.missing = 0
+        self.errors = 0
+        self.outside = 0
+
+    def style(self, base_url):
+        """
+        The style with its resources served from base_url (absolute, as the map needs).
+
+        Parameters:
+            base_url (str): e.g. 'https://cyber-wc.example'
+
+        Returns:
+            dict: Style JSON
+        """
+        style = dict(self.upstream_style)
+        name = next(iter(style['sources']))
+        style['sources'] = {
+            name: {
+                'type': 'vector',
+                'tiles': [f'{base_url}/basemap/tiles/{{z}}/{{x}}/{{y}}.pbf'],
+                'minzoom': 0,
+                'maxzoom': BASEMAP_MAX_ZOOM,
+                'attribution': '© OpenMapTiles © OpenStreetMap contributors',
+            }
+        }
+        style['glyphs'] = f'{base_url}/basemap/fonts/{{fontstack}}/{{range}}.pbf'
+        style['sprite'] = f'{base_url}/basemap/sprite'
+        return style
+
+    def _http(self):
+        if self._client is None:
+            self._client = httpx.Client(timeout=UPSTREAM_TIMEOUT, follow_redirects=True)
+        return self._client
+
+    def _index(self):
+        """Files in the disk cache by recency (scanned once per worker)."""
+        if self._files is None:
+            files = []
+            for path in self.cache_dir.rglob('*'):
+                if path.is_file() and not path.name.endswith('.tmp'):
+                    stat = path.stat()
+                    name = path.relative_to(self.cache_dir).as_posix()
+                    files.append((stat.st_mtime, name, stat.st_size))
+            self._files = OrderedDict((name, size) for _, name, size in sorted(files))
+            self._bytes = sum(self._files.values())
+        return self._files
+
+    def _read(self, name):
+        path = self.cache_dir / name
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Most recently used
+        except FileNotFoundError:  # Never fetched, or evicted by another worker
+            return None
+        with self._lock:
+            files = self._index()
+            if name not in files:  # Stored by another worker
+                self._bytes += len(data)
+            files[name] = len(data)
+            files.move_to_end(name)
+            self.hits += 1
+        return data
+
+    def _store(self, name, data):
+        path = self.cache_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)  # Atomic so concurrent workers never serve partial files
+
+        evicted = []
+        with self._lock:
+            files = self._index()
+            self._bytes += len(data) - files.pop(name, 0)
+            files[name] = len(data)
+            while self._bytes > self.max_bytes and len(files) > 1:
+                old_name, size = files.popitem(last=False)
+                self._bytes -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            (self.cache_dir / old_name).unlink(missing_ok=True)
+
+    def fetch(self, name, url):
+        """
+        A proxied file, from the disk cache or the upstream server.
+
+        Parameters:
+            name (str): Path in the cache, e.g. 'tiles/12/3346/1786.pbf'
+            url (str): Upstream URL
+
+        Returns:
+            bytes or None: Content (b'' for tiles the upstream does not have), or None if it is
+                unavailable (offline and not cached, or the upstream failed)
+        """
+        data = self._read(name)
+        if data is not None or self.offline:
+            if data is None:
+                with self._lock:
+                    self.missing += 1
+            return data
+
+        try:
+            response = self._http().get(url)
+        except httpx.HTTPError as error:
+            logger.warning('Basemap upstream request failed: %s', error)
+            with self._lock:
+                self.errors += 1
+            return None
+        if response.status_code in (204, 404) and name.startswith('tiles/'):
+            data = b''  # Empty tile (e.g. open sea)
+        elif response.status_code != 200:
+            logger.warning('Basemap upstream returned %s for %s', response.status_code, name)
+            with self._lock:
+                self.errors += 1
+            return None
+        else:
+            data = response.content
+
+        self._store(name, data)
+        with self._lock:
+            self.fetched += 1
+        return data
+
+    def covers(self, z, x, y):
+        """Whether a tile is in the proxied area (bounds plus BOUNDS_MARGIN tiles)."""
+        min_x, min_y, max_x, max_y = tile_range(self.bounds, z)
+        return (
+            min_x - BOUNDS_MARGIN <= x <= max_x + BOUNDS_MARGIN
+            and min_y - BOUNDS_MARGIN <= y <= max_y + BOUNDS_MARGIN
+        )
+
+    def tile(self, z, x, y):
+        """Vector tile bytes (see fetch; empty outside the bounds), or None for a bad address."""
+        if not (0 <= z <= BASEMAP_MAX_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z):
+            return None
+        if not self.covers(z, x, y):
+            with self._lock:
+                self.outside += 1
+            return b''
+        return self.fetch(f'tiles/{z}/{x}/{y}.pbf', self.tile_url.format(z=z, x=x, y=y))
+
+    def font(self, fontstack, glyph_range):
+        """Glyph range bytes (see fetch), or None for a bad range or a font the style lacks."""
+        if not FONT_RANGE.match(glyph_range) or fontstack not in self.fontstacks:
+            return None
+        url = self.glyphs_url.replace('{fontstack}', quote(fontstack)).replace(
+            '{range}', glyph_range
+        )
+        return self.fetch(f'fonts/{fontstack}/{glyph_range}.pbf', url)
+
+    def sprite(self, suffix):
+        """Sprite sheet or index bytes (see fetch), or None for an unknown suffix."""
+        if suffix not in SPRITE_SUFFIXES:
+            return None
+        return self.fetch(f'sprite/sprite{suffix}', self.sprite_url + suffix)
+
+    def response(self, data, mimetype, request):
+        """
+        Response for a proxied file, with an ETag and conditional request support.
+
+        Parameters:
+            data (bytes): Content from tile(), font() or sprite()
+            mimetype (str): Content type
+            request (flask.Request): Current request (for If-None-Match)
+
+        Returns:
+            flask.Response: 200, or 304 when the browser's copy is current
+        """
+        response = Response(data, mimetype=mimetype)
+        response.set_etag(hashlib.sha1(data).hexdigest()[:16])
+        response.cache_control.public = True
+        response.cache_control.max_age = BASEMAP_MAX_AGE
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response.make_conditional(request)
+
+    def prefetch(self, zooms=PREFETCH_ZOOMS):
+        """
+        Fetch every tile of the proxied area at the given zooms, plus the sprites, into the disk
+        cache.
+
+        Parameters:
+            zooms (iterable): Zooms to fetch
+
+        Returns:
+            dict: Number of tiles per zoom and how many could not be fetched
+        """
+        counts, failed = {}, 0
+        for suffix in SPRITE_SUFFIXES:
+            failed += self.sprite(suffix) is None
+        for z in zooms:
+            min_x, min_y, max_x, max_y = tile_range(self.bounds, z)
+            min_x, min_y = max(min_x - BOUNDS_MARGIN, 0), max(min_y - BOUNDS_MARGIN, 0)
+            max_x = min(max_x + BOUNDS_MARGIN, 2**z - 1)
+            max_y = min(max_y + BOUNDS_MARGIN, 2**z - 1)
+            counts[z] = (max_x - min_x + 1) * (max_y - min_y + 1)
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    failed += self.tile(z, x, y) is None
+        return {'tiles': counts, 'failed': failed}
+
+    def stats(self):
+        """Files served from the cache, fetched, missing (offline), failed and out of bounds."""
+        with self._lock:
+            files = self._index()
+            return {
+                'hits': self.hits,
+                'fetched': self.fetched,
+                'missing': self.missing,
+                'errors': self.errors,
+                'outside': self.outside,
+                'files': len(files),
+                'bytes': self._bytes,
+                'offline': self.offline,
+            }
+
+
+# Shared instance used by the server
+basemap = BasemapProxy()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Prefetch the Hong Kong basemap tiles.')
+    parser.add_argument(
+        '--zooms', default=f'{PREFETCH_ZOOMS.start}-{PREFETCH_ZOOMS.stop - 1}', help='e.g. 9-14'
+    )
+    args = parser.parse_args()
+
+    first, _, last = args.zooms.partition('-')
+    result = basemap.prefetch(zooms=range(int(first), int(last or first) + 1))
+    total = sum(result['tiles'].values())
+    print(f"{total} tiles at zooms {args.zooms} ({result['failed']} failed) in {basemap.cache_dir}")
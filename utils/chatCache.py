@@ -0,0 +1,239 @@
+"""
+Chat Cache Utility
+Answer cache for the AI chat keyed on the normalized question, its context and the model settings
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from utils.sharedCache import shared_cache
+
+# Seconds an answer is reused (0 disables the cache)
+CHAT_CACHE_TIMEOUT = int(os.getenv('CHAT_CACHE_TIMEOUT', 24 * 3600))
+
+# Answers kept in each worker's memory (the shared tier is bounded by its backend)
+CHAT_CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', 512))
+
+# Also cache follow-up questions (keyed on the conversation so far); off by default since
+# the same follow-up usually means different things in different conversations
+CHAT_CACHE_MULTI_TURN = os.getenv('CHAT_CACHE_MULTI_TURN', '').lower() in ('1', 'true', 'yes')
+
+# Bump to invalidate every stored answer (e.g. after changing how keys are built)
+KEY_VERSION = 1
+
+CONTRACTIONS = {
+    "what's": 'what is',
+    "who's": 'who is',
+    "where's": 'where is',
+    "when's": 'when is',
+    "how's": 'how is',
+    "why's": 'why is',
+    "it's": 'it is',
+    "that's": 'that is',
+}
+
+# Greetings and politeness that do not change the question
+FILLER_PREFIXES = ('hi', 'hello', 'hey', 'please', 'can you tell me', 'could you tell me',
+                   'tell me', 'i want to know', 'do you know')
+FILLER_SUFFIXES = ('please', 'thanks', 'thank you')
+
+
+def normalize_question(text):
+    """
+    Reduce a question to a canonical form so trivially different phrasings share an answer.
+
+    Lowercases, unifies quotes and width (NFKC), expands common contractions, drops
+    punctuation, greetings and trailing politeness, and collapses whitespace. Chinese text is
+    kept as is apart from punctuation.
+
+    Parameters:
+        text (str): Question as typed by the user
+
+    Returns:
+        str: e.g. "Hi, what's the Blue House?" -> 'what is the blue house'
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower().replace('’', "'")
+    text = re.sub(r"\b\w+'s\b", lambda match: CONTRACTIONS.get(match.group(0), match.group(0)), text)
+    text = ' '.join(re.findall(r"\w+(?:'\w+)?", text))
+
+    changed = True
+    while changed:
+        changed = False
+        for prefix in FILLER_PREFIXES:
+            if text.startswith(prefix + ' '):
+                text, changed = text[len(prefix) + 1 :], True
+        for suffix in FILLER_SUFFIXES:
+            if text.endswith(' ' + suffix):
+                text, changed = text[: -len(suffix) - 1], True
+    return text
+
+
+class ChatAnswerCache:
+    """
+    Two-tier answer cache for the AI chat.
+
+    The key combines the normalized question, the conversation before it and the model
+    settings, so a change of model, temperature, token limit or system prompt never serves an
+    old answer. Answers are kept in a bounded LRU in each worker and in the shared cache
+    (utils.sharedCache), where an answer fetched by one worker is found by all the others;
+    both tiers expire entries after the timeout.
+
+    Follow-up questions (there are earlier turns) are only cached with multi_turn=True, and
+    callers can pass use_cache=False to bypass the cache for a request.
+
+    Parameters:
+        timeout (int): Seconds an answer is reused (0 disables the cache)
+        max_entries (int): Answers kept in this worker's memory
+        multi_turn (bool): Cache follow-up questions too, keyed on the earlier turns
+        shared (BaseCache or None): Cross-worker tier
+    """
+
+    def __init__(
+        self,
+        timeout=CHAT_CACHE_TIMEOUT,
+        max_entries=CHAT_CACHE_SIZE,
+        multi_turn=CHAT_CACHE_MULTI_TURN,
+        shared=shared_cache,
+    ):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.multi_turn = multi_turn
+        self.shared = shared
+        self._entries = OrderedDict()  # key -> (expires at, entry)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.latency_saved = 0.0
+        self.tokens_saved = 0
+
+    def key(self, question, context, settings):
+        """
+        Cache key for a question, or None if it must not be cached.
+
+        Parameters:
+            question (str): Current user message
+            context (list): Earlier messages ({"role", "content"}) sent with the question
+            settings (dict): Model settings that shape the answer (model, temperature, ...)
+
+        Returns:
+            str or None: Key, or None when caching is off or the context rules it out
+        """
+        if not self.timeout:
+            return None
+        # The chat store already holds the current message as its last turn
+        if context and context[-1].get('role') == 'user' and context[-1].get('content') == question:
+            context = context[:-1]
+        if context and not self.multi_turn:
+            return None
+        payload = json.dumps(
+            [
+                KEY_VERSION,
+                settings,
+                [(turn.get('role'), normalize_question(turn.get('content'))) for turn in context],
+                normalize_question(question),
+            ],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return 'chat-answer:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Look up an answer and record the hit or miss.
+
+        Parameters:
+            key (str or None): Key from key(); None counts as a bypass
+
+        Returns:
+            str or None: Cached answer
+        """
+        if key is None:
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and item[0] <= now:
+                del self._entries[key]
+                item = None
+            if item is not None:
+                self._entries.move_to_end(key)
+        entry = item[1] if item is not None else None
+
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self._remember(key, entry, now + self.timeout)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.latency_saved += entry.get('latency', 0.0)
+            self.tokens_saved += entry.get('tokens', 0)
+        return entry['answer']
+
+    def put(self, key, answer, latency, tokens=0):
+        """
+        Store a successful answer.
+
+        Parameters:
+            key (str or None): Key from key(); nothing is stored for None
+            answer (str): Answer text
+            latency (float): Seconds the API call took (credited to later hits)
+            tokens (int): Tokens the call used, if known (credited to later hits)
+        """
+        if key is None or not answer:
+            return
+        entry = {'answer': answer, 'latency': latency, 'tokens': tokens}
+        self._remember(key, entry, time.time() + self.timeout)
+        if self.shared is not None:
+            self.shared.set(key, entry, timeout=self.timeout)
+
+    def _remember(self, key, entry, expires):
+        with self._lock:
+            self._entries[key] = (expires, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Return counters for this worker.
+
+        Returns:
+            dict: Hits, misses, bypassed lookups, hit rate, API latency and tokens saved by hits,
+                and the number of answers in memory
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'latency_saved_seconds': round(self.latency_saved, 3),
+                'tokens_saved': self.tokens_saved,
+                'entries': len(self._entries),
+            }
+
+    def clear(self):
+        """Drop the answers in this worker's memory and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.bypassed = self.tokens_saved = 0
+            self.latency_saved = 0.0
+
+
+# Shared instance used by utils.aiChat
+answer_cache = ChatAnswerCache()
@@ -0,0 +1,224 @@
+"""
+Chat History Utility
+Token-budgeted conversation history for AI chat prompts: recent turns verbatim, older turns condensed
+"""
+
+import os
+import re
+import threading
+from collections import Counter
+
+from utils.textTokens import CJK_CHARACTER, tokenize
+
+# Upper bound for the estimated prompt size (system prompt, history and the current message)
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv('CHAT_PROMPT_TOKEN_BUDGET', 3000))
+
+# Most recent messages sent verbatim when they fit the budget (older ones are summarized)
+CHAT_RECENT_MESSAGES = int(os.getenv('CHAT_RECENT_MESSAGES', 10))
+
+# Size each older message is condensed to before it goes into the summary
+SUMMARY_TURN_TOKENS = 60
+
+# DeepSeek's guidance: about 0.3 tokens per English character and 0.6 per Chinese character
+TOKENS_PER_CHARACTER = 0.3
+TOKENS_PER_CJK_CHARACTER = 0.6
+
+# Role and formatting tokens the API adds around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_HEADER = 'Summary of the earlier conversation:'
+SENTENCE_END = re.compile(r'(?<=[.!?。！？])\s*')
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in a text without calling a tokenizer.
+
+    Parameters:
+        text (str): Text in English and/or Chinese
+
+    Returns:
+        int: Approximate token count (rounded up)
+    """
+    if not text:
+        return 0
+    cjk = sum(len(run) for run in CJK_CHARACTER.findall(text))
+    return int((len(text) - cjk) * TOKENS_PER_CHARACTER + cjk * TOKENS_PER_CJK_CHARACTER) + 1
+
+
+def message_tokens(message):
+    """Estimated tokens of one chat message, including the per-message overhead."""
+    return estimate_tokens(message.get('content')) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _truncate(text, max_tokens):
+    """Cut text to roughly max_tokens, at a word boundary for non-Chinese text."""
+    while text and estimate_tokens(text) > max_tokens:
+        cut = max(1, int(len(text) * max_tokens / estimate_tokens(text)) - 1)
+        shorter = text[:cut]
+        if ' ' in shorter and not CJK_CHARACTER.search(shorter[-1]):
+            shorter = shorter.rsplit(' ', 1)[0]
+        text = shorter.rstrip(' ,;:')
+    return text + '…' if text else ''
+
+
+def condense(text, max_tokens=SUMMARY_TURN_TOKENS):
+    """
+    Extractive summary of a message that fits max_tokens.
+
+    Sentences are scored by how many of the message's recurring terms they contain (the first
+    sentence, which usually carries the topic, gets a bonus); the best ones are kept in their
+    original order, skipping sentences that mostly repeat terms already kept.
+
+    Parameters:
+        text (str): Message content
+        max_tokens (int): Size of the summary
+
+    Returns:
+        str: The text itself if it already fits, otherwise the condensed version
+    """
+    text = ' '.join((text or '').split())
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = [sentence for sentence in SENTENCE_END.split(text) if sentence]
+    frequencies = Counter(tokenize(text))
+    terms = [set(tokenize(sentence)) for sentence in sentences]
+    scores = [
+        sum(frequencies[term] for term in sentence_terms) / (len(sentence_terms) + 1) ** 0.5
+        * (2 if i == 0 else 1)
+        for i, sentence_terms in enumerate(terms)
+    ]
+
+    chosen, covered, used = set(), set(), 0
+    for i in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        size = estimate_tokens(sentences[i])
+        if used + size > max_tokens or len(terms[i] - covered) < len(terms[i]) / 2:
+            continue
+        chosen.add(i)
+        covered |= terms[i]
+        used += size
+    if not chosen:
+        return _truncate(sentences[0], max_tokens)
+    return ' '.join(sentences[i] for i in sorted(chosen))
+
+
+def compact_history(history, user_message, fixed_tokens=0, budget=None, recent=None):
+    """
+    Fit the conversation history into the prompt token budget.
+
+    The newest messages (up to `recent`) are kept verbatim as long as they fit; everything
+    older is condensed into a single summary message placed before them, oldest lines dropped
+    first if even the summary does not fit. Short conversations are returned unchanged.
+
+    Parameters:
+        history (list): Previous messages [{"role", "content"}], oldest first; a trailing copy of
+            the current user message (as kept by the chat store) is ignored
+        user_message (str): Current user message
+        fixed_tokens (int): Tokens of the rest of the prompt (system prompt, current message)
+        budget (int): Prompt token budget (default CHAT_PROMPT_TOKEN_BUDGET)
+        recent (int): Maximum number of verbatim messages (default CHAT_RECENT_MESSAGES)
+
+    Returns:
+        tuple: (messages to send between the system prompt and the current message,
+            report dict with history_tokens, original_tokens, verbatim, summarized, dropped)
+    """
+    budget = CHAT_PROMPT_TOKEN_BUDGET if budget is None else budget
+    recent = CHAT_RECENT_MESSAGES if recent is None else recent
+    history = [message for message in history or [] if message.get('content')]
+    if history and history[-1].get('role') == 'user' and history[-1].get('content') == user_message:
+        history = history[:-1]
+
+    available = max(budget - fixed_tokens, 0)
+    original = sum(map(message_tokens, history))
+
+    verbatim, used = [], 0
+    for message in reversed(history[-recent:] if recent else []):
+        size = message_tokens(message)
+        if used + size > available:
+            break
+        verbatim.insert(0, message)
+        used += size
+    older = history[: len(history) - len(verbatim)]
+
+    summary_lines = [
+        f"{'User' if message.get('role') == 'user' else 'Assistant'}: {condense(message['content'])}"
+        for message in older
+    ]
+    kept = []
+    header_tokens = estimate_tokens(SUMMARY_HEADER) + MESSAGE_OVERHEAD_TOKENS
+    summary_used = header_tokens
+    for line in reversed(summary_lines):
+        size = estimate_tokens(line) + 1
+        if used + summary_used + size > available:
+            break
+        kept.insert(0, line)
+        summary_used += size
+
+    messages = list(verbatim)
+    if kept:
+        content = '\n'.join([SUMMARY_HEADER, *kept])
+        messages.insert(0, {'role': 'system', 'content': content})
+        used += message_tokens(messages[0])
+
+    return messages, {
+        'history_tokens': used,
+        'original_tokens': original,
+        'verbatim': len(verbatim),
+        'summarized': len(kept),
+        'dropped': len(older) - len(kept),
+    }
+
+
+class PromptStats:
+    """Running totals of the prompt sizes sent to the API by this worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, report):
+        """
+        Add one request.
+
+        Parameters:
+            report (dict): compact_history report plus 'prompt_tokens' (estimated) and, when the
+                API reported usage, 'api_prompt_tokens'
+        """
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += report['prompt_tokens']
+            self.max_prompt_tokens = max(self.max_prompt_tokens, report['prompt_tokens'])
+            self.history_tokens_saved += report['original_tokens'] - report['history_tokens']
+            self.compacted += bool(report['summarized'] or report['dropped'])
+            if report.get('api_prompt_tokens'):
+                self.api_prompt_tokens += report['api_prompt_tokens']
+
+    def stats(self):
+        """
+        Return the totals.
+
+        Returns:
+            dict: Requests, estimated prompt tokens (total, mean, max), tokens reported by the API,
+                history tokens saved by compaction and the number of compacted requests
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'prompt_tokens': self.prompt_tokens,
+                'mean_prompt_tokens': round(self.prompt_tokens / self.requests, 1) if self.requests else 0.0,
+                'max_prompt_tokens': self.max_prompt_tokens,
+                'api_prompt_tokens': self.api_prompt_tokens,
+                'history_tokens_saved': self.history_tokens_saved,
+                'compacted_requests': self.compacted,
+            }
+
+    def reset(self):
+        """Zero the totals."""
+        with self._lock:
+            self.requests = self.prompt_tokens = self.max_prompt_tokens = 0
+            self.api_prompt_tokens = self.history_tokens_saved = self.compacted = 0
+
+
+# Shared instance used by utils.aiChat
+prompt_stats = PromptStats()
@@ -0,0 +1,135 @@
+"""
+Chat Jobs Utility
+Runs AI chat requests on a background thread pool so web workers return immediately
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.sharedCache import CACHE_SHARED, shared_cache
+
+# Chat requests run at the same time in each worker (they mostly wait on the API)
+CHAT_JOB_THREADS = int(os.getenv('CHAT_JOB_THREADS', 8))
+
+# Seconds a finished reply is kept for the browser to collect, and after which a job that never
+# reported back is given up
+CHAT_JOB_TIMEOUT = int(os.getenv('CHAT_JOB_TIMEOUT', 120))
+
+# How often the chat widget asks whether its reply is ready
+CHAT_JOB_POLL_MS = int(os.getenv('CHAT_JOB_POLL_MS', 500))
+
+
+class ChatJobQueue:
+    """
+    Background jobs for AI chat replies.
+
+    A Dash callback submits the request and returns straight away; the reply is collected by a
+    polling callback. Finished replies are kept in this worker and, with a shared cache backend,
+    in the shared cache so that a poll served by another gunicorn worker finds them too. Reading
+    a reply does not remove it: the browser drops the response of a poll that is overtaken by the
+    next one, so a reply stays available until it expires after timeout seconds.
+
+    Parameters:
+        threads (int): Size of the thread pool
+        timeout (int): Seconds a finished reply is kept
+        shared (BaseCache or None): Cross-worker store for finished replies
+    """
+
+    def __init__(self, threads=CHAT_JOB_THREADS, timeout=CHAT_JOB_TIMEOUT, shared=None):
+        self.threads = threads
+        self.timeout = timeout
+        self.shared = shared
+        self._results = {}  # job id -> (finished at, result)
+        self._running = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _get_executor(self):
+        # Threads do not survive a fork, so each gunicorn worker starts its own pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.threads, thread_name_prefix='chat-job'
+                )
+                self._executor_pid = os.getpid()
+                self._results.clear()
+                self._running = 0
+            return self._executor
+
+    def submit(self, function, *args):
+        """
+        Run function(*args) in the background.
+
+        Parameters:
+            function (callable): Returns the reply dict (e.g. utils.aiChat.get_ai_response)
+            *args: Its arguments
+
+        Returns:
+            str: Job id to pass to result()
+        """
+        job_id = uuid.uuid4().hex
+        executor = self._get_executor()
+        with self._lock:
+            self._running += 1
+        executor.submit(self._run, job_id, function, args)
+        return job_id
+
+    def _run(self, job_id, function, args):
+        try:
+            result = function(*args)
+        except Exception as e:
+            result = {
+                'success': False,
+                'message': f'Sorry, I encountered an error: {str(e)}',
+                'error': str(e),
+            }
+
+        # Shared cache first, so a reply this worker hands out is already visible to the others
+        if self.shared is not None:
+            self.shared.set(f'chat-job:{job_id}', result, timeout=self.timeout)
+
+        now = time.monotonic()
+        with self._lock:
+            self._running -= 1
+            self._completed += 1
+            self._results[job_id] = (now, result)
+            expired = [key for key, (finished, _) in self._results.items() if now - finished > self.timeout]
+            for key in expired:
+                del self._results[key]
+
+    def result(self, job_id):
+        """
+        Collect the reply of a finished job.
+
+        Parameters:
+            job_id (str): Id from submit()
+
+        Returns:
+            dict or None: The reply, or None while the job is running (or once it has expired)
+        """
+        with self._lock:
+            item = self._results.get(job_id)
+        if item is not None and time.monotonic() - item[0] <= self.timeout:
+            return item[1]
+        if self.shared is None:
+            return None
+        return self.shared.get(f'chat-job:{job_id}')
+
+    def stats(self):
+        """Running and completed jobs and replies kept for collection in this worker."""
+        with self._lock:
+            return {
+                'threads': self.threads,
+                'running': self._running,
+                'completed': self._completed,
+                'kept': len(self._results),
+            }
+
+
+# Shared instance used by the chat callbacks
+chat_jobs = ChatJobQueue(shared=shared_cache if CACHE_SHARED else None)
@@ -0,0 +1,255 @@
+"""
+Data Snapshot Utility
+Binary snapshot of the parsed places, district geometries and derived lookups for fast cold starts
+
+Run ``python -m utils.dataSnapshot`` at build time. The app loads the snapshot when it matches
+the source files and falls back to parsing them (CSV and GeoJSON) otherwise.
+"""
+
+import os
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.appFunctions import dataset_version
+from utils.districtOutlines import OUTLINE_PRECISION, OUTLINE_TOLERANCES, DistrictOutlines
+from utils.markdownRenderer import get_all_place_slugs
+
+PROJECT_DIR = Path(__file__).parent.parent
+PLACES_PATH = PROJECT_DIR / 'assets' / 'Data' / 'hk_places.csv'
+DISTRICTS_PATH = PROJECT_DIR / 'assets' / 'Data' / 'hk_districts.geojson'
+
+# Written at build time; not committed
+SNAPSHOT_PATH = Path(os.getenv('DATA_SNAPSHOT_PATH', PROJECT_DIR / '.data_snapshot' / 'geodata.npz'))
+
+# Bump when the snapshot layout or anything derived into it changes
+SNAPSHOT_FORMAT = 1
+
+
+@dataclass
+class Datasets:
+    """Everything the app derives from the source data files at startup."""
+
+    places: pd.DataFrame
+    districts: gpd.GeoDataFrame
+    slug_map: dict
+    outlines: DistrictOutlines
+    version: str
+    source: str  # 'snapshot' or 'files'
+
+
+def snapshot_key(version):
+    """Identity of a snapshot: data fingerprint plus everything that shapes the derived data."""
+    return f'{SNAPSHOT_FORMAT}:{version}:{OUTLINE_TOLERANCES}:{OUTLINE_PRECISION}'
+
+
+def load_from_files(places_path=PLACES_PATH, districts_path=DISTRICTS_PATH):
+    """
+    Parse the source files and derive the lookups (the slow path).
+
+    Parameters:
+        places_path (Path): Places CSV
+        districts_path (Path): District GeoJSON
+
+    Returns:
+        Datasets: Parsed data with source 'files'
+    """
+    places = pd.read_csv(places_path)
+    slug_map = get_all_place_slugs(places)
+    # Ensure district_num is a string for consistent comparisons
+    places['district_num'] = places['district_num'].astype(str)
+    districts = gpd.read_file(districts_path)
+    return Datasets(
+        places=places,
+        districts=districts,
+        slug_map=slug_map,
+        outlines=DistrictOutlines(districts),
+        version=dataset_version(places_path, districts_path),
+        source='files',
+    )
+
+
+def _pack_frame(arrays, prefix, frame):
+    """Store each column as a typed array; strings become unicode arrays plus a null mask."""
+    arrays[f'{prefix}columns'] = np.array(frame.columns, dtype=str)
+    for i, column in enumerate(frame.columns):
+        values = frame[column]
+        if values.dtype == object:
+            missing = values.isna().to_numpy()
+            arrays[f'{prefix}{i}'] = np.array(values.fillna('').astype(str), dtype=str)
+            arrays[f'{prefix}{i}_null'] = missing
+        else:
+            arrays[f'{prefix}{i}'] = values.to_numpy()
+
+
+def _unpack_frame(archive, prefix):
+    columns = {}
+    for i, column in enumerate(archive[f'{prefix}columns'].tolist()):
+        values = archive[f'{prefix}{i}']
+        if f'{prefix}{i}_null' in archive:
+            values = values.astype(object)
+            values[archive[f'{prefix}{i}_null']] = np.nan
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def _pack_ragged(arrays, name, chunks, dtype):
+    """Concatenate variable-length sequences into one array plus offsets."""
+    lengths = [len(chunk) for chunk in chunks]
+    arrays[f'{name}_offsets'] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    arrays[name] = (
+        np.concatenate([np.asarray(chunk, dtype=dtype) for chunk in chunks])
+        if chunks
+        else np.zeros(0, dtype=dtype)
+    )
+
+
+def _unpack_ragged(archive, name):
+    values, offsets = archive[name], archive[f'{name}_offsets']
+    return [values[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def write_snapshot(datasets, path=SNAPSHOT_PATH):
+    """
+    Write a snapshot of parsed datasets.
+
+    Layout (uncompressed .npz, one array per column): place and district columns, district
+    geometries as concatenated WKB, the slug map, and the outline arcs per level of detail
+    as flat coordinate arrays with offsets.
+
+    Parameters:
+        datasets (Datasets): Data to store (normally from load_from_files)
+        path (Path): Target file
+
+    Returns:
+        int: Size of the snapshot in bytes
+    """
+    arrays = {'key': np.array(snapshot_key(datasets.version))}
+    _pack_frame(arrays, 'places_', datasets.places)
+    _pack_frame(arrays, 'districts_', datasets.districts.drop(columns='geometry'))
+    arrays['crs'] = np.array(datasets.districts.crs.to_wkt() if datasets.districts.crs else '')
+    wkb = [
+        np.frombuffer(geometry, dtype=np.uint8)
+        for geometry in shapely.to_wkb(datasets.districts.geometry.values)
+    ]
+    _pack_ragged(arrays, 'wkb', wkb, np.uint8)
+
+    arrays['slug_names'] = np.array(list(datasets.slug_map), dtype=str)
+    arrays['slug_values'] = np.array(list(datasets.slug_map.values()), dtype=str)
+
+    outlines = datasets.outlines
+    arrays['outline_codes'] = np.array(list(outlines.arc_ids), dtype=str)
+    _pack_ragged(arrays, 'outline_arc_ids', list(outlines.arc_ids.values()), np.int64)
+    for level, level_arcs in enumerate(outlines.levels):
+        _pack_ragged(arrays, f'outline_{level}_lon', [lons for lons, _ in level_arcs], float)
+        _pack_ragged(arrays, f'outline_{level}_lat', [lats for _, lats in level_arcs], float)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp.npz')
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)  # Atomic so a starting worker never reads a partial file
+    return path.stat().st_size
+
+
+def read_snapshot(version, path=SNAPSHOT_PATH):
+    """
+    Load a snapshot if it exists and matches the current data and code.
+
+    Parameters:
+        version (str): Fingerprint of the source files (dataset_version)
+        path (Path): Snapshot file
+
+    Returns:
+        Datasets or None: Data with source 'snapshot', or None if missing, stale or unreadable
+    """
+    try:
+        archive = np.load(path, allow_pickle=False)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return None
+    try:
+        return _read_archive(archive, version)
+    except (KeyError, ValueError, zipfile.BadZipFile):
+        return None  # Truncated or from an incompatible build: parse the files instead
+    finally:
+        archive.close()
+
+
+def _read_archive(archive, version):
+    """Datasets from an open snapshot archive, or None if it was built from other data."""
+    if 'key' not in archive or archive['key'].item() != snapshot_key(version):
+        return None
+
+    places = _unpack_frame(archive, 'places_')
+    geometry = shapely.from_wkb([chunk.tobytes() for chunk in _unpack_ragged(archive, 'wkb')])
+    crs = archive['crs'].item() or None
+    districts = gpd.GeoDataFrame(
+        _unpack_frame(archive, 'districts_'), geometry=geometry, crs=crs
+    )
+    slug_map = dict(zip(archive['slug_names'].tolist(), archive['slug_values'].tolist()))
+
+    arc_ids = {
+        code: ids.tolist()
+        for code, ids in zip(
+            archive['outline_codes'].tolist(), _unpack_ragged(archive, 'outline_arc_ids')
+        )
+    }
+    levels = [
+        [
+            (lons.tolist(), lats.tolist())
+            for lons, lats in zip(
+                _unpack_ragged(archive, f'outline_{level}_lon'),
+                _unpack_ragged(archive, f'outline_{level}_lat'),
+            )
+        ]
+        for level in range(len(OUTLINE_TOLERANCES))
+    ]
+
+    return Datasets(
+        places=places,
+        districts=districts,
+        slug_map=slug_map,
+        outlines=DistrictOutlines.from_precomputed(arc_ids, levels),
+        version=version,
+        source='snapshot',
+    )
+
+
+def load_datasets(places_path=PLACES_PATH, districts_path=DISTRICTS_PATH, path=SNAPSHOT_PATH):
+    """
+    Load the app's datasets from the snapshot, or from the source files when it is stale.
+
+    Parameters:
+        places_path (Path): Places CSV
+        districts_path (Path): District GeoJSON
+        path (Path): Snapshot file
+
+    Returns:
+        Datasets: Parsed data (see .source for where it came from)
+    """
+    version = dataset_version(places_path, districts_path)
+    return read_snapshot(version, path) or load_from_files(places_path, districts_path)
+
+
+if __name__ == '__main__':
+    started = time.perf_counter()
+    datasets = load_from_files()
+    from_files = time.perf_counter() - started
+    size = write_snapshot(datasets)
+
+    started = time.perf_counter()
+    loaded = load_datasets()
+    from_snapshot = time.perf_counter() - started
+    if loaded.source != 'snapshot':
+        raise SystemExit(f'Snapshot at {SNAPSHOT_PATH} could not be read back')
+    print(
+        f'Snapshot written to {SNAPSHOT_PATH} ({size / 1024:.0f} KB, version {datasets.version}). '
+        f'Load time: {from_files * 1000:.0f} ms from files, '
+        f'{from_snapshot * 1000:.0f} ms from snapshot.'
+    )
@@ -0,0 +1,126 @@
+"""
+District Outlines Utility
+Precomputes multi-resolution district boundaries for zoom-dependent level of detail
+"""
+
+import shapely
+from shapely.ops import linemerge, unary_union
+
+# Simplification tolerance (degrees) per level of detail; level 0 keeps every vertex
+OUTLINE_TOLERANCES = (0.0, 0.00005, 0.0002, 0.001)
+
+# Minimum map zoom for each level (checked in order); lower zooms use the coarsest level
+OUTLINE_ZOOM_LEVELS = ((14, 0), (12, 1), (10, 2))
+
+# Decimal places kept per level (~0.1 m at full detail, ~1 m otherwise)
+OUTLINE_PRECISION = (6, 5, 5, 5)
+
+
+def detail_level_for_zoom(zoom):
+    """
+    Pick the outline level of detail for a map zoom.
+
+    Parameters:
+        zoom (float or None): Current map zoom
+
+    Returns:
+        int: Index into OUTLINE_TOLERANCES (0 is full detail)
+    """
+    if zoom is None:
+        return 1
+    for min_zoom, level in OUTLINE_ZOOM_LEVELS:
+        if zoom >= min_zoom:
+            return level
+    return len(OUTLINE_TOLERANCES) - 1
+
+
+class DistrictOutlines:
+    """
+    Simplified district boundaries at several levels of detail.
+
+    All district boundaries are noded together and merged into arcs that run between junctions,
+    so a border shared by two districts is a single arc. Each arc is simplified once per level
+    and reused by every district it bounds, which keeps neighbouring outlines identical along
+    shared borders (no gaps or overlaps appear after simplification).
+
+    Parameters:
+        geo_df (GeoDataFrame): District geometries with a 'code' column.
+        tolerances (tuple): Simplification tolerance per level, in degrees.
+    """
+
+    def __init__(self, geo_df, tolerances=OUTLINE_TOLERANCES):
+        self.tolerances = tolerances
+
+        merged = linemerge(unary_union([geometry.boundary for geometry in geo_df['geometry']]))
+        arcs = list(merged.geoms) if hasattr(merged, 'geoms') else [merged]
+
+        # Arcs are split at junctions, so an arc's midpoint lies only on the districts it bounds
+        self.arc_ids = {}
+        for code, geometry in zip(geo_df['code'], geo_df['geometry']):
+            boundary = geometry.boundary
+            self.arc_ids[str(code)] = [
+                i
+                for i, arc in enumerate(arcs)
+                if boundary.distance(arc.interpolate(0.5, normalized=True)) < 1e-9
+            ]
+
+        # Per level: arc id -> (lons, lats) rounded for compact JSON
+        self.levels = []
+        for level, tolerance in enumerate(tolerances):
+            precision = OUTLINE_PRECISION[min(level, len(OUTLINE_PRECISION) - 1)]
+            level_arcs = []
+            for arc in arcs:
+                simplified = arc.simplify(tolerance, preserve_topology=True) if tolerance else arc
+                coords = shapely.get_coordinates(simplified).round(precision)
+                level_arcs.append((coords[:, 0].tolist(), coords[:, 1].tolist()))
+            self.levels.append(level_arcs)
+
+    @classmethod
+    def from_precomputed(cls, arc_ids, levels, tolerances=OUTLINE_TOLERANCES):
+        """
+        Rebuild outlines from previously computed arcs (e.g. from utils.dataSnapshot).
+
+        Parameters:
+            arc_ids (dict): District code -> list of arc ids
+            levels (list): Per level, a list of (lons, lats) per arc
+            tolerances (tuple): Tolerances the levels were simplified with
+
+        Returns:
+            DistrictOutlines: Outlines without recomputing the topology
+        """
+        outlines = cls.__new__(cls)
+        outlines.tolerances = tolerances
+        outlines.arc_ids = arc_ids
+        outlines.levels = levels
+        return outlines
+
+    def outline(self, district_code, level):
+        """
+        Return the outline of a district at a level of detail.
+
+        Parameters:
+            district_code (str): District code (e.g. 'WC')
+            level (int): Level of detail (0 is full detail)
+
+        Returns:
+            tuple: (lons, lats) lists, with None separating the arcs
+        """
+        level_arcs = self.levels[min(level, len(self.levels) - 1)]
+        lons, lats = [], []
+        for i in self.arc_ids.get(str(district_code), []):
+            arc_lons, arc_lats = level_arcs[i]
+            if lons:
+                lons.append(None)
+                lats.append(None)
+            lons.extend(arc_lons)
+            lats.extend(arc_lats)
+        return lons, lats
+
+    def vertex_counts(self):
+        """
+        Count vertices per level of detail (useful to check payload reduction).
+
+        Returns:
+            list: Total number of vertices across all arcs, per level
+        """
+        return [sum(len(lons) for lons, _ in level_arcs) for level_arcs in self.levels]
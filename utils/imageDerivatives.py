@@ -0,0 +1,245 @@
+"""
+Image Derivatives Utility
+Builds resized WebP/AVIF variants and placeholders for article photos
+
+Run ``python -m utils.imageDerivatives`` after adding or changing article images.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from pathlib import Path
+
+ASSETS_DIR = Path(__file__).parent.parent / 'assets'
+ARTICLES_DIR = ASSETS_DIR / 'articles'
+DERIVATIVES_DIR = ASSETS_DIR / 'derived'
+MANIFEST_PATH = DERIVATIVES_DIR / 'manifest.json'
+
+# URL the derivatives directory is served at (Dash serves assets/ under /assets/)
+DERIVATIVES_URL = '/assets/derived'
+
+# Target widths in pixels (never upscaled); the article column is at most ~900px wide
+DERIVATIVE_WIDTHS = (480, 800, 1200)
+
+# Output formats, best compression first, with their encoder quality
+DERIVATIVE_QUALITY = {'avif': 55, 'webp': 78}
+
+# Width of the blurred inline placeholder shown until the real image loads
+PLACEHOLDER_WIDTH = 24
+
+# Markdown image syntax and raw <img> tags referencing local assets
+IMAGE_REFERENCE = re.compile(r'!\[[^\]]*\]\((/assets/[^)\s]+)|<img[^>]+src="(/assets/[^"]+)"')
+
+SOURCE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+
+def referenced_images(articles_dir=ARTICLES_DIR):
+    """
+    Find the local images embedded in articles.
+
+    Parameters:
+        articles_dir (Path): Directory of markdown articles
+
+    Returns:
+        list: Sorted asset URLs such as '/assets/Images/blue-house/blue_house_1980s.jpg'
+    """
+    urls = set()
+    for md_file_path in articles_dir.glob('*.md'):
+        for match in IMAGE_REFERENCE.finditer(md_file_path.read_text(encoding='utf-8')):
+            url = match.group(1) or match.group(2)
+            if url.lower().endswith(SOURCE_SUFFIXES):
+                urls.add(url)
+    return sorted(urls)
+
+
+def available_formats():
+    """Output formats the installed Pillow can encode."""
+    from PIL import features
+
+    return [fmt for fmt in DERIVATIVE_QUALITY if features.check(fmt)]
+
+
+def _encode(image, fmt, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'{path.suffix}.{os.getpid()}.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def target_widths(width, widths=DERIVATIVE_WIDTHS):
+    """Variant widths of an image: every target narrower than it, plus its own width (capped)."""
+    return sorted({w for w in widths if w < width} | {min(width, max(widths))})
+
+
+def build_derivatives(
+    output_dir=DERIVATIVES_DIR,
+    widths=DERIVATIVE_WIDTHS,
+    formats=None,
+    url_prefix=DERIVATIVES_URL,
+    articles_dir=ARTICLES_DIR,
+    assets_dir=ASSETS_DIR,
+):
+    """
+    Generate resized variants and placeholders for every image referenced by an article.
+
+    Images whose content hash and variants match the existing manifest entry are skipped, so the
+    build is cheap to rerun. Variants are written as ``<output_dir>/<path>-<width>.<format>``,
+    <path> being the image's path under assets/ without its extension.
+
+    Parameters:
+        output_dir (Path): Directory for the variants and manifest.json
+        widths (tuple): Target widths in pixels
+        formats (list, optional): Output formats; defaults to every supported format
+        url_prefix (str): URL output_dir is served at, used for the variant URLs
+        articles_dir (Path): Directory of markdown articles
+        assets_dir (Path): Directory served at /assets/
+
+    Returns:
+        dict: The manifest (asset URL -> width, height, placeholder and variants)
+    """
+    from PIL import Image, ImageOps
+
+    output_dir = Path(output_dir)
+    url_prefix = url_prefix.rstrip('/')
+    formats = formats or available_formats()
+    manifest_path = output_dir / 'manifest.json'
+    try:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        previous = {}
+
+    manifest = {}
+    for url in referenced_images(articles_dir):
+        source_path = assets_dir / url.removeprefix('/assets/')
+        if not source_path.exists():
+            continue
+        source = source_path.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()[:16]
+        relative = Path(url.removeprefix('/assets/')).with_suffix('').as_posix()
+
+        def variant_list(fmt, width):
+            # [url, width] of each variant of the image in a format, as stored in the manifest
+            return [
+                [f'{url_prefix}/{relative}-{target_width}.{fmt}', target_width]
+                for target_width in target_widths(width, widths)
+            ]
+
+        entry = previous.get(url)
+        if (
+            entry
+            and entry['digest'] == digest
+            and entry['variants'] == {fmt: variant_list(fmt, entry['width']) for fmt in formats}
+            and all(
+                (output_dir / variant_url.removeprefix(f'{url_prefix}/')).exists()
+                for variants in entry['variants'].values()
+                for variant_url, _ in variants
+            )
+        ):
+            manifest[url] = entry
+            continue
+
+        image = ImageOps.exif_transpose(Image.open(io.BytesIO(source)))
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+        width, height = image.size
+
+        variants = {}
+        for fmt in formats:
+            variants[fmt] = variant_list(fmt, width)
+            for variant_url, target_width in variants[fmt]:
+                target_height = round(height * target_width / width)
+                resized = image.resize((target_width, target_height), Image.LANCZOS)
+                _write_atomic(
+                    output_dir / variant_url.removeprefix(f'{url_prefix}/'),
+                    _encode(resized, fmt, DERIVATIVE_QUALITY[fmt]),
+                )
+
+        tiny = image.resize(
+            (PLACEHOLDER_WIDTH, max(1, round(height * PLACEHOLDER_WIDTH / width))), Image.BILINEAR
+        )
+        placeholder = base64.b64encode(_encode(tiny.convert('RGB'), 'webp', 30)).decode('ascii')
+
+        manifest[url] = {
+            'digest': digest,
+            'width': width,
+            'height': height,
+            'placeholder': f'data:image/webp;base64,{placeholder}',
+            'variants': variants,
+        }
+
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+class DerivativeManifest:
+    """
+    Read-only view of a derivative manifest, reloaded when the file changes.
+
+    Parameters:
+        path (Path): Location of manifest.json
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self._mtime = None
+        self._entries = {}
+        self.version = ''
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload the manifest if it changed on disk; returns the current version string."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            if mtime != self._mtime:
+                self._mtime = mtime
+                try:
+                    raw = self.path.read_bytes()
+                    self._entries = json.loads(raw)
+                    self.version = hashlib.sha256(raw).hexdigest()[:16]
+                except (OSError, ValueError):
+                    self._entries = {}
+                    self.version = ''
+            return self.version
+
+    def get(self, url):
+        """
+        Look up the derivatives of a file.
+
+        Parameters:
+            url (str): Asset URL of the original file
+
+        Returns:
+            dict or None: Manifest entry, or None if the file has no derivatives
+        """
+        return self._entries.get(url)
+
+
+# Shared manifest used when rendering articles
+image_manifest = DerivativeManifest()
+
+
+if __name__ == '__main__':
+    result = build_derivatives()
+    for url, entry in result.items():
+        original = (ASSETS_DIR / url.removeprefix('/assets/')).stat().st_size
+        smallest = {
+            fmt: (DERIVATIVES_DIR / variants[0][0].removeprefix(f'{DERIVATIVES_URL}/')).stat()
+            for fmt, variants in entry['variants'].items()
+        }
+        summary = ', '.join(f'{fmt} {stat.st_size / 1024:.0f} KB' for fmt, stat in smallest.items())
+        print(f'{url}: {original / 1024:.0f} KB -> smallest {summary}')
+    print(f'{len(result)} images, manifest at {MANIFEST_PATH}')
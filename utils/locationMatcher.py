@@ -1,22 +1,64 @@
-from fuzzywuzzy import fuzz, process
+from collections import Counter, defaultdict
+
+from fuzzywuzzy import fuzz
 from unidecode import unidecode
 
 
 class LocationMatcher:
-    def __init__(self, df, threshold=80):
-        self.df = df.copy()  # Copy of the dataframe to avoid altering the original
+    """
+    Fuzzy matcher from free-text locations to region/district records.
+
+    The index is built once: every distinct normalized city is stored with its record, and a
+    character trigram index (over the token-sorted form used by ``token_sort_ratio``) shortlists
+    candidates so that only a handful of strings are scored per lookup, however large the
+    catalog grows.
+
+    If no shortlisted city reaches the threshold (e.g. a short or transposed name sharing few
+    trigrams with its match), every city is scored, as a plain linear scan would. A shortlisted
+    match that reaches the threshold is returned as is, even if a city outside the shortlist
+    would have scored higher; with max_candidates=25 this only happens between near-identical
+    names.
+    """
+
+    def __init__(self, df, threshold=80, max_candidates=25, max_posting=2000):
         self.threshold = threshold  # Threshold for fuzzy matching
+        self.max_candidates = max_candidates  # Candidates scored per lookup
+        self.max_posting = max_posting  # Trigrams shared by more cities are too common to help
+        has_capital = 'capital' in df.columns
 
-        # Normalize the 'location' column and split it into city and postal code
-        self.df['normalized_city'] = self.df['location'].apply(
-            lambda loc: self.normalize_text(self.split_location_field(loc)[0])
-        )
+        # One record per distinct normalized city (first occurrence wins, as before)
+        self.cities = []
+        self.records = []
+        seen = set()
+        capitals = df['capital'] if has_capital else [''] * len(df)
+        for location, region, district, capital in zip(
+            df['location'], df['region'], df['district'], capitals
+        ):
+            normalized_city = self.normalize_text(self.split_location_field(location)[0])
+            if normalized_city in seen:
+                continue
+            seen.add(normalized_city)
 
-        # Normalize the 'capital' column for capital city comparison (if it exists)
-        if 'capital' in self.df.columns:
-            self.df['normalized_capital'] = self.df['capital'].apply(self.normalize_text)
-        else:
-            self.df['normalized_capital'] = ''
+            # Check if the city matches the district's capital (if capital column exists)
+            normalized_capital = self.normalize_text(capital) if has_capital else ''
+            is_capital = bool(normalized_capital) and normalized_capital == normalized_city
+
+            self.cities.append(normalized_city)
+            self.records.append(
+                {
+                    'matched_city': location,  # Original location field (city and postal code)
+                    'region': region,
+                    'district': district,
+                    'capital_status': 'District Capital' if is_capital else '',
+                }
+            )
+
+        # Trigram -> candidate ids, plus exact lookup for the common "typed it right" case
+        self.exact = {city: i for i, city in enumerate(self.cities)}
+        self.gram_index = defaultdict(list)
+        for i, city in enumerate(self.cities):
+            for gram in self.trigrams(city):
+                self.gram_index[gram].append(i)
 
     @staticmethod
     def normalize_text(text):
@@ -25,6 +67,12 @@ class LocationMatcher:
             return unidecode(text).lower().strip()
         return ''
 
+    @staticmethod
+    def trigrams(text):
+        # Character trigrams of the token-sorted text, padded so short strings still index
+        padded = f"  {' '.join(sorted(text.split()))} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
     @staticmethod
     def split_location_field(location):
         # Split the location into city and postal code if available
@@ -36,36 +84,47 @@ class LocationMatcher:
                 postal_code = parts[1]  # Second part is the postal code (if available)
         return city, postal_code
 
+    def shortlist(self, normalized_city):
+        # Rank candidates by shared trigrams and keep the best few for scoring
+        grams = self.trigrams(normalized_city)
+        postings = sorted(
+            (self.gram_index[gram] for gram in grams if gram in self.gram_index), key=len
+        )
+        # Skip overly common trigrams, but always keep the rarest one
+        postings = postings[:1] + [p for p in postings[1:] if len(p) <= self.max_posting]
+        overlap = Counter()
+        for posting in postings:
+            overlap.update(posting)
+        # Ties keep catalog order so results match a linear scan
+        ranked = sorted(overlap.items(), key=lambda item: (-item[1], item[0]))
+        return [i for i, _ in ranked[: self.max_candidates]]
+
+    def best_match(self, normalized_city, candidates):
+        # Highest-scoring candidate (the first in catalog order on ties) and its score
+        best_id, best_score = None, -1
+        for i in candidates:
+            score = fuzz.token_sort_ratio(normalized_city, self.cities[i])
+            if score > best_score:
+                best_id, best_score = i, score
+        return best_id, best_score
+
     def get_region_district(self, city):
         normalized_city = self.normalize_text(city)
-        city_matches = process.extractOne(
-            normalized_city, self.df['normalized_city'], scorer=fuzz.token_sort_ratio
-        )
 
-        # Ensure the match score is above the threshold
-        if city_matches and city_matches[1] >= self.threshold:
-            matched_city = city_matches[0]
-            # print(f"\nBest match found: {matched_city} with score {city_matches[1]}")
+        best_id = self.exact.get(normalized_city)
+        if best_id is None:
+            best_id, best_score = self.best_match(
+                normalized_city, sorted(self.shortlist(normalized_city))
+            )
+            if best_score < self.threshold:
+                # The shortlist missed: fall back to scoring every city
+                best_id, best_score = self.best_match(normalized_city, range(len(self.cities)))
 
-            # Extract the row for the matched city
-            matched_row = self.df[self.df['normalized_city'] == matched_city].iloc[0]
+            # Ensure the match score is above the threshold
+            if best_id is None or best_score < self.threshold:
+                return None
 
-            # Check if the city matches the district's capital (if capital column exists)
-            is_capital = False
-            if 'capital' in self.df.columns and matched_row.get('normalized_capital'):
-                is_capital = matched_row['normalized_capital'] == matched_city
-            capital_status = 'District Capital' if is_capital else ''
-
-            return {
-                'matched_city': matched_row[
-                    'location'
-                ],  # Original location field (city and postal code)
-                'region': matched_row['region'],
-                'district': matched_row['district'],
-                'capital_status': capital_status,  # Return "District Capital" if applicable
-            }
-        else:
-            return None
+        return dict(self.records[best_id])
 
     def find_region_district(self, city_input):
         # First, extract city and postal code
@@ -4,9 +4,277 @@ Converts markdown files to styled HTML for display in the gallery
 """
 
 import os
-import markdown
+import re
+import hashlib
+import threading
+from html import escape
+from collections import OrderedDict
 from pathlib import Path
 
+import markdown
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.treeprocessors import Treeprocessor
+from xml.etree import ElementTree as etree
+
+from utils.imageDerivatives import image_manifest
+from utils.modelDerivatives import model_manifest
+from utils.sharedCache import CACHE_SHARED, shared_cache
+from utils.staticAssets import asset_url
+
+# Articles directory (one markdown file per place slug)
+ARTICLES_DIR = Path(__file__).parent.parent / 'assets' / 'articles'
+
+# Markdown extensions used for every article
+MARKDOWN_EXTENSIONS = [
+    'extra',  # Includes tables, fenced code blocks, etc.
+    'nl2br',  # Newline to <br>
+    'sane_lists',  # Better list handling
+]
+
+# Rendered width of article images: full width on phones, the article column on desktop
+ARTICLE_IMAGE_SIZES = '(max-width: 900px) 100vw, 860px'
+
+
+def fingerprinted(url):
+    """Add the content-hash query to local asset URLs so browsers can cache them for good."""
+    return asset_url(url.removeprefix('/assets/')) if url.startswith('/assets/') else url
+
+
+class ResponsiveImageProcessor(Treeprocessor):
+    """Lazy-loads article images and serves resized derivatives when they have been built."""
+
+    def run(self, root):
+        for parent in list(root.iter()):
+            for index, img in enumerate(list(parent)):
+                if img.tag != 'img':
+                    continue
+                img.set('loading', 'lazy')
+                img.set('decoding', 'async')
+
+                src = img.get('src', '')
+                img.set('src', fingerprinted(src))
+                entry = image_manifest.get(src)
+                if entry is None:
+                    continue
+                img.set('width', str(entry['width']))
+                img.set('height', str(entry['height']))
+                img.set(
+                    'style',
+                    f"background: url('{entry['placeholder']}') center / cover no-repeat",
+                )
+
+                picture = etree.Element('picture')
+                for fmt, variants in entry['variants'].items():
+                    etree.SubElement(
+                        picture,
+                        'source',
+                        type=f'image/{fmt}',
+                        srcset=', '.join(
+                            f'{fingerprinted(url)} {width}w' for url, width in variants
+                        ),
+                        sizes=ARTICLE_IMAGE_SIZES,
+                    )
+                parent.remove(img)
+                picture.append(img)
+                picture.tail, img.tail = img.tail, None
+                parent.insert(index, picture)
+
+
+# Opening <model-viewer> tags in raw HTML blocks, and their src attribute
+MODEL_VIEWER_TAG = re.compile(r'<model-viewer\b([^>]*)>')
+SRC_ATTRIBUTE = re.compile(r'\s+src="([^"]*)"')
+
+
+class LazyModelPostprocessor(Postprocessor):
+    """
+    Turns <model-viewer> blocks into lazily activated viewers.
+
+    The src moves to data-src-* attributes (full model plus any built LOD variants) and a poster
+    image is slotted in; the article page's loader script picks a variant and sets src once the
+    viewer scrolls into view.
+    """
+
+    def run(self, text):
+        return MODEL_VIEWER_TAG.sub(self._rewrite, text)
+
+    def _rewrite(self, match):
+        attributes = match.group(1)
+        src = SRC_ATTRIBUTE.search(attributes)
+        if src is None:
+            return match.group(0)
+        attributes = SRC_ATTRIBUTE.sub('', attributes, count=1).rstrip()
+
+        entry = model_manifest.get(src.group(1))
+        sources = {'full': src.group(1)}
+        poster = ''
+        if entry is not None:
+            sources['full'] = entry['full']['url']
+            sources.update((lod, variant['url']) for lod, variant in entry['variants'].items())
+            poster = (
+                f'<img slot="poster" class="model-poster" '
+                f'src="{escape(fingerprinted(entry["poster"]))}" alt="">'
+            )
+
+        data = ''.join(f' data-src-{lod}="{escape(url)}"' for lod, url in sources.items())
+        return f'<model-viewer{attributes}{data}>{poster}'
+
+
+class ArticleAssetsExtension(Extension):
+    """Responsive images and lazily loaded 3D models for articles."""
+
+    def extendMarkdown(self, md):
+        # Runs after the inline processor (priority 20) has created the <img> elements
+        md.treeprocessors.register(ResponsiveImageProcessor(md), 'responsive_images', 15)
+        # Runs after raw HTML blocks have been restored (priority 30)
+        md.postprocessors.register(LazyModelPostprocessor(md), 'lazy_models', 5)
+
+
+class ArticleCache:
+    """
+    Bounded cache of rendered article HTML.
+
+    Entries are keyed by slug and remember the mtime and content hash of the source file
+    (together with the image and model manifest versions, since rebuilt derivatives change the
+    output). A matching mtime is served straight from memory; a changed mtime triggers a
+    re-read, and the markdown is only recompiled when the content hash differs as well. An optional
+    shared cache (keyed ``article:<slug>:<hash>``) and an optional directory storing the
+    precompiled HTML as ``<slug>-<hash>.html`` let other processes and restarts skip the
+    markdown conversion.
+
+    Parameters:
+        max_entries (int): Maximum number of articles kept in memory (least recently used
+            entries are evicted first).
+        store_dir (str or Path, optional): Directory for precompiled HTML. Disabled if None.
+        shared (BaseCache, optional): Cache shared between workers (see utils.sharedCache).
+    """
+
+    def __init__(self, max_entries=64, store_dir=None, shared=None):
+        self.max_entries = max_entries
+        self.store_dir = Path(store_dir) if store_dir else None
+        self.shared = shared
+        self._entries = OrderedDict()  # slug -> ((mtime_ns, assets_version), digest, html)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get_html(self, slug, md_file_path):
+        """
+        Return the rendered HTML for an article, compiling it only when needed.
+
+        Parameters:
+            slug (str): The slug identifier for the place
+            md_file_path (Path): Path of the markdown source
+
+        Returns:
+            str: Rendered HTML content
+        """
+        assets_version = image_manifest.refresh() + model_manifest.refresh()
+        mtime = (md_file_path.stat().st_mtime_ns, assets_version)
+
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(slug)
+                self.hits += 1
+                return entry[2]
+
+        source = md_file_path.read_bytes()
+        digest = hashlib.sha256(source + assets_version.encode()).hexdigest()[:16]
+
+        # File was touched but the content is unchanged: keep the compiled HTML
+        if entry and entry[1] == digest:
+            self._put(slug, (mtime, digest, entry[2]))
+            with self._lock:
+                self.hits += 1
+            return entry[2]
+
+        html_content = self._load_stored(slug, digest)
+        if html_content is not None:
+            with self._lock:
+                self.store_hits += 1
+        else:
+            html_content = markdown.markdown(
+                source.decode('utf-8'),
+                extensions=[*MARKDOWN_EXTENSIONS, ArticleAssetsExtension()],
+            )
+            self._save_stored(slug, digest, html_content)
+            with self._lock:
+                self.misses += 1
+
+        self._put(slug, (mtime, digest, html_content))
+        return html_content
+
+    def _put(self, slug, entry):
+        with self._lock:
+            self._entries[slug] = entry
+            self._entries.move_to_end(slug)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _stored_path(self, slug, digest):
+        return self.store_dir / f'{slug}-{digest}.html'
+
+    def _load_stored(self, slug, digest):
+        if self.shared is not None:
+            html_content = self.shared.get(f'article:{slug}:{digest}')
+            if html_content is not None:
+                return html_content
+        if self.store_dir is None:
+            return None
+        try:
+            return self._stored_path(slug, digest).read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def _save_stored(self, slug, digest, html_content):
+        if self.shared is not None:
+            self.shared.set(f'article:{slug}:{digest}', html_content)
+        if self.store_dir is None:
+            return
+        try:
+            self.store_dir.mkdir(parents=True, exist_ok=True)
+            target = self._stored_path(slug, digest)
+            tmp_path = target.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_text(html_content, encoding='utf-8')
+            os.replace(tmp_path, target)  # Atomic so concurrent readers never see partial files
+        except OSError:
+            # The store is an optimisation only; rendering still succeeded
+            pass
+
+    def stats(self):
+        """
+        Return hit/miss counters for the cache.
+
+        Returns:
+            dict: Memory hits, store hits, misses (compilations), hit rate and entry count
+        """
+        with self._lock:
+            lookups = self.hits + self.store_hits + self.misses
+            return {
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.store_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+            }
+
+    def clear(self):
+        """Drop all in-memory entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.store_hits = self.misses = 0
+
+
+# Shared cache instance; set ARTICLE_CACHE_DIR to also keep precompiled HTML on disk. With a
+# cross-worker CACHE_BACKEND, an article compiled by one worker is reused by all the others
+article_cache = ArticleCache(
+    max_entries=int(os.getenv('ARTICLE_CACHE_SIZE', 64)),
+    store_dir=os.getenv('ARTICLE_CACHE_DIR'),
+    shared=shared_cache if CACHE_SHARED else None,
+)
+
 
 def generate_slug(name):
     """
@@ -42,8 +310,7 @@ def render_markdown_file(place_slug):
         str: Rendered HTML content or placeholder message if file not found
     """
     # Construct the file path
-    base_path = Path(__file__).parent.parent
-    md_file_path = base_path / 'assets' / 'articles' / f'{place_slug}.md'
+    md_file_path = ARTICLES_DIR / f'{place_slug}.md'
 
     # Check if the file exists
     if not md_file_path.exists():
@@ -55,22 +322,9 @@ def render_markdown_file(place_slug):
         </div>
         """
 
-    # Read the markdown file
+    # Serve the compiled article from the cache (recompiled only when the file changes)
     try:
-        with open(md_file_path, 'r', encoding='utf-8') as f:
-            md_content = f.read()
-
-        # Convert markdown to HTML with extensions
-        html_content = markdown.markdown(
-            md_content,
-            extensions=[
-                'extra',  # Includes tables, fenced code blocks, etc.
-                'nl2br',  # Newline to <br>
-                'sane_lists',  # Better list handling
-            ],
-        )
-
-        return html_content
+        return article_cache.get_html(place_slug, md_file_path)
     except Exception as e:
         return f"""
         <div class="error-article">
@@ -80,6 +334,18 @@ def render_markdown_file(place_slug):
         """
 
 
+def precompile_articles():
+    """
+    Compile every article into the cache (and the on-disk store, if configured).
+
+    Returns:
+        dict: Cache statistics after warming
+    """
+    for md_file_path in sorted(ARTICLES_DIR.glob('*.md')):
+        article_cache.get_html(md_file_path.stem, md_file_path)
+    return article_cache.stats()
+
+
 def get_all_place_slugs(places_df):
     """
     Generate slugs for all places in the dataframe.
@@ -90,8 +356,4 @@ def get_all_place_slugs(places_df):
     Returns:
         dict: Mapping of place names to slugs
     """
-    slug_map = {}
-    for _, row in places_df.iterrows():
-        name = row['name']
-        slug_map[name] = generate_slug(name)
-    return slug_map
+    return {name: generate_slug(name) for name in places_df['name']}
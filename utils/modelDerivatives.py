@@ -0,0 +1,451 @@
+"""
+Model Derivatives Utility
+Builds lower-detail GLB variants and poster images for the 3D models shown in articles
+
+Run ``python -m utils.modelDerivatives`` after adding or changing a model.
+"""
+
+import hashlib
+import io
+import json
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from utils.imageDerivatives import (
+    ASSETS_DIR,
+    DERIVATIVES_DIR,
+    DERIVATIVES_URL,
+    DerivativeManifest,
+    _write_atomic,
+)
+
+MODELS_DIR = ASSETS_DIR / '3d-models'
+MODEL_DERIVATIVES_DIR = DERIVATIVES_DIR / 'models'
+MODELS_MANIFEST_PATH = MODEL_DERIVATIVES_DIR / 'manifest.json'
+
+# URL prefix of the range-capable model route (see cyber_wc_app.serve_model)
+MODELS_URL = '/models/'
+
+# URL the posters in MODEL_DERIVATIVES_DIR are served at
+POSTERS_URL = f'{DERIVATIVES_URL}/models'
+
+# Level of detail -> (clustering grid cells along the longest side, position quantization bits)
+MODEL_LODS = {'medium': (400, 14), 'low': (150, 12)}
+
+# Primitives smaller than this are copied unchanged into every variant
+DECIMATE_MIN_TRIANGLES = 5000
+
+# Poster size in pixels (the viewer is 100% x 500px in articles)
+POSTER_SIZE = (960, 600)
+POSTER_BACKGROUND = (240, 240, 240)
+
+GLB_MAGIC = b'glTF'
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+DRACO = 'KHR_draco_mesh_compression'
+
+# Draco attribute types as reported by DracoPy
+DRACO_ATTRIBUTE_TYPES = {0: 'POSITION', 1: 'NORMAL', 3: 'TEXCOORD_0'}
+
+
+def read_glb(data):
+    """
+    Split a binary glTF file into its JSON document and binary chunk.
+
+    Parameters:
+        data (bytes): GLB file contents
+
+    Returns:
+        tuple: (gltf dict, bin bytes)
+    """
+    magic, version, _ = struct.unpack_from('<4sII', data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise ValueError('Not a glTF 2.0 binary file')
+    json_length, json_type = struct.unpack_from('<II', data, 12)
+    if json_type != CHUNK_JSON:
+        raise ValueError('GLB is missing its JSON chunk')
+    gltf = json.loads(data[20 : 20 + json_length])
+    offset = 20 + json_length
+    binary = b''
+    if offset < len(data):
+        bin_length, bin_type = struct.unpack_from('<II', data, offset)
+        if bin_type == CHUNK_BIN:
+            binary = data[offset + 8 : offset + 8 + bin_length]
+    return gltf, binary
+
+
+def write_glb(gltf, binary):
+    """
+    Assemble a binary glTF file.
+
+    Parameters:
+        gltf (dict): glTF JSON document
+        binary (bytes): Contents of the BIN chunk
+
+    Returns:
+        bytes: GLB file contents
+    """
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    binary += b'\0' * (-len(binary) % 4)
+    length = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return b''.join(
+        [
+            struct.pack('<4sII', GLB_MAGIC, 2, length),
+            struct.pack('<II', len(json_chunk), CHUNK_JSON),
+            json_chunk,
+            struct.pack('<II', len(binary), CHUNK_BIN),
+            binary,
+        ]
+    )
+
+
+def _buffer_view(gltf, binary, index):
+    view = gltf['bufferViews'][index]
+    start = view.get('byteOffset', 0)
+    return binary[start : start + view['byteLength']]
+
+
+def decimate(points, faces, normals, tex_coord, resolution):
+    """
+    Simplify a triangle mesh by vertex clustering.
+
+    Vertices falling into the same grid cell (and sharing a texture region, so palette colours
+    stay separate) are merged into their average; triangles that collapse are dropped.
+
+    Parameters:
+        points (np.ndarray): (n, 3) vertex positions
+        faces (np.ndarray): (m, 3) vertex indices
+        normals (np.ndarray): (n, 3) vertex normals
+        tex_coord (np.ndarray): (n, 2) texture coordinates
+        resolution (int): Grid cells along the longest side of the bounding box
+
+    Returns:
+        tuple: (points, faces, normals, tex_coord) of the simplified mesh
+    """
+    low = points.min(axis=0)
+    cell_size = max(float((points.max(axis=0) - low).max()) / resolution, 1e-12)
+    key = np.floor((points - low) / cell_size).astype(np.int64)
+    if tex_coord is not None:
+        key = np.column_stack([key, np.floor(tex_coord * 32).astype(np.int64)])
+    _, cluster, counts = np.unique(key, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.ravel()
+
+    def average(values):
+        total = np.zeros((len(counts), values.shape[1]))
+        np.add.at(total, cluster, values)
+        return total / counts[:, None]
+
+    new_points = average(points)
+    new_normals = None
+    if normals is not None:
+        new_normals = average(normals)
+        new_normals /= np.maximum(np.linalg.norm(new_normals, axis=1, keepdims=True), 1e-12)
+    new_tex_coord = average(tex_coord) if tex_coord is not None else None
+
+    new_faces = cluster[faces]
+    keep = (
+        (new_faces[:, 0] != new_faces[:, 1])
+        & (new_faces[:, 1] != new_faces[:, 2])
+        & (new_faces[:, 0] != new_faces[:, 2])
+    )
+    new_faces = np.unique(new_faces[keep], axis=0)
+    return new_points, new_faces, new_normals, new_tex_coord
+
+
+def build_lod(gltf, binary, resolution, position_bits):
+    """
+    Produce a lower-detail copy of a Draco-compressed GLB.
+
+    Parameters:
+        gltf (dict): glTF JSON document of the original
+        binary (bytes): BIN chunk of the original
+        resolution (int): Clustering grid resolution (see decimate)
+        position_bits (int): Draco quantization bits for positions
+
+    Returns:
+        tuple: (GLB bytes, triangle count)
+    """
+    import DracoPy
+
+    gltf = json.loads(json.dumps(gltf))
+    replaced = {}
+    triangles = 0
+    for mesh in gltf['meshes']:
+        for primitive in mesh['primitives']:
+            draco = primitive.get('extensions', {}).get(DRACO)
+            if draco is None:
+                continue
+            decoded = DracoPy.decode(_buffer_view(gltf, binary, draco['bufferView']))
+            faces = decoded.faces.reshape(-1, 3)
+            if len(faces) < DECIMATE_MIN_TRIANGLES:
+                triangles += len(faces)
+                continue
+
+            points, faces, normals, tex_coord = decimate(
+                decoded.points,
+                faces,
+                decoded.normals if 'NORMAL' in draco['attributes'] else None,
+                decoded.tex_coord if 'TEXCOORD_0' in draco['attributes'] else None,
+                resolution,
+            )
+            encoded = DracoPy.encode(
+                points.astype(np.float32),
+                faces.astype(np.uint32),
+                quantization_bits=position_bits,
+                compression_level=10,
+                normals=normals,
+                tex_coord=tex_coord,
+                normal_quantization_bits=8,
+                tex_coord_quantization_bits=10,
+            )
+            triangles += len(faces)
+            replaced[draco['bufferView']] = encoded
+
+            # Draco assigns its own attribute ids; point the extension at them
+            attribute_ids = {
+                DRACO_ATTRIBUTE_TYPES[attribute['attribute_type']]: attribute['unique_id']
+                for attribute in DracoPy.decode(encoded).attributes
+                if attribute['attribute_type'] in DRACO_ATTRIBUTE_TYPES
+            }
+            draco['attributes'] = {
+                name: attribute_ids[name] for name in draco['attributes'] if name in attribute_ids
+            }
+            accessors = gltf['accessors']
+            accessors[primitive['indices']]['count'] = int(faces.size)
+            for name, accessor in primitive['attributes'].items():
+                accessors[accessor]['count'] = len(points)
+            position = accessors[primitive['attributes']['POSITION']]
+            position['min'] = points.min(axis=0).astype(np.float32).tolist()
+            position['max'] = points.max(axis=0).astype(np.float32).tolist()
+
+    # Repack the BIN chunk with the replaced views (4-byte aligned)
+    chunks, offset = [], 0
+    for index, view in enumerate(gltf['bufferViews']):
+        data = replaced.get(index, _buffer_view(gltf, binary, index))
+        padding = -offset % 4
+        chunks.append(b'\0' * padding)
+        offset += padding
+        view['byteOffset'] = offset
+        view['byteLength'] = len(data)
+        chunks.append(data)
+        offset += len(data)
+    new_binary = b''.join(chunks)
+    gltf['buffers'][0]['byteLength'] = len(new_binary)
+    return write_glb(gltf, new_binary), triangles
+
+
+def _node_matrices(gltf):
+    """World matrix of every mesh-bearing node in the default scene."""
+
+    def local(node):
+        if 'matrix' in node:
+            return np.array(node['matrix'], dtype=float).reshape(4, 4).T
+        x, y, z, w = node.get('rotation', (0, 0, 0, 1))
+        rotation = np.array(
+            [
+                [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+                [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+                [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+            ]
+        )
+        matrix = np.eye(4)
+        matrix[:3, :3] = rotation * np.array(node.get('scale', (1, 1, 1)))
+        matrix[:3, 3] = node.get('translation', (0, 0, 0))
+        return matrix
+
+    result = []
+    scene = gltf['scenes'][gltf.get('scene', 0)]
+    stack = [(index, np.eye(4)) for index in scene['nodes']]
+    while stack:
+        index, parent = stack.pop()
+        node = gltf['nodes'][index]
+        world = parent @ local(node)
+        if 'mesh' in node:
+            result.append((node['mesh'], world))
+        stack.extend((child, world) for child in node.get('children', []))
+    return result
+
+
+def render_poster(gltf, binary, size=POSTER_SIZE):
+    """
+    Draw a shaded still of the model, framed like model-viewer's default camera.
+
+    Parameters:
+        gltf (dict): glTF JSON document
+        binary (bytes): BIN chunk
+        size (tuple): (width, height) in pixels
+
+    Returns:
+        PIL.Image.Image: Poster image
+    """
+    import DracoPy
+    from PIL import Image, ImageDraw
+
+    textures = []
+    for image in gltf.get('images', []):
+        textures.append(
+            np.asarray(Image.open(io.BytesIO(_buffer_view(gltf, binary, image['bufferView']))))
+        )
+
+    def base_color(primitive, tex_coord, count):
+        material = gltf['materials'][primitive.get('material', 0)]
+        pbr = material.get('pbrMetallicRoughness', {})
+        factor = np.array(pbr.get('baseColorFactor', (1, 1, 1, 1))[:3])
+        texture_info = pbr.get('baseColorTexture')
+        if texture_info is None or tex_coord is None:
+            return np.tile(factor * 255, (count, 1))
+        texture = gltf['textures'][texture_info['index']]
+        source = texture.get('source', texture.get('extensions', {}).get('EXT_texture_webp', {}))
+        pixels = textures[source if isinstance(source, int) else source.get('source', 0)]
+        height, width = pixels.shape[:2]
+        u = np.clip((tex_coord[:, 0] % 1) * width, 0, width - 1).astype(int)
+        v = np.clip((tex_coord[:, 1] % 1) * height, 0, height - 1).astype(int)
+        return pixels[v, u, :3] * factor
+
+    # Collect world-space triangles with a colour each
+    corners, colors, normals = [], [], []
+    for mesh_index, world in _node_matrices(gltf):
+        for primitive in gltf['meshes'][mesh_index]['primitives']:
+            draco = primitive.get('extensions', {}).get(DRACO)
+            if draco is None:
+                continue
+            decoded = DracoPy.decode(_buffer_view(gltf, binary, draco['bufferView']))
+            faces = decoded.faces.reshape(-1, 3)
+            points = decoded.points @ world[:3, :3].T + world[:3, 3]
+            triangles = points[faces]
+            centroid_uv = (
+                decoded.tex_coord[faces].mean(axis=1) if decoded.tex_coord is not None else None
+            )
+            corners.append(triangles)
+            colors.append(base_color(primitive, centroid_uv, len(faces)))
+            normals.append(
+                np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            )
+    corners = np.concatenate(corners)
+    colors = np.concatenate(colors)
+    normals = np.concatenate(normals)
+    normals /= np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+    # Camera slightly above the front (model-viewer's default orbit is 75deg from the pole)
+    elevation = np.radians(15)
+    view = np.array(
+        [
+            [1, 0, 0],
+            [0, np.cos(elevation), -np.sin(elevation)],
+            [0, np.sin(elevation), np.cos(elevation)],
+        ]
+    )
+    corners = (corners - corners.reshape(-1, 3).mean(axis=0)) @ view.T
+    normals = normals @ view.T
+
+    # Two-sided Lambert shading from a light over the viewer's shoulder
+    light = np.array([0.4, 0.6, 0.7])
+    light /= np.linalg.norm(light)
+    shade = 0.35 + 0.65 * np.abs(normals @ light)
+    colors = np.clip(colors * shade[:, None], 0, 255).astype(np.uint8)
+
+    # Fit the projected model into the poster with a margin, then paint back to front
+    width, height = size
+    flat = corners.reshape(-1, 3)
+    low, high = flat[:, :2].min(axis=0), flat[:, :2].max(axis=0)
+    scale = 0.9 * min(width / max(high[0] - low[0], 1e-9), height / max(high[1] - low[1], 1e-9))
+    center = (low + high) / 2
+    screen_x = (corners[:, :, 0] - center[0]) * scale + width / 2
+    screen_y = height / 2 - (corners[:, :, 1] - center[1]) * scale
+    order = np.argsort(corners[:, :, 2].mean(axis=1))
+
+    poster = Image.new('RGB', size, POSTER_BACKGROUND)
+    draw = ImageDraw.Draw(poster)
+    for i in order:
+        polygon = list(zip(screen_x[i].tolist(), screen_y[i].tolist()))
+        draw.polygon(polygon, fill=tuple(colors[i].tolist()))
+    return poster
+
+
+def build_model_derivatives(
+    output_dir=MODEL_DERIVATIVES_DIR, lods=MODEL_LODS, posters_url=POSTERS_URL
+):
+    """
+    Generate LOD variants and a poster for every GLB in assets/3d-models.
+
+    Output names embed the source hash, so they can be cached forever; unchanged models are
+    skipped on rerun.
+
+    Parameters:
+        output_dir (Path): Directory for the variants, posters and manifest.json
+        lods (dict): Level name -> (clustering resolution, position quantization bits)
+        posters_url (str): URL output_dir is served at, used for the poster URLs
+
+    Returns:
+        dict: The manifest (original asset URL -> full, variants, poster and sizes)
+    """
+    output_dir = Path(output_dir)
+    manifest_path = output_dir / 'manifest.json'
+    try:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        previous = {}
+
+    manifest = {}
+    for source_path in sorted(MODELS_DIR.glob('*.glb')):
+        url = f'/assets/{source_path.relative_to(ASSETS_DIR)}'
+        source = source_path.read_bytes()
+        digest = hashlib.sha256(source).hexdigest()[:16]
+        stem = f'{source_path.stem}-{digest[:8]}'
+
+        entry = previous.get(url)
+        if (
+            entry
+            and entry['digest'] == digest
+            and set(entry['variants']) == set(lods)
+            and (output_dir / f'{stem}-poster.webp').exists()
+            and all((output_dir / f'{stem}-{lod}.glb').exists() for lod in lods)
+        ):
+            manifest[url] = entry
+            continue
+
+        gltf, binary = read_glb(source)
+        variants = {}
+        for lod, (resolution, position_bits) in lods.items():
+            data, triangles = build_lod(gltf, binary, resolution, position_bits)
+            _write_atomic(output_dir / f'{stem}-{lod}.glb', data)
+            variants[lod] = {
+                'url': f'{MODELS_URL}{stem}-{lod}.glb',
+                'bytes': len(data),
+                'triangles': triangles,
+            }
+
+        # The poster is drawn from the lightest variant; it only has to be recognisable
+        lightest = output_dir / f'{stem}-{list(lods)[-1]}.glb'
+        poster = render_poster(*read_glb(lightest.read_bytes()))
+        buffer = io.BytesIO()
+        poster.save(buffer, format='WEBP', quality=80)
+        _write_atomic(output_dir / f'{stem}-poster.webp', buffer.getvalue())
+
+        manifest[url] = {
+            'digest': digest,
+            'full': {'url': f'{MODELS_URL}{source_path.name}', 'bytes': len(source)},
+            'variants': variants,
+            'poster': f"{posters_url.rstrip('/')}/{stem}-poster.webp",
+        }
+
+    _write_atomic(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+# Shared manifest used when rendering articles
+model_manifest = DerivativeManifest(MODELS_MANIFEST_PATH)
+
+
+if __name__ == '__main__':
+    result = build_model_derivatives()
+    for url, entry in result.items():
+        sizes = ', '.join(
+            f"{lod} {variant['bytes'] / 1024:.0f} KB ({variant['triangles']} triangles)"
+            for lod, variant in entry['variants'].items()
+        )
+        print(f"{url}: full {entry['full']['bytes'] / 1024:.0f} KB -> {sizes}")
+    print(f'{len(result)} models, manifest at {MODELS_MANIFEST_PATH}')
@@ -0,0 +1,191 @@
+"""
+Place Catalog Utility
+Read-only view of places and districts with lookups precomputed at startup
+"""
+
+from types import MappingProxyType
+
+import numpy as np
+
+# Zoom used when framing a single district on the explore map
+DISTRICT_ZOOM = 13
+
+
+def _group_positions(values):
+    """Map each distinct value to the sorted, read-only array of row positions holding it."""
+    groups = {}
+    for position, value in enumerate(values):
+        groups.setdefault(value, []).append(position)
+    return MappingProxyType({key: _frozen_array(rows) for key, rows in groups.items()})
+
+
+def _frozen_array(positions):
+    array = np.asarray(positions, dtype=np.int64)
+    array.setflags(write=False)
+    return array
+
+
+class PlaceCatalog:
+    """
+    Immutable catalog of places and districts.
+
+    Every grouping the callbacks need (by region, district code, condition and slug) is computed
+    once as arrays of row positions, so requests do dictionary lookups and array slices instead of
+    scanning or copying the DataFrames. The catalog keeps references to the frames it was built
+    from; they must not be modified afterwards.
+
+    Parameters:
+        places_df (pd.DataFrame): Places with 'name', 'region', 'district_num' and
+            'curr_condition' columns.
+        district_df (GeoDataFrame): District geometries with 'district', 'code' and 'region'.
+        slug_map (dict): Mapping of place names to slugs.
+    """
+
+    def __init__(self, places_df, district_df, slug_map):
+        self.places = places_df
+        self.districts = district_df
+
+        # Place groupings (row positions into self.places)
+        self.region_positions = _group_positions(places_df['region'])
+        self.district_positions = _group_positions(places_df['district_num'].astype(str))
+        self.condition_positions = _group_positions(places_df['curr_condition'])
+
+        slugs = [slug_map.get(name) or '' for name in places_df['name']]
+        self.slug_positions = MappingProxyType(
+            {slug: position for position, slug in reversed(list(enumerate(slugs))) if slug}
+        )
+        # Places that can be shown in the gallery (named and routable), in catalog order
+        self.gallery_positions = _frozen_array(
+            [position for position, slug in enumerate(slugs) if slug]
+        )
+
+        # District lookups
+        unique_districts = district_df.drop_duplicates(subset='district')
+        self.district_to_code = MappingProxyType(
+            dict(zip(unique_districts['district'], unique_districts['code'].astype(str)))
+        )
+        self.district_rows = MappingProxyType(
+            {str(code): row for row, code in enumerate(district_df['code'])}
+        )
+
+        options = {}
+        for region, district, code in (
+            district_df[['region', 'district', 'code']].drop_duplicates().itertuples(index=False)
+        ):
+            options.setdefault(region, []).append({'label': f'{district}', 'value': district})
+        self.district_options_by_region = MappingProxyType(
+            {region: tuple(region_options) for region, region_options in options.items()}
+        )
+
+        views = {}
+        for code, geometry in zip(district_df['code'], district_df['geometry']):
+            centroid = geometry.centroid
+            views[str(code)] = {
+                'zoom': DISTRICT_ZOOM,
+                'center': {'lat': centroid.y, 'lon': centroid.x},
+            }
+        self.district_views = MappingProxyType(views)
+
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError('PlaceCatalog is read-only')
+        super().__setattr__(name, value)
+
+    def place_by_slug(self, slug):
+        """
+        Look up a place by its URL slug.
+
+        Parameters:
+            slug (str): URL-friendly slug
+
+        Returns:
+            pd.Series or None: Place row, or None if the slug is unknown
+        """
+        position = self.slug_positions.get(slug)
+        return None if position is None else self.places.iloc[position]
+
+    def gallery_positions_for(self, region='all', condition='all'):
+        """
+        Row positions of gallery places matching the filters, in catalog order.
+
+        Parameters:
+            region (str): Region name, or 'all'
+            condition (str): Current condition, or 'all'
+
+        Returns:
+            np.ndarray: Sorted row positions
+        """
+        positions = self.gallery_positions
+        if region != 'all':
+            positions = np.intersect1d(
+                positions, self.region_positions.get(region, ()), assume_unique=True
+            )
+        if condition != 'all':
+            positions = np.intersect1d(
+                positions, self.condition_positions.get(condition, ()), assume_unique=True
+            )
+        return positions
+
+    def places_at(self, positions):
+        """
+        Return the places at the given row positions.
+
+        Parameters:
+            positions (array-like): Row positions (e.g. one gallery page)
+
+        Returns:
+            pd.DataFrame: Selected places
+        """
+        return self.places.iloc[positions]
+
+    def places_in_district(self, district_code):
+        """
+        Return the places in a district.
+
+        Parameters:
+            district_code (str): District code (e.g. 'WC')
+
+        Returns:
+            pd.DataFrame: Places in the district (empty if none)
+        """
+        return self.places.iloc[self.district_positions.get(str(district_code), [])]
+
+    def district_frame(self, district_code):
+        """
+        Return the geometry row of a district as a one-row GeoDataFrame.
+
+        Parameters:
+            district_code (str): District code
+
+        Returns:
+            GeoDataFrame: Matching district (empty if unknown)
+        """
+        row = self.district_rows.get(str(district_code))
+        return self.districts.iloc[[] if row is None else [row]]
+
+    def district_options(self, region):
+        """
+        Dropdown options for the districts of a region.
+
+        Parameters:
+            region (str): Region name
+
+        Returns:
+            list: [{'label': ..., 'value': ...}] options
+        """
+        return list(self.district_options_by_region.get(region, ()))
+
+    def district_view(self, district_code):
+        """
+        Default zoom and centroid for a district.
+
+        Parameters:
+            district_code (str): District code
+
+        Returns:
+            dict: {'zoom': ..., 'center': {'lat': ..., 'lon': ...}}, or {} if unknown
+        """
+        view = self.district_views.get(str(district_code))
+        return {'zoom': view['zoom'], 'center': dict(view['center'])} if view else {}
@@ -0,0 +1,179 @@
+"""
+Place Clusters Utility
+Zoom-aware grid clustering of map places, so dense districts send a bounded number of markers
+"""
+
+import hashlib
+import math
+import os
+
+import numpy as np
+
+from layouts.layout_main import condition_color_map
+
+# Districts with at most this many shown places are sent unclustered (and do not change on pan)
+MAP_CLUSTER_MIN_POINTS = int(os.getenv('MAP_CLUSTER_MIN_POINTS', 300))
+
+# Size of a cluster cell in screen pixels
+MAP_CLUSTER_RADIUS = int(os.getenv('MAP_CLUSTER_RADIUS', 60))
+
+# Above this zoom places are never clustered (cells would be a few metres wide)
+CLUSTER_MAX_ZOOM = 18
+
+# World width in pixels at zoom 0 (MapLibre uses 512-pixel tiles)
+WORLD_SIZE = 512
+
+# Explore map size in pixels (see utils.appFunctions.map_view_figure) and the extra margin
+# around it, as a fraction of the map size on each side, so short pans need no new markers
+VIEWPORT_SIZE = (800, 600)
+VIEWPORT_PADDING = 0.5
+
+CLUSTER_COLOR = '#4A4A4A'
+CLUSTER_MIN_SIZE = 16
+CLUSTER_MAX_SIZE = 40
+
+
+def mercator(lons, lats):
+    """
+    Project longitudes and latitudes to Web Mercator world coordinates.
+
+    Parameters:
+        lons (array-like): Longitudes in degrees
+        lats (array-like): Latitudes in degrees
+
+    Returns:
+        tuple: (x, y) arrays in [0, 1], y growing southwards as on screen
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.clip(np.asarray(lats, dtype=float), -85.05, 85.05)
+    x = (lons + 180) / 360
+    y = (1 - np.log(np.tan(np.radians(lats)) + 1 / np.cos(np.radians(lats))) / math.pi) / 2
+    return x, y
+
+
+def cluster_size(count):
+    """Marker size of a cluster, growing with the logarithm of its place count."""
+    return int(min(CLUSTER_MAX_SIZE, CLUSTER_MIN_SIZE + 4 * math.log2(count)))
+
+
+class PlaceClusters:
+    """
+    Clustering index over the places shown on the explore map.
+
+    Places are projected once to Web Mercator. At zoom z the world is divided into square cells
+    MAP_CLUSTER_RADIUS screen pixels wide; the cells halve at every zoom step, so they nest like
+    the nodes of a quadtree. A query keeps the cells that overlap the (padded) viewport and
+    replaces every cell holding more than one place by a single cluster marker at the mean
+    position of its places. The markers sent are therefore bounded by the number of cells on
+    screen, however dense the area. Clusters are whole cells, so the same zoom and cells always
+    give the same markers (see the signature returned by markers()).
+
+    Parameters:
+        places_df (pd.DataFrame): Places with 'latitude', 'longitude', 'district_num',
+            'curr_condition' and the marker columns of utils.appFunctions.add_marker_columns.
+        min_points (int): Places shown unclustered when a district has no more than this
+        radius (int): Cell size in screen pixels
+    """
+
+    def __init__(self, places_df, min_points=MAP_CLUSTER_MIN_POINTS, radius=MAP_CLUSTER_RADIUS):
+        self.min_points = min_points
+        self.radius = radius
+
+        self.lats = places_df['latitude'].to_numpy(dtype=float).round(6)
+        self.lons = places_df['longitude'].to_numpy(dtype=float).round(6)
+        self.x, self.y = mercator(self.lons, self.lats)
+
+        self.text = places_df['hover_text'].to_numpy(dtype=object)
+        self.conditions = places_df['curr_condition'].fillna('').astype(str).to_numpy(dtype=object)
+        self.colors = places_df['marker_color'].to_numpy(dtype=object)
+        self.sizes = places_df['marker_size'].to_numpy()
+        self.index = places_df.index.to_numpy()
+
+        groups = {}
+        for position, code in enumerate(places_df['district_num'].astype(str)):
+            groups.setdefault(code, []).append(position)
+        self.district_positions = {
+            code: np.asarray(positions, dtype=np.int64) for code, positions in groups.items()
+        }
+
+    def _places(self, positions):
+        """Marker lists for individual places."""
+        return {
+            'lat': self.lats[positions].tolist(),
+            'lon': self.lons[positions].tolist(),
+            'text': self.text[positions].tolist(),
+            'condition': self.conditions[positions].tolist(),
+            'customdata': self.index[positions].tolist(),
+            'color': self.colors[positions].tolist(),
+            'size': self.sizes[positions].tolist(),
+        }
+
+    def _visible_cells(self, positions, zoom, center):
+        """Cell of each place at the cluster zoom and which cells overlap the padded viewport."""
+        level = min(max(int(zoom), 0), CLUSTER_MAX_ZOOM)
+        cell = self.radius / (WORLD_SIZE * 2**level)
+        cell_x = np.floor(self.x[positions] / cell).astype(np.int64)
+        cell_y = np.floor(self.y[positions] / cell).astype(np.int64)
+
+        center_x, center_y = mercator([center['lon']], [center['lat']])
+        scale = (1 + 2 * VIEWPORT_PADDING) / (2 * WORLD_SIZE * 2**zoom)
+        half_width, half_height = VIEWPORT_SIZE[0] * scale, VIEWPORT_SIZE[1] * scale
+        in_view = (
+            (cell_x >= math.floor((center_x[0] - half_width) / cell))
+            & (cell_x <= math.floor((center_x[0] + half_width) / cell))
+            & (cell_y >= math.floor((center_y[0] - half_height) / cell))
+            & (cell_y <= math.floor((center_y[0] + half_height) / cell))
+        )
+        return level, (cell_x << 32) + cell_y, in_view
+
+    def markers(self, district_code, zoom, center, visible_conditions):
+        """
+        Markers of a district for a map view.
+
+        Parameters:
+            district_code (str or None): District code (None gives no markers)
+            zoom (float): Map zoom
+            center (dict): Map centre {'lat', 'lon'}
+            visible_conditions (iterable): Conditions shown (places with any other condition are
+                always shown)
+
+        Returns:
+            tuple: (markers as per-marker lists for each of utils.appFunctions.MARKER_FIELDS,
+                clusters having customdata None; signature string that changes whenever the
+                markers do)
+        """
+        positions = self.district_positions.get(str(district_code), np.empty(0, dtype=np.int64))
+        hidden = set(condition_color_map) - set(visible_conditions)
+        if hidden:
+            positions = positions[~np.isin(self.conditions[positions], list(hidden))]
+        digest = hashlib.sha1(f'{district_code}|{sorted(visible_conditions)}'.encode())
+
+        if len(positions) <= self.min_points:
+            return self._places(positions), digest.hexdigest()[:16]
+
+        level, keys, in_view = self._visible_cells(positions, zoom, center)
+        positions, keys = positions[in_view], keys[in_view]
+        cells, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        digest.update(f'|{level}|'.encode())
+        digest.update(cells.tobytes())
+        if int(zoom) > CLUSTER_MAX_ZOOM or len(cells) == len(positions):
+            return self._places(positions), digest.hexdigest()[:16]
+
+        # Places alone in their cell stay individual markers, in cell order
+        single = counts[inverse] == 1
+        markers = self._places(positions[single][np.argsort(inverse[single], kind='stable')])
+
+        grouped = counts > 1
+        lats = np.bincount(inverse, weights=self.lats[positions])[grouped] / counts[grouped]
+        lons = np.bincount(inverse, weights=self.lons[positions])[grouped] / counts[grouped]
+        for lat, lon, count in zip(lats.round(6), lons.round(6), counts[grouped].tolist()):
+            markers['lat'].append(float(lat))
+            markers['lon'].append(float(lon))
+            markers['text'].append(
+                f"<span style='font-size: 14px;'>{count} places</span><br>Zoom in to see them<br>"
+            )
+            markers['condition'].append('')
+            markers['customdata'].append(None)
+            markers['color'].append(CLUSTER_COLOR)
+            markers['size'].append(cluster_size(count))
+        return markers, digest.hexdigest()[:16]
@@ -0,0 +1,96 @@
+"""
+Process Memory Utility
+Resident, proportional and private memory of processes (for sizing gunicorn deployments)
+"""
+
+import os
+from pathlib import Path
+
+# Fields of /proc/<pid>/smaps_rollup reported by memory_usage (kB)
+SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty',
+    'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty',
+}
+
+
+def memory_usage(pid='self'):
+    """
+    Memory of one process in megabytes.
+
+    RSS counts every resident page, including pages still shared copy-on-write with the
+    gunicorn master; PSS divides shared pages between the processes sharing them; USS
+    (private) is what the process alone costs and what a new worker adds to the instance.
+
+    Parameters:
+        pid (int or str): Process id, or 'self'
+
+    Returns:
+        dict or None: {'rss', 'pss', 'uss', 'shared'} in MB, or None if /proc is unavailable
+            (non-Linux systems) or the process is gone
+    """
+    try:
+        text = Path(f'/proc/{pid}/smaps_rollup').read_text()
+    except OSError:
+        return None
+
+    values = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(':')
+        if name in SMAPS_FIELDS:
+            values[SMAPS_FIELDS[name]] = int(rest.split()[0]) / 1024
+    return {
+        'rss': values.get('rss', 0.0),
+        'pss': values.get('pss', 0.0),
+        'uss': values.get('private_clean', 0.0) + values.get('private_dirty', 0.0),
+        'shared': values.get('shared_clean', 0.0) + values.get('shared_dirty', 0.0),
+    }
+
+
+def child_pids(pid):
+    """
+    Direct children of a process (e.g. the workers of a gunicorn master).
+
+    Parameters:
+        pid (int): Parent process id
+
+    Returns:
+        list: Child process ids (empty if /proc is unavailable)
+    """
+    children = []
+    try:
+        for task in Path(f'/proc/{pid}/task').iterdir():
+            children.extend(int(child) for child in (task / 'children').read_text().split())
+    except OSError:
+        return []
+    return sorted(set(children))
+
+
+def format_memory(usage):
+    """One-line summary of a memory_usage() result."""
+    if usage is None:
+        return 'memory unavailable'
+    return (
+        f"rss {usage['rss']:.1f} MB, pss {usage['pss']:.1f} MB, "
+        f"private {usage['uss']:.1f} MB, shared {usage['shared']:.1f} MB"
+    )
+
+
+def available_cpus():
+    """
+    CPUs this process may use, honouring cgroup CPU quotas (e.g. fractional container CPUs).
+
+    Returns:
+        float: Number of CPUs (at least 1)
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    try:
+        quota, period = Path('/sys/fs/cgroup/cpu.max').read_text().split()
+        if quota != 'max':
+            cpus = min(cpus, int(quota) / int(period))
+    except (OSError, ValueError):
+        pass
+    return max(1.0, float(cpus or 1))
@@ -0,0 +1,188 @@
+"""
+Search Index Utility
+BM25-ranked full-text search over place records and article bodies
+"""
+
+import math
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from utils.textTokens import CJK_CHARACTER, tokenize
+
+# Relative weight of each field in a document's term frequencies
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'address': 2.0,
+    'district': 1.5,
+    'district_zh': 1.5,
+    'region': 1.0,
+    'description': 1.0,
+    'article': 1.0,
+}
+
+# Markdown/HTML noise removed before indexing article bodies
+MARKUP = re.compile(r'<[^>]+>|!\[[^\]]*\]\([^)]*\)|\]\([^)]*\)|[#*_`>|\[\]]')
+
+SNIPPET_LENGTH = 160
+
+
+def article_text(markdown_source):
+    """Plain text of a markdown article (headings, emphasis, links and HTML removed)."""
+    return re.sub(r'\s+', ' ', MARKUP.sub(' ', markdown_source)).strip()
+
+
+class SearchIndex:
+    """
+    Inverted index with BM25 ranking.
+
+    Each document's term frequencies are summed over its fields with FIELD_WEIGHTS, so a term
+    in a place's name counts more than one in its article. Postings are numpy arrays, so a
+    query costs one vectorised update per query term. The last query term also matches as a
+    prefix, which suits search-as-you-type.
+
+    Parameters:
+        documents (list): Dicts with 'slug', 'name', 'district', 'region', 'position' (row in
+            the places frame, or None) and any of the FIELD_WEIGHTS text fields.
+        k1 (float): BM25 term-frequency saturation
+        b (float): BM25 length normalisation
+    """
+
+    def __init__(self, documents, k1=1.2, b=0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(dict)  # term -> {doc id: weighted tf}
+        lengths = np.zeros(len(documents))
+        for doc_id, document in enumerate(documents):
+            for field, weight in FIELD_WEIGHTS.items():
+                terms = tokenize(document.get(field))
+                lengths[doc_id] += weight * len(terms)
+                for term, count in Counter(terms).items():
+                    postings[term][doc_id] = postings[term].get(doc_id, 0.0) + weight * count
+
+        average_length = lengths.mean() if len(documents) else 1.0
+        self.norms = k1 * (1 - b + b * lengths / max(average_length, 1e-9))
+        n_docs = len(documents)
+        self.postings = {}
+        for term, docs in postings.items():
+            ids = np.fromiter(docs, dtype=np.int32, count=len(docs))
+            tfs = np.fromiter(docs.values(), dtype=float, count=len(docs))
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = (ids, idf * tfs * (k1 + 1) / (tfs + self.norms[ids]))
+        self.vocabulary = sorted(self.postings)
+
+    @classmethod
+    def from_sources(cls, places_df, slug_map, articles_dir):
+        """
+        Build the index from the places table and the markdown articles.
+
+        Parameters:
+            places_df (pd.DataFrame): Places (name, address, description, district, ...)
+            slug_map (dict): Place name -> slug (articles are named <slug>.md)
+            articles_dir (Path): Directory of markdown articles
+
+        Returns:
+            SearchIndex: Index with one document per place, plus one per unmatched article
+        """
+        articles = {
+            path.stem: path.read_text(encoding='utf-8')
+            for path in sorted(Path(articles_dir).glob('*.md'))
+        }
+        documents = []
+        for position, row in enumerate(places_df.to_dict('records')):
+            slug = slug_map.get(row['name'])
+            documents.append(
+                {
+                    'slug': slug,
+                    'position': position,
+                    'article': article_text(articles.pop(slug, '')),
+                    **{
+                        field: row.get(field) if isinstance(row.get(field), str) else None
+                        for field in ('name', 'address', 'description', 'district',
+                                      'district_zh', 'region', 'curr_condition')
+                    },
+                }
+            )
+        for slug, source in articles.items():
+            heading = re.search(r'^#\s+(.+)$', source, re.MULTILINE)
+            title = heading.group(1).strip() if heading else slug.replace('-', ' ').title()
+            documents.append(
+                {'slug': slug, 'position': None, 'name': title, 'article': article_text(source)}
+            )
+        return cls(documents)
+
+    def _expand(self, term):
+        """Vocabulary terms starting with a (partial) query term."""
+        start = bisect_left(self.vocabulary, term)
+        matches = []
+        for candidate in self.vocabulary[start : start + 50]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+
+    def search(self, query, limit=10):
+        """
+        Rank documents for a query.
+
+        Parameters:
+            query (str): Free-text query (English and/or Chinese)
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Result dicts (slug, name, district, region, position, score, snippet),
+                best first
+        """
+        terms = tokenize(query)
+        if not terms or not self.documents:
+            return []
+
+        terms = list(dict.fromkeys(terms))
+        scores = np.zeros(len(self.documents))
+        for i, term in enumerate(terms):
+            is_last = i == len(terms) - 1
+            expanded = self._expand(term) if is_last and not CJK_CHARACTER.match(term) else []
+            for candidate in expanded or [term]:
+                posting = self.postings.get(candidate)
+                if posting is not None:
+                    # Prefix matches count a little less than the exact term
+                    weight = 1.0 if candidate == term else 0.8
+                    np.add.at(scores, posting[0], weight * posting[1])
+
+        ranked = np.argsort(-scores, kind='stable')[:limit]
+        return [
+            {
+                'slug': self.documents[doc_id]['slug'],
+                'name': self.documents[doc_id].get('name'),
+                'district': self.documents[doc_id].get('district'),
+                'region': self.documents[doc_id].get('region'),
+                'condition': self.documents[doc_id].get('curr_condition'),
+                'position': self.documents[doc_id]['position'],
+                'score': round(float(scores[doc_id]), 4),
+                'snippet': self.snippet(self.documents[doc_id], query),
+            }
+            for doc_id in ranked
+            if scores[doc_id] > 0
+        ]
+
+    @staticmethod
+    def snippet(document, query, length=SNIPPET_LENGTH):
+        """Short excerpt of the description or article around the first query match."""
+        words = [word for word in re.findall(r'\w+', query.lower()) if len(word) > 1]
+        for field in ('description', 'article'):
+            text = document.get(field)
+            if not isinstance(text, str) or not text:
+                continue
+            lowered = text.lower()
+            hits = [index for index in (lowered.find(word) for word in words) if index >= 0]
+            if not hits and field == 'description':
+                continue
+            start = max(0, min(hits, default=0) - length // 3)
+            excerpt = text[start : start + length].strip()
+            return ('…' if start else '') + excerpt + ('…' if start + length < len(text) else '')
+        return ''
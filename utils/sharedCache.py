@@ -0,0 +1,464 @@
+"""
+Shared Cache Utility
+Cache backends shared by every gunicorn worker: filesystem, shared memory or a Redis server
+
+The backend is chosen with CACHE_BACKEND ('simple', 'filesystem', 'shm' or 'redis'). All
+backends implement the cachelib/flask-caching BaseCache API, so the same instance serves
+flask-caching (map figures), the article renderer and the AI chat.
+"""
+
+import fcntl
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import socket
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.filesystemcache import FileSystemCache
+from flask_caching.backends.simplecache import SimpleCache
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'simple').lower()
+# Whether entries written by one worker are visible to the others
+CACHE_SHARED = CACHE_BACKEND != 'simple'
+CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 3600))
+
+# Filesystem backend
+CACHE_DIR = os.getenv('CACHE_DIR', str(PROJECT_DIR / '.cache_store'))
+CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', 2000))
+
+# Shared memory backend (/dev/shm is RAM-backed on Linux)
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', os.path.join(SHM_DIR, 'cyber_wc_cache'))
+SHARED_CACHE_SIZE_MB = int(os.getenv('SHARED_CACHE_SIZE_MB', 64))
+SHARED_CACHE_SLOT_KB = int(os.getenv('SHARED_CACHE_SLOT_KB', 256))
+
+# Redis backend (any server speaking the Redis protocol, see loadtest.fake_redis)
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'cyber_wc:')
+
+# Pickled values larger than this are zlib-compressed before they are stored
+COMPRESS_MIN_BYTES = 4096
+
+
+def _dump(value):
+    """Serialize a value, compressing large payloads. Returns (flags, payload)."""
+    payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(payload) >= COMPRESS_MIN_BYTES:
+        compressed = zlib.compress(payload, 1)
+        if len(compressed) < len(payload):
+            return 1, compressed
+    return 0, payload
+
+
+def _load(flags, payload):
+    return pickle.loads(zlib.decompress(payload) if flags & 1 else payload)
+
+
+class SharedMemoryCache(BaseCache):
+    """
+    Fixed-size cache in a memory-mapped file shared by all processes on the host.
+
+    The file holds a table of equally sized slots grouped in buckets of two; a key hashes to
+    one bucket and replaces the older of its two slots when both are taken. Buckets are
+    guarded with fcntl byte-range locks (between processes) plus a thread lock (within one
+    process). Each process maps the file itself, so a cache created before gunicorn forks
+    keeps working in the workers. Values that do not fit in a slot are not cached.
+
+    Parameters:
+        path (str): File backing the table (put it on a tmpfs such as /dev/shm)
+        size_mb (int): Size of the table in megabytes
+        slot_kb (int): Size of one slot in kilobytes (upper bound for a compressed value)
+        default_timeout (int): Default timeout in seconds (0 never expires)
+    """
+
+    MAGIC = b'CWCSHM01'
+    HEADER = struct.Struct('<8sII')  # magic, slot count, slot size
+    HEADER_SIZE = 64
+    SLOT = struct.Struct('<16sddIB')  # key digest, expiry (0 = never), written at, length, flags
+    BUCKET_SLOTS = 2
+
+    def __init__(
+        self,
+        path=SHARED_CACHE_PATH,
+        size_mb=SHARED_CACHE_SIZE_MB,
+        slot_kb=SHARED_CACHE_SLOT_KB,
+        default_timeout=300,
+    ):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.slot_size = slot_kb * 1024
+        self.n_buckets = max(1, size_mb * 1024 * 1024 // (self.slot_size * self.BUCKET_SLOTS))
+        self.n_slots = self.n_buckets * self.BUCKET_SLOTS
+        self._map = None
+        self._fd = None
+        self._pid = None
+        self._thread_lock = threading.Lock()
+
+    def _table(self):
+        """Memory map of the table for the current process, created on first use."""
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+
+        self._thread_lock = threading.Lock()  # Never inherit a lock held at fork time
+        size = self.HEADER_SIZE + self.n_slots * self.slot_size
+        header = self.HEADER.pack(self.MAGIC, self.n_slots, self.slot_size)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != size or os.pread(fd, len(header), 0) != header:
+                # New file or a different layout: start from an empty (sparse) table
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, header, 0)
+        finally:
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(fd, size)
+        self._fd, self._pid = fd, os.getpid()
+        return self._map
+
+    def _bucket(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        bucket = int.from_bytes(digest[:8], 'little') % self.n_buckets
+        offset = self.HEADER_SIZE + bucket * self.BUCKET_SLOTS * self.slot_size
+        return digest, offset
+
+    def _locked(self, offset, exclusive, whole_table=False):
+        length = (self.n_slots if whole_table else self.BUCKET_SLOTS) * self.slot_size
+        return _BucketLock(self, offset, length, exclusive)
+
+    def _slots(self, table, offset):
+        for index in range(self.BUCKET_SLOTS):
+            slot_offset = offset + index * self.slot_size
+            yield slot_offset, self.SLOT.unpack_from(table, slot_offset)
+
+    def _find(self, table, offset, digest):
+        now = time.time()
+        for slot_offset, (slot_digest, expires, _, length, flags) in self._slots(table, offset):
+            if slot_digest == digest:
+                if expires and expires <= now:
+                    return None
+                return slot_offset, length, flags
+        return None
+
+    def get(self, key):
+        table = self._table()
+        digest, offset = self._bucket(key)
+        with self._locked(offset, exclusive=False):
+            found = self._find(table, offset, digest)
+            if found is None:
+                return None
+            slot_offset, length, flags = found
+            start = slot_offset + self.SLOT.size
+            payload = table[start : start + length]
+        try:
+            return _load(flags, payload)
+        except Exception:
+            return None
+
+    def has(self, key):
+        table = self._table()
+        digest, offset = self._bucket(key)
+        with self._locked(offset, exclusive=False):
+            return self._find(table, offset, digest) is not None
+
+    def set(self, key, value, timeout=None):
+        return self._store(key, value, timeout, overwrite=True)
+
+    def add(self, key, value, timeout=None):
+        return self._store(key, value, timeout, overwrite=False)
+
+    def _store(self, key, value, timeout, overwrite):
+        flags, payload = _dump(value)
+        if self.SLOT.size + len(payload) > self.slot_size:
+            return False
+        timeout = self._normalize_timeout(timeout)
+        now = time.time()
+        expires = now + timeout if timeout > 0 else 0.0
+
+        table = self._table()
+        digest, offset = self._bucket(key)
+        with self._locked(offset, exclusive=True):
+            if not overwrite and self._find(table, offset, digest) is not None:
+                return False
+            # Reuse the key's slot, else a free or expired one, else evict the oldest write
+            candidates = list(self._slots(table, offset))
+            target = next((slot for slot in candidates if slot[1][0] == digest), None)
+            if target is None:
+
+                def eviction_order(slot):
+                    _, (_, slot_expires, written, length, _) = slot
+                    live = length > 0 and not (slot_expires and slot_expires <= now)
+                    return live, written
+
+                target = min(candidates, key=eviction_order)
+            slot_offset = target[0]
+            self.SLOT.pack_into(table, slot_offset, bytes(16), 0.0, 0.0, 0, 0)
+            start = slot_offset + self.SLOT.size
+            table[start : start + len(payload)] = payload
+            self.SLOT.pack_into(table, slot_offset, digest, expires, now, len(payload), flags)
+        return True
+
+    def delete(self, key):
+        table = self._table()
+        digest, offset = self._bucket(key)
+        with self._locked(offset, exclusive=True):
+            for slot_offset, (slot_digest, *_) in self._slots(table, offset):
+                if slot_digest == digest:
+                    self.SLOT.pack_into(table, slot_offset, bytes(16), 0.0, 0.0, 0, 0)
+                    return True
+        return False
+
+    def clear(self):
+        table = self._table()
+        with self._locked(self.HEADER_SIZE, exclusive=True, whole_table=True):
+            for slot in range(self.n_slots):
+                slot_offset = self.HEADER_SIZE + slot * self.slot_size
+                self.SLOT.pack_into(table, slot_offset, bytes(16), 0.0, 0.0, 0, 0)
+        return True
+
+
+class _BucketLock:
+    """Thread lock plus an fcntl lock on one bucket (or the whole table) of a SharedMemoryCache."""
+
+    def __init__(self, cache, offset, length, exclusive):
+        self.cache = cache
+        self.offset, self.length = offset, length
+        self.mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+
+    def __enter__(self):
+        self.cache._thread_lock.acquire()
+        try:
+            fcntl.lockf(self.cache._fd, self.mode, self.length, self.offset)
+        except BaseException:
+            self.cache._thread_lock.release()
+            raise
+
+    def __exit__(self, *exc_info):
+        try:
+            fcntl.lockf(self.cache._fd, fcntl.LOCK_UN, self.length, self.offset)
+        finally:
+            self.cache._thread_lock.release()
+
+
+class RedisProtocolError(Exception):
+    """Error reply from the Redis server."""
+
+
+class RedisProtocolCache(BaseCache):
+    """
+    Cache on any server speaking the Redis protocol (Redis, Valkey, KeyDB, loadtest.fake_redis).
+
+    Talks RESP over plain sockets, one connection per thread, so no client library is needed.
+    The cache is an optimisation only: when the server is unreachable, reads miss and writes
+    are dropped (with a logged warning) instead of failing the request.
+
+    Parameters:
+        url (str): redis://[:password@]host[:port][/db]
+        key_prefix (str): Prefix for every key, so several apps can share one server
+        default_timeout (int): Default timeout in seconds (0 never expires)
+        socket_timeout (float): Seconds to wait for the server
+    """
+
+    def __init__(
+        self, url=CACHE_REDIS_URL, key_prefix=CACHE_KEY_PREFIX, default_timeout=300, socket_timeout=2.0
+    ):
+        super().__init__(default_timeout=default_timeout)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.key_prefix = key_prefix
+        self.socket_timeout = socket_timeout
+        self._local = threading.local()
+        self._last_warning = 0.0
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile('rb'), os.getpid())
+        self._local.connection = connection
+        if self.password:
+            self._roundtrip(connection, ('AUTH', self.password))
+        if self.db:
+            self._roundtrip(connection, ('SELECT', self.db))
+        return connection
+
+    def _disconnect(self):
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection[0].close()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError('Connection closed by the cache server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RedisProtocolError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError('Connection closed by the cache server')
+            return data[:-2]
+        if kind == b'*':
+            length = int(rest)
+            return None if length < 0 else [self._read_reply(reader) for _ in range(length)]
+        raise RedisProtocolError(f'Unexpected reply {line!r}')
+
+    def _roundtrip(self, connection, args):
+        connection[0].sendall(self._encode(args))
+        return self._read_reply(connection[1])
+
+    def execute(self, *args):
+        """
+        Send one command and return its reply, reconnecting once if the connection dropped.
+
+        Raises:
+            OSError: If the server cannot be reached
+            RedisProtocolError: If the server answers with an error
+        """
+        for attempt in (1, 2):
+            connection = getattr(self._local, 'connection', None)
+            try:
+                if connection is None or connection[2] != os.getpid():
+                    connection = self._connect()
+                return self._roundtrip(connection, args)
+            except OSError:
+                self._disconnect()
+                if attempt == 2:
+                    raise
+
+    def _safe(self, default, *args):
+        try:
+            return self.execute(*args)
+        except (OSError, RedisProtocolError) as error:
+            now = time.monotonic()
+            if now - self._last_warning > 60:
+                self._last_warning = now
+                logger.warning('Cache server %s:%s unavailable: %s', self.host, self.port, error)
+            return default
+
+    @staticmethod
+    def _serialize(value):
+        flags, payload = _dump(value)
+        return bytes([flags]) + payload
+
+    @staticmethod
+    def _deserialize(data):
+        if not data:
+            return None
+        try:
+            return _load(data[0], data[1:])
+        except Exception:
+            return None
+
+    def _expiry_args(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return ('PX', int(timeout * 1000)) if timeout > 0 else ()
+
+    def get(self, key):
+        return self._deserialize(self._safe(None, 'GET', self.key_prefix + key))
+
+    def get_many(self, *keys):
+        if not keys:
+            return []
+        values = self._safe(None, 'MGET', *(self.key_prefix + key for key in keys))
+        return [self._deserialize(value) for value in values or [None] * len(keys)]
+
+    def has(self, key):
+        return bool(self._safe(0, 'EXISTS', self.key_prefix + key))
+
+    def set(self, key, value, timeout=None):
+        args = ('SET', self.key_prefix + key, self._serialize(value), *self._expiry_args(timeout))
+        return self._safe(None, *args) == 'OK'
+
+    def add(self, key, value, timeout=None):
+        args = ('SET', self.key_prefix + key, self._serialize(value))
+        return self._safe(None, *args, *self._expiry_args(timeout), 'NX') == 'OK'
+
+    def delete(self, key):
+        return bool(self._safe(0, 'DEL', self.key_prefix + key))
+
+    def delete_many(self, *keys):
+        if keys:
+            self._safe(0, 'DEL', *(self.key_prefix + key for key in keys))
+        return list(keys)
+
+    def clear(self):
+        if not self.key_prefix:
+            return self._safe(None, 'FLUSHDB') == 'OK'
+        cursor = b'0'
+        while True:
+            reply = self._safe(None, 'SCAN', cursor, 'MATCH', f'{self.key_prefix}*', 'COUNT', 500)
+            if reply is None:
+                return False
+            cursor, keys = reply
+            if keys:
+                self._safe(0, 'DEL', *keys)
+            if cursor in (b'0', '0'):
+                return True
+
+
+def create_cache(backend=CACHE_BACKEND, default_timeout=CACHE_DEFAULT_TIMEOUT):
+    """
+    Create the cache for a backend name.
+
+    Parameters:
+        backend (str): 'simple' (per process), 'filesystem', 'shm' or 'redis'
+        default_timeout (int): Default timeout in seconds
+
+    Returns:
+        BaseCache: Cache implementing the flask-caching backend API
+    """
+    if backend == 'simple':
+        return SimpleCache(threshold=CACHE_THRESHOLD, default_timeout=default_timeout)
+    if backend == 'filesystem':
+        return FileSystemCache(CACHE_DIR, threshold=CACHE_THRESHOLD, default_timeout=default_timeout)
+    if backend == 'shm':
+        return SharedMemoryCache(default_timeout=default_timeout)
+    if backend == 'redis':
+        return RedisProtocolCache(default_timeout=default_timeout)
+    raise ValueError(f"Unknown CACHE_BACKEND {backend!r} (use simple, filesystem, shm or redis)")
+
+
+# Cache shared by flask-caching, the article renderer and the AI chat
+shared_cache = create_cache()
+
+
+def flask_cache_factory(app, config, args, kwargs):
+    """flask-caching CACHE_TYPE hook that hands out the shared cache instance."""
+    return shared_cache
@@ -0,0 +1,262 @@
+"""
+Static Assets Utility
+Fingerprints files under assets/ and serves them precompressed with long-lived caching
+
+Run ``python -m utils.staticAssets`` at build time to precompress everything up front;
+otherwise variants are created on first request.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from pathlib import Path
+
+from flask import send_file
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+PROJECT_DIR = Path(__file__).parent.parent
+ASSETS_DIR = PROJECT_DIR / 'assets'
+
+# Where compressed variants are kept (outside assets/ so Dash does not pick them up)
+STATIC_CACHE_DIR = Path(os.getenv('STATIC_CACHE_DIR', PROJECT_DIR / '.static_cache'))
+
+# Text formats worth compressing; images, fonts and Draco models are already compressed
+COMPRESSIBLE_SUFFIXES = (
+    '.css', '.js', '.json', '.geojson', '.html', '.svg', '.csv', '.md', '.txt', '.xml'
+)
+MIN_COMPRESS_BYTES = 1024
+
+# A variant is only kept if it saves at least this fraction of the original size
+MIN_COMPRESSION_SAVING = 0.1
+
+# Cache lifetime for fingerprinted URLs (the content behind them never changes)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+mimetypes.add_type('application/geo+json', '.geojson')
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class StaticAssets:
+    """
+    Content-addressed view of the assets folder.
+
+    Each file gets a digest of its contents (recomputed only when its size or mtime changes).
+    URLs built with url() carry the digest as ``?v=``, and responses to such URLs (or to Dash's
+    own ``?m=<mtime>`` cache-busting URLs) are cached as immutable. Plain URLs are revalidated
+    with the digest as ETag. Text files are served as brotli or gzip according to
+    Accept-Encoding, from variants stored under ``cache_dir/<digest>.<encoding>``.
+
+    Parameters:
+        root (Path): Directory served under /assets/
+        cache_dir (Path): Directory for compressed variants
+    """
+
+    def __init__(self, root=ASSETS_DIR, cache_dir=STATIC_CACHE_DIR):
+        self.root = Path(root)
+        self.cache_dir = Path(cache_dir)
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._entries = {}  # relative path -> entry dict
+        self._lock = threading.Lock()
+
+    def entry(self, path):
+        """
+        Look up (and fingerprint if needed) a file under the assets folder.
+
+        Parameters:
+            path (str): Path relative to the assets folder, e.g. 'styles.css'
+
+        Returns:
+            dict or None: {'path', 'mtime', 'digest', 'variants'}, or None if there is no such file
+        """
+        full_path = safe_join(str(self.root), path)
+        if full_path is None:
+            return None
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['key'] == key:
+                return entry
+
+        digest = hashlib.sha256(Path(full_path).read_bytes()).hexdigest()[:16]
+        entry = {
+            'path': Path(full_path),
+            'key': key,
+            'mtime': stat.st_mtime,
+            'digest': digest,
+            'compressible': path.lower().endswith(COMPRESSIBLE_SUFFIXES)
+            and stat.st_size >= MIN_COMPRESS_BYTES,
+            'variants': {},  # encoding -> Path, or None when compression does not pay off
+        }
+        with self._lock:
+            self._entries[path] = entry
+        return entry
+
+    def url(self, path):
+        """
+        Fingerprinted URL for an asset.
+
+        Parameters:
+            path (str): Path relative to the assets folder
+
+        Returns:
+            str: '/assets/<path>?v=<digest>', or '/assets/<path>' if the file does not exist
+        """
+        path = path.lstrip('/')
+        entry = self.entry(path)
+        return f'/assets/{path}' if entry is None else f"/assets/{path}?v={entry['digest'][:12]}"
+
+    def variant(self, entry, encoding):
+        """
+        Path of a compressed variant, creating it on first use.
+
+        Parameters:
+            entry (dict): Asset entry from entry()
+            encoding (str): 'br' or 'gzip'
+
+        Returns:
+            Path or None: Variant file, or None if compression is not worthwhile
+        """
+        if encoding in entry['variants']:
+            return entry['variants'][encoding]
+
+        target = self.cache_dir / f"{entry['digest']}.{encoding}"
+        if not target.exists():
+            data = entry['path'].read_bytes()
+            compressed = _compress(data, encoding)
+            if len(compressed) > len(data) * (1 - MIN_COMPRESSION_SAVING):
+                entry['variants'][encoding] = None
+                return None
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_suffix(f'.{os.getpid()}.tmp')
+            tmp_path.write_bytes(compressed)
+            os.replace(tmp_path, target)  # Atomic so concurrent workers never serve partial files
+        entry['variants'][encoding] = target
+        return target
+
+    def precompress(self):
+        """
+        Fingerprint every asset and build all compressed variants.
+
+        Returns:
+            dict: Counts of files, compressible files and bytes before/after the best encoding
+        """
+        stats = {'files': 0, 'compressed': 0, 'original_bytes': 0, 'compressed_bytes': 0}
+        for full_path in sorted(self.root.rglob('*')):
+            if not full_path.is_file():
+                continue
+            entry = self.entry(full_path.relative_to(self.root).as_posix())
+            stats['files'] += 1
+            if entry is None or not entry['compressible']:
+                continue
+            sizes = [
+                variant.stat().st_size
+                for variant in (self.variant(entry, encoding) for encoding in self.encodings)
+                if variant is not None
+            ]
+            if sizes:
+                stats['compressed'] += 1
+                stats['original_bytes'] += entry['key'][1]
+                stats['compressed_bytes'] += min(sizes)
+        return stats
+
+    def response(self, path, request):
+        """
+        Build the response for GET /assets/<path>.
+
+        Parameters:
+            path (str): Path relative to the assets folder
+            request (flask.Request): Current request (for query, Accept-Encoding and validators)
+
+        Returns:
+            flask.Response or None: Response, or None if the file does not exist
+        """
+        entry = self.entry(path)
+        if entry is None:
+            return None
+
+        version = request.args.get('v')
+        mtime = request.args.get('m')
+        versioned = version == entry['digest'][:12] or (
+            mtime is not None and _same_mtime(mtime, entry['mtime'])
+        )
+
+        file_path, encoding = entry['path'], None
+        if entry['compressible']:
+            for candidate in self.encodings:
+                if request.accept_encodings[candidate]:
+                    variant = self.variant(entry, candidate)
+                    if variant is not None:
+                        file_path, encoding = variant, candidate
+                        break
+
+        response = send_file(
+            file_path,
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            conditional=True,
+            etag=f"{entry['digest']}-{encoding}" if encoding else entry['digest'],
+            last_modified=entry['mtime'],
+            max_age=IMMUTABLE_MAX_AGE if versioned else None,
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if entry['compressible']:
+            response.vary.add('Accept-Encoding')
+        if versioned:
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True  # Revalidate; unchanged files return 304
+        return response
+
+
+def _same_mtime(value, mtime):
+    try:
+        return abs(float(value) - mtime) < 1e-3
+    except ValueError:
+        return False
+
+
+# Shared instance used by the server and for building asset URLs
+static_assets = StaticAssets()
+
+
+def asset_url(path):
+    """
+    Fingerprinted URL for a file in the assets folder (see StaticAssets.url).
+
+    Parameters:
+        path (str): Path relative to the assets folder, e.g. 'Images/github-mark.png'
+
+    Returns:
+        str: URL with a content-hash query string
+    """
+    return static_assets.url(path)
+
+
+if __name__ == '__main__':
+    result = static_assets.precompress()
+    saved = result['original_bytes'] - result['compressed_bytes']
+    print(
+        f"{result['files']} assets fingerprinted, {result['compressed']} precompressed "
+        f"({', '.join(static_assets.encodings)}): {result['original_bytes'] / 1024:.0f} KB -> "
+        f"{result['compressed_bytes'] / 1024:.0f} KB ({saved / 1024:.0f} KB saved)"
+    )
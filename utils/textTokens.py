@@ -0,0 +1,55 @@
+"""
+Text Tokens Utility
+Word and Chinese character terms of English/Chinese text, shared by search and chat
+"""
+
+import re
+import unicodedata
+
+from unidecode import unidecode
+
+# Runs of CJK ideographs (split into character uni- and bigrams) and runs of other word characters
+CJK_RUN = r'[㐀-䶿一-鿿豈-﫿]+'
+TOKEN_RUN = re.compile(rf'({CJK_RUN})|[^\W_]+')
+CJK_CHARACTER = re.compile(CJK_RUN)
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it its of on or that the this to was were '
+    'which with'.split()
+)
+
+
+def _stem(word):
+    # Light plural/possessive folding so "Queens", "Queen's" and "queen" match
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """
+    Split text into terms (search index terms, and the words chat summaries are scored by).
+
+    Latin-script words are transliterated, lowercased and lightly stemmed; runs of Chinese
+    characters become character unigrams and bigrams, so '灣仔' matches both '灣' and '灣仔'.
+
+    Parameters:
+        text (str): Text in English and/or Chinese
+
+    Returns:
+        list: Terms in order of appearance
+    """
+    if not isinstance(text, str):
+        return []
+    terms = []
+    for match in TOKEN_RUN.finditer(unicodedata.normalize('NFKC', text).lower()):
+        run = match.group(0)
+        if match.group(1):
+            terms.extend(run)
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+            continue
+        for word in re.findall(r'[a-z0-9]+', unidecode(run).lower()):
+            if word in STOPWORDS or (len(word) == 1 and not word.isdigit()):
+                continue
+            terms.append(_stem(word))
+    return terms
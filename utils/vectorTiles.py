@@ -0,0 +1,477 @@
+"""
+Vector Tiles Utility
+Mapbox Vector Tiles (MVT 2.1) of places and district polygons, cached in memory and on disk
+
+Run ``python -m utils.vectorTiles`` to render every tile up to a zoom into the disk cache ahead
+of time; otherwise tiles are rendered on first request.
+"""
+
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import shapely
+from flask import Response
+from shapely.geometry.polygon import orient
+
+from layouts.layout_main import condition_color_map
+from utils.placeClusters import mercator
+
+PROJECT_DIR = Path(__file__).parent.parent
+
+# Draw all places and district borders on the explore map from the tile endpoints
+MAP_VECTOR_TILES = os.getenv('MAP_VECTOR_TILES', '').lower() in ('1', 'true', 'yes')
+
+# Absolute base URL of the tile endpoints for the map (default: the host of the page request)
+MAP_TILES_BASE_URL = os.getenv('MAP_TILES_BASE_URL', '')
+
+# Rendered tiles kept in each worker's memory
+TILE_CACHE_SIZE = int(os.getenv('TILE_CACHE_SIZE', 2048))
+
+# Where rendered tiles are stored, per data version, for every worker and restart to reuse
+TILE_CACHE_DIR = Path(os.getenv('TILE_CACHE_DIR', PROJECT_DIR / '.tile_cache'))
+
+# Tile coordinate space, and the margin drawn around each tile so symbols and lines crossing
+# tile edges are not cut off
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+# Zooms served; the map overzooms the last tiles beyond this
+TILE_MAX_ZOOM = 16
+
+TILE_LAYERS = ('places', 'districts')
+TILE_MIMETYPE = 'application/vnd.mapbox-vector-tile'
+
+# Cache lifetime for tile URLs carrying the data version (their content never changes)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Tile without layers, served for every address outside the data
+EMPTY_TILE = b''
+
+# MVT geometry types and commands
+POINT, POLYGON = 1, 3
+MOVE_TO, LINE_TO, CLOSE_PATH = 1, 2, 7
+
+
+def condition_layer(condition):
+    """
+    Name of the places tile layer holding a condition (e.g. 'In use' -> 'in-use').
+
+    Parameters:
+        condition (str): Place condition; conditions without a map colour share 'other'
+
+    Returns:
+        str: Layer name
+    """
+    if condition not in condition_color_map:
+        return 'other'
+    return re.sub(r'[^a-z0-9]+', '-', condition.lower()).strip('-')
+
+
+# Protocol buffer encoding (only what the vector tile schema needs)
+
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(field, value):
+    return _key(field, 0) + _varint(value)
+
+
+def _packed_field(field, values):
+    return _bytes_field(field, b''.join(_varint(value) for value in values))
+
+
+def _value(value):
+    """Encode a feature property value (string, bool, integer or double)."""
+    if isinstance(value, bool):
+        return _varint_field(7, int(value))
+    if isinstance(value, (int, np.integer)):
+        return _varint_field(6, _zigzag(int(value)))  # sint64
+    if isinstance(value, (float, np.floating)):
+        return _key(3, 1) + struct.pack('<d', float(value))
+    return _bytes_field(1, str(value).encode('utf-8'))
+
+
+def encode_layer(name, features, extent=TILE_EXTENT):
+    """
+    Encode one tile layer.
+
+    Parameters:
+        name (str): Layer name (the map's source-layer)
+        features (list): (id or None, properties dict, geometry type, geometry command integers)
+        extent (int): Tile coordinate space
+
+    Returns:
+        bytes: Layer message, to be concatenated into a tile with encode_tile
+    """
+    keys, values, encoded = {}, {}, []
+    for feature_id, properties, geometry_type, geometry in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value).__name__, value), len(values)))
+        message = b''
+        if feature_id is not None:
+            message += _varint_field(1, int(feature_id))
+        message += _packed_field(2, tags)
+        message += _varint_field(3, geometry_type)
+        message += _packed_field(4, geometry)
+        encoded.append(_bytes_field(2, message))
+
+    layer = _varint_field(15, 2) + _bytes_field(1, name.encode('utf-8'))
+    layer += b''.join(encoded)
+    layer += b''.join(_bytes_field(3, key.encode('utf-8')) for key in keys)
+    layer += b''.join(_bytes_field(4, _value(value)) for _, value in values)
+    layer += _varint_field(5, extent)
+    return layer
+
+
+def encode_tile(layers):
+    """Concatenate encoded layers into a tile (empty layers are left out)."""
+    return b''.join(_bytes_field(3, layer) for layer in layers if layer)
+
+
+def _command(command, count):
+    return (command & 0x7) | (count << 3)
+
+
+def point_geometry(x, y):
+    """Geometry commands of a point at integer tile coordinates."""
+    return [_command(MOVE_TO, 1), _zigzag(x), _zigzag(y)]
+
+
+def polygon_geometry(polygons):
+    """
+    Geometry commands of polygons already in integer tile coordinates.
+
+    Exterior rings must wind with a positive area in tile space (y down) and holes the other
+    way (see utils.vectorTiles.VectorTiles._district_features, which orients them).
+    """
+    commands, cursor_x, cursor_y = [], 0, 0
+    for polygon in polygons:
+        for ring in [polygon.exterior, *polygon.interiors]:
+            coords = np.asarray(ring.coords, dtype=np.int64)[:-1]
+            if len(coords) < 3:
+                continue
+            deltas = np.diff(coords, axis=0, prepend=[[cursor_x, cursor_y]])
+            cursor_x, cursor_y = (int(value) for value in coords[-1])
+            zigzagged = [_zigzag(int(value)) for value in deltas.ravel()]
+            commands.append(_command(MOVE_TO, 1))
+            commands.extend(zigzagged[:2])
+            commands.append(_command(LINE_TO, len(coords) - 1))
+            commands.extend(zigzagged[2:])
+            commands.append(_command(CLOSE_PATH, 1))
+    return commands
+
+
+def tile_bounds(z, x, y, buffer=TILE_BUFFER):
+    """
+    Web Mercator world bounds of a tile (see utils.placeClusters.mercator).
+
+    Parameters:
+        z, x, y (int): Tile address
+        buffer (int): Margin in tile units
+
+    Returns:
+        tuple: (min_x, min_y, max_x, max_y) including the margin, and the tile size
+    """
+    size = 1 / 2**z
+    margin = size * buffer / TILE_EXTENT
+    min_x, min_y = x * size - margin, y * size - margin
+    bounds = (min_x, min_y, min_x + size + 2 * margin, min_y + size + 2 * margin)
+    return bounds, size
+
+
+class VectorTiles:
+    """
+    Vector tiles of the explore map data, rendered on demand.
+
+    The places tile has one layer per place condition (named by condition_layer), so the map
+    can colour and filter them per layer; the districts tile has a single 'districts' layer of
+    polygons. Geometries are projected once at startup; a tile clips them to its bounds,
+    simplifies polygons to the tile grid and encodes the result. Tiles are kept in an LRU in
+    each worker and as files under cache_dir/<data version>/ shared by all workers, so each tile
+    is rendered once per dataset. Tiles outside the bounds of the data are empty; they are served
+    without being rendered or cached, so the disk cache only ever holds the tiles over the data.
+
+    Parameters:
+        places_df (pd.DataFrame): Places with 'latitude', 'longitude', 'name', 'location' and
+            'curr_condition' columns (the index is used as feature id).
+        district_df (GeoDataFrame): District geometries with 'code', 'district' and 'region'.
+        version (str): Data version (see utils.dataSnapshot); part of every URL and disk path
+        max_entries (int): Tiles kept in memory
+        cache_dir (Path or None): Disk cache (None keeps tiles in memory only)
+    """
+
+    def __init__(
+        self,
+        places_df,
+        district_df,
+        version,
+        max_entries=TILE_CACHE_SIZE,
+        cache_dir=TILE_CACHE_DIR,
+    ):
+        self.version = version
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) / version if cache_dir else None
+
+        self.place_x, self.place_y = mercator(places_df['longitude'], places_df['latitude'])
+        self.place_ids = places_df.index.to_numpy()
+        self.place_properties = [
+            {
+                'name': name,
+                'location': location,
+                'condition': condition,
+            }
+            for name, location, condition in zip(
+                places_df['name'].fillna('').astype(str),
+                places_df['location'].fillna('').astype(str),
+                places_df['curr_condition'].fillna('').astype(str),
+            )
+        ]
+        self.place_layers = np.array(
+            [condition_layer(properties['condition']) for properties in self.place_properties],
+            dtype=object,
+        )
+
+        self.district_geometries = [
+            shapely.transform(geometry, lambda coords: np.column_stack(mercator(*coords.T)))
+            for geometry in district_df['geometry']
+        ]
+        self.district_properties = [
+            {'code': str(code), 'district': district, 'region': region}
+            for code, district, region in zip(
+                district_df['code'], district_df['district'], district_df['region']
+            )
+        ]
+        self.district_tree = shapely.STRtree(self.district_geometries)
+
+        # World bounds of all places and districts (min_x, min_y, max_x, max_y)
+        min_x, min_y, max_x, max_y = shapely.total_bounds(self.district_geometries)
+        if len(self.place_x):
+            min_x, max_x = min(min_x, self.place_x.min()), max(max_x, self.place_x.max())
+            min_y, max_y = min(min_y, self.place_y.min()), max(max_y, self.place_y.max())
+        self.bounds = (float(min_x), float(min_y), float(max_x), float(max_y))
+
+        self._tiles = OrderedDict()  # (layer, z, x, y) -> bytes
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.rendered = 0
+        self.outside = 0
+
+    def covers(self, z, x, y):
+        """Whether a tile (with its margin) overlaps the bounds of the data."""
+        (min_x, min_y, max_x, max_y), _ = tile_bounds(z, x, y)
+        return (
+            min_x <= self.bounds[2] and max_x >= self.bounds[0]
+            and min_y <= self.bounds[3] and max_y >= self.bounds[1]
+        )
+
+    def url_template(self, layer):
+        """
+        Tile URL template of a layer for map sources, e.g. '/tiles/places/{z}/{x}/{y}?v=...'.
+
+        The data version in the query string lets browsers cache tiles for good; a new dataset
+        gets new URLs.
+        """
+        return f'/tiles/{layer}/{{z}}/{{x}}/{{y}}?v={self.version}'
+
+    def tile(self, layer, z, x, y):
+        """
+        Encoded tile, from memory, the disk cache or freshly rendered.
+
+        Parameters:
+            layer (str): 'places' or 'districts'
+            z, x, y (int): Tile address
+
+        Returns:
+            bytes or None: MVT data (possibly empty), or None for an unknown layer or address
+        """
+        if layer not in TILE_LAYERS or not 0 <= z <= TILE_MAX_ZOOM:
+            return None
+        if not (0 <= x < 2**z and 0 <= y < 2**z):
+            return None
+        if not self.covers(z, x, y):
+            with self._lock:
+                self.outside += 1
+            return EMPTY_TILE
+
+        key = (layer, z, x, y)
+        with self._lock:
+            data = self._tiles.get(key)
+            if data is not None:
+                self._tiles.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        path = self.cache_dir / layer / str(z) / str(x) / f'{y}.mvt' if self.cache_dir else None
+        if path is not None and path.is_file():
+            data = path.read_bytes()
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            data = self.render(layer, z, x, y)
+            with self._lock:
+                self.rendered += 1
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)  # Atomic so concurrent workers never read partial tiles
+
+        with self._lock:
+            self._tiles[key] = data
+            while len(self._tiles) > self.max_entries:
+                self._tiles.popitem(last=False)
+        return data
+
+    def render(self, layer, z, x, y):
+        """Render a tile without caching it."""
+        if layer == 'places':
+            return self._render_places(z, x, y)
+        return encode_tile([encode_layer('districts', self._district_features(z, x, y))])
+
+    def _render_places(self, z, x, y):
+        (min_x, min_y, max_x, max_y), size = tile_bounds(z, x, y)
+        inside = np.flatnonzero(
+            (self.place_x >= min_x) & (self.place_x < max_x)
+            & (self.place_y >= min_y) & (self.place_y < max_y)
+        )
+        scale = TILE_EXTENT / size
+        tile_x = np.round((self.place_x[inside] - x * size) * scale).astype(np.int64)
+        tile_y = np.round((self.place_y[inside] - y * size) * scale).astype(np.int64)
+
+        layers = {}
+        for position, px, py in zip(inside.tolist(), tile_x.tolist(), tile_y.tolist()):
+            place_id = self.place_ids[position]
+            layers.setdefault(self.place_layers[position], []).append((
+                place_id if isinstance(place_id, (int, np.integer)) and place_id >= 0 else None,
+                {**self.place_properties[position], 'id': int(place_id)},
+                POINT,
+                point_geometry(px, py),
+            ))
+        return encode_tile([encode_layer(name, features) for name, features in layers.items()])
+
+    def _district_features(self, z, x, y):
+        bounds, size = tile_bounds(z, x, y)
+        scale = TILE_EXTENT / size
+        features = []
+        for i in self.district_tree.query(shapely.box(*bounds)):
+            clipped = shapely.clip_by_rect(self.district_geometries[i], *bounds)
+            if clipped.is_empty:
+                continue
+            # To tile coordinates, snapped to the tile grid (which also drops invisible detail)
+            local = shapely.transform(
+                clipped, lambda coords: (coords - [x * size, y * size]) * scale
+            )
+            local = shapely.set_precision(local.simplify(0.5), 1.0)
+            polygons = [
+                orient(polygon, sign=1.0)
+                for polygon in getattr(local, 'geoms', [local])
+                if polygon.geom_type == 'Polygon' and not polygon.is_empty
+            ]
+            geometry = polygon_geometry(polygons)
+            if geometry:
+                features.append((int(i) + 1, self.district_properties[i], POLYGON, geometry))
+        return features
+
+    def response(self, layer, z, x, y, request):
+        """
+        Build the response for GET /tiles/<layer>/<z>/<x>/<y>.
+
+        Parameters:
+            layer (str): 'places' or 'districts'
+            z, x, y (int): Tile address
+            request (flask.Request): Current request (for ?v= and If-None-Match)
+
+        Returns:
+            flask.Response or None: Tile response (304 when unchanged), or None if not found
+        """
+        data = self.tile(layer, z, x, y)
+        if data is None:
+            return None
+
+        response = Response(data, mimetype=TILE_MIMETYPE)
+        response.set_etag(f'{self.version}-{layer}-{z}-{x}-{y}')
+        if request.args.get('v') == self.version:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True  # Revalidate; unchanged tiles return 304
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response.make_conditional(request)
+
+    def stats(self):
+        """Tiles served from memory and disk, rendered, outside the data and in memory."""
+        with self._lock:
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'rendered': self.rendered,
+                'outside': self.outside,
+                'entries': len(self._tiles),
+            }
+
+    def prerender(self, max_zoom):
+        """
+        Render every tile covering the data up to a zoom into the caches.
+
+        Parameters:
+            max_zoom (int): Highest zoom rendered
+
+        Returns:
+            dict: Number of tiles and bytes per layer
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        totals = {layer: {'tiles': 0, 'bytes': 0} for layer in TILE_LAYERS}
+        for z in range(min(max_zoom, TILE_MAX_ZOOM) + 1):
+            n = 2**z
+            for x in range(int(min_x * n), min(int(max_x * n), n - 1) + 1):
+                for y in range(int(min_y * n), min(int(max_y * n), n - 1) + 1):
+                    for layer in TILE_LAYERS:
+                        totals[layer]['tiles'] += 1
+                        totals[layer]['bytes'] += len(self.tile(layer, z, x, y))
+        return totals
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from utils.dataSnapshot import load_datasets
+
+    parser = argparse.ArgumentParser(description='Render the map vector tiles into the disk cache.')
+    parser.add_argument('--max-zoom', type=int, default=14, help='highest zoom to render')
+    args = parser.parse_args()
+
+    datasets = load_datasets()
+    tiles = VectorTiles(datasets.places, datasets.districts, datasets.version)
+    for layer, total in tiles.prerender(args.max_zoom).items():
+        print(f"{layer}: {total['tiles']} tiles, {total['bytes'] / 1024:.0f} KB")
+    print(f'Tiles written to {tiles.cache_dir}')